@@ -1,2 +1 @@
-python3 src/main.py
-cd docs && python3 -m http.server 8888
\ No newline at end of file
+python3 src/main.py serve --watch --port 8888
@@ -0,0 +1,144 @@
+import io
+import os
+import shutil
+import tarfile
+import zipfile
+
+from compress import COMPRESSIBLE_EXTENSIONS, compress_bytes
+from output import OutputWriter
+
+ARCHIVE_FORMATS = (".tar", ".zip")
+# Every entry gets the same timestamp, owner and permissions, so that
+# identical inputs give byte-identical archives. 1980-01-01 is the
+# earliest date a zip entry can carry.
+ARCHIVE_DATE = (1980, 1, 1, 0, 0, 0)
+ARCHIVE_MTIME = 315532800
+FILE_MODE = 0o644
+COPY_BUFFER_SIZE = 1 << 20
+
+
+def is_archive(path):
+    return path.lower().endswith(ARCHIVE_FORMATS)
+
+
+class ArchiveWriter(OutputWriter):
+    """
+    An OutputWriter that streams the outputs under root into a .tar or .zip
+    archive at path instead of writing them to disk. Entries are added in
+    the order they are produced, on one background thread so the order is
+    kept, with fixed timestamps and permissions. Every output is expected
+    once: a build into an archive is always a clean build, so nothing is
+    ever removed. With compress_min_size, .gz (and .br) entries are added
+    after text outputs of at least that many bytes, as precompress_outputs
+    does on disk. The archive is written to a temporary file that close()
+    renames into place and discard() deletes.
+    """
+
+    def __init__(self, path, root, compress_min_size=None):
+        if not is_archive(path):
+            raise ValueError(f"unsupported archive type: {path} (use .tar or .zip)")
+        super().__init__(root, threads=1)
+        self.path = path
+        self.compress_min_size = compress_min_size
+        self._tmp_path = f"{path}.tmp"
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        if path.lower().endswith(".zip"):
+            self._zip = zipfile.ZipFile(self._tmp_path, "w", zipfile.ZIP_DEFLATED)
+            self._tar = None
+        else:
+            self._zip = None
+            self._tar = tarfile.open(self._tmp_path, "w", format=tarfile.PAX_FORMAT)
+
+    def _name(self, path):
+        return os.path.relpath(path, self.root).replace(os.sep, "/")
+
+    def _zip_info(self, name):
+        info = zipfile.ZipInfo(name, ARCHIVE_DATE)
+        info.compress_type = zipfile.ZIP_DEFLATED
+        info.create_system = 3
+        info.external_attr = (0o100000 | FILE_MODE) << 16
+        return info
+
+    def _tar_info(self, name, size):
+        info = tarfile.TarInfo(name)
+        info.size = size
+        info.mtime = ARCHIVE_MTIME
+        info.mode = FILE_MODE
+        return info
+
+    def _compresses(self, name, size):
+        return (self.compress_min_size is not None and size >= self.compress_min_size
+                and name.endswith(COMPRESSIBLE_EXTENSIONS))
+
+    def _add_bytes(self, name, data):
+        if self._zip is not None:
+            self._zip.writestr(self._zip_info(name), data)
+        else:
+            self._tar.addfile(self._tar_info(name, len(data)), io.BytesIO(data))
+
+    def _add(self, name, data):
+        self._add_bytes(name, data)
+        if self._compresses(name, len(data)):
+            for suffix, compressed in compress_bytes(data):
+                self._add_bytes(name + suffix, compressed)
+        return True
+
+    def _add_file(self, name, source):
+        size = os.path.getsize(source)
+        with open(source, "rb") as f:
+            if self._compresses(name, size):
+                return self._add(name, f.read())
+            if self._zip is not None:
+                with self._zip.open(self._zip_info(name), "w",
+                                    force_zip64=size >= zipfile.ZIP64_LIMIT) as out:
+                    shutil.copyfileobj(f, out, COPY_BUFFER_SIZE)
+            else:
+                self._tar.addfile(self._tar_info(name, size), f)
+        return True
+
+    def _move(self, tmp_path, name):
+        try:
+            return self._add_file(name, tmp_path)
+        finally:
+            os.remove(tmp_path)
+
+    def _copy(self, source, name):
+        self._add_file(name, source)
+
+    def write(self, path, data):
+        """Add data as the entry for path."""
+        self._submit(self._add, self._name(path), data)
+
+    def commit(self, tmp_path, path):
+        """Add a temporary file written by the caller as the entry for path, then delete it."""
+        self._submit(self._move, tmp_path, self._name(path))
+
+    def copy(self, source, path):
+        """Add the file at source as the entry for path; not counted as written."""
+        self._submit(self._copy, source, self._name(path))
+
+    def remove(self, path):
+        """Nothing is on disk, and no output is added and then dropped in a clean build."""
+
+    def _finish(self):
+        super().close()
+        (self._zip or self._tar).close()
+
+    def close(self):
+        """Add the queued entries and move the finished archive into place."""
+        try:
+            self._finish()
+        except BaseException:
+            if os.path.exists(self._tmp_path):
+                os.remove(self._tmp_path)
+            raise
+        # Fails loudly if the temporary archive went missing
+        os.replace(self._tmp_path, self.path)
+
+    def discard(self):
+        """Stop without producing an archive, e.g. after a failed build."""
+        try:
+            self._finish()
+        finally:
+            if os.path.exists(self._tmp_path):
+                os.remove(self._tmp_path)
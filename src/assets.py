@@ -0,0 +1,96 @@
+import json
+import os
+import posixpath
+
+from manifest import hash_bytes
+from output import OutputWriter
+
+# Static files given a content-hashed name when fingerprinting is enabled.
+# Files fetched by a fixed name (favicon.ico, robots.txt, CNAME, ...) keep it.
+FINGERPRINTED_EXTENSIONS = (
+    ".css", ".js", ".mjs", ".png", ".jpg", ".jpeg", ".gif", ".svg", ".webp", ".avif",
+    ".woff", ".woff2",
+)
+FINGERPRINT_LENGTH = 8
+ASSET_MANIFEST = "asset-manifest.json"
+
+
+def is_fingerprinted(key):
+    return key.lower().endswith(FINGERPRINTED_EXTENSIONS)
+
+
+def fingerprint_name(key, digest):
+    """Insert a short content hash before the extension: index.css -> index.3f9a1c8e.css."""
+    root, extension = os.path.splitext(key)
+    return f"{root}.{digest[:FINGERPRINT_LENGTH]}{extension}"
+
+
+class AssetMap:
+    """
+    Root-relative URLs of static files mapped to their fingerprinted URLs.
+    digest identifies the mapping, so anything rendered with it (the
+    compiled template, every page) can be reused until it changes.
+    """
+    __slots__ = ("urls", "digest")
+
+    def __init__(self, urls):
+        self.urls = urls
+        self.digest = hash_bytes(json.dumps(urls, sort_keys=True).encode("utf-8"))
+
+    @classmethod
+    def from_static(cls, static):
+        """Build the map from the static section of a manifest."""
+        return cls({"/" + key.replace(os.sep, "/"): "/" + entry["output"].replace(os.sep, "/")
+                    for key, entry in sorted(static.items()) if entry["output"] != key})
+
+    def __len__(self):
+        return len(self.urls)
+
+    def resolve(self, url, base=None):
+        """
+        Return the fingerprinted URL for url, keeping any query or fragment.
+        With base, the root-relative URL of the page url appears on, a
+        relative url is looked up from there and stays relative.
+        """
+        end = len(url)
+        for separator in "?#":
+            index = url.find(separator)
+            if index != -1:
+                end = min(end, index)
+        path = url[:end]
+        if path.startswith("/"):
+            fingerprinted = self.urls.get(path)
+            if fingerprinted is None:
+                return url
+            return fingerprinted + url[end:]
+        if base is None or not path or ":" in path.split("/", 1)[0]:
+            # Not relative to the page: empty, or with a scheme (mailto:, https:, ...)
+            return url
+        fingerprinted = self.urls.get(
+            posixpath.normpath(posixpath.join(posixpath.dirname(base), path)))
+        if fingerprinted is None:
+            return url
+        # Fingerprinting only renames the file, so only the last segment changes
+        return path[:path.rfind("/") + 1] + posixpath.basename(fingerprinted) + url[end:]
+
+
+def write_asset_manifest(output_dir, assets, manifest, writer=None):
+    """
+    Write ASSET_MANIFEST (original URL -> fingerprinted URL) to output_dir
+    for deploy tooling, e.g. to serve the fingerprinted files as immutable.
+    The file is only rewritten when the mapping changed. With assets=None,
+    a previously written asset manifest is removed. Writes go through
+    writer (an output.OutputWriter) when one is given.
+    """
+    if writer is None:
+        writer = OutputWriter(output_dir, threads=0)
+    path = os.path.join(output_dir, ASSET_MANIFEST)
+    if assets is None:
+        if manifest.assets:
+            writer.remove(path)
+        manifest.assets = {}
+        return
+    if manifest.assets.get("hash") == assets.digest and os.path.exists(path):
+        return
+    writer.write(path, json.dumps(assets.urls, indent=1, sort_keys=True).encode("utf-8"))
+    manifest.assets = {"hash": assets.digest, "output": ASSET_MANIFEST}
@@ -0,0 +1,481 @@
+"""
+Benchmarks for the markdown pipeline.
+
+Run from the repository root:
+    python3 src/bench.py                          # every benchmark
+    python3 src/bench.py inline pipeline          # only the named ones
+    python3 src/bench.py -o after.json            # save results as JSON
+    python3 src/bench.py --compare before.json    # flag regressions vs a saved run
+
+Metrics ending in _s, _ms, _kib, _bytes or _per_node are "lower is better"
+and are the ones checked by --compare.
+"""
+import gc
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from textnode import (
+    TextNode,
+    block_to_html_node,
+    markdown_to_blocks,
+    markdown_to_html_node,
+    parse_block,
+    TextType,
+    split_nodes_asterisk,
+    split_nodes_delimiter,
+    split_nodes_image,
+    split_nodes_link,
+    split_nodes_underscore,
+    text_to_textnodes,
+)
+
+WORDS = ("lorem", "ipsum", "dolor", "sit", "amet", "elf", "ring", "shire",
+         "mithril", "palantir", "ent", "hobbit", "wizard", "barrow")
+
+
+def legacy_text_to_textnodes(text):
+    """The original seven chained split passes: the baseline here and the tests' reference."""
+    nodes = [TextNode(text, TextType.TEXT)]
+    nodes = split_nodes_image(nodes)
+    nodes = split_nodes_link(nodes)
+    nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)
+    nodes = split_nodes_delimiter(nodes, "__", TextType.BOLD)
+    nodes = split_nodes_underscore(nodes)
+    nodes = split_nodes_asterisk(nodes)
+    nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
+    return nodes
+
+
+def make_paragraph(rng, words=80):
+    """Build one link- and markup-heavy paragraph of roughly `words` tokens."""
+    parts = []
+    for index in range(words):
+        word = rng.choice(WORDS)
+        roll = rng.random()
+        if roll < 0.08:
+            parts.append(f"[{word}](/blog/{word}/{index})")
+        elif roll < 0.11:
+            parts.append(f"![{word}](/images/{word}.png)")
+        elif roll < 0.16:
+            parts.append(f"**{word}**")
+        elif roll < 0.20:
+            parts.append(f"_{word}_")
+        elif roll < 0.23:
+            parts.append(f"`{word}()`")
+        else:
+            parts.append(word)
+    return " ".join(parts)
+
+
+def make_paragraph_corpus(total_bytes=1 << 20, seed=0):
+    """Generate paragraphs until the corpus reaches total_bytes."""
+    rng = random.Random(seed)
+    paragraphs = []
+    size = 0
+    while size < total_bytes:
+        paragraph = make_paragraph(rng)
+        paragraphs.append(paragraph)
+        size += len(paragraph)
+    return paragraphs
+
+
+def best_of(func, repeat=3):
+    """Return the fastest wall time of `repeat` runs of func()."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_inline():
+    """Single-scan text_to_textnodes against the chained split passes."""
+    corpus = make_paragraph_corpus()
+    long_paragraph = " ".join(corpus)
+    for paragraph in corpus[:200]:
+        assert text_to_textnodes(paragraph) == legacy_text_to_textnodes(paragraph)
+
+    results = {}
+    for name, func in (("legacy", legacy_text_to_textnodes), ("scanner", text_to_textnodes)):
+        results[f"{name}_paragraphs_s"] = best_of(
+            lambda: [func(paragraph) for paragraph in corpus])
+        results[f"{name}_single_1mb_s"] = best_of(lambda: func(long_paragraph))
+    results["speedup_paragraphs"] = (
+        results["legacy_paragraphs_s"] / results["scanner_paragraphs_s"])
+    results["speedup_single_1mb"] = (
+        results["legacy_single_1mb_s"] / results["scanner_single_1mb_s"])
+    return results
+
+
+def make_markdown_page(total_bytes=1 << 20, seed=0):
+    """Generate one large markdown page of paragraphs, lists and headings."""
+    rng = random.Random(seed)
+    blocks = ["# Large page"]
+    size = 0
+    while size < total_bytes:
+        roll = rng.random()
+        if roll < 0.1:
+            block = f"## {make_paragraph(rng, 6)}"
+        elif roll < 0.3:
+            block = "\n".join(f"- {make_paragraph(rng, 12)}" for _ in range(8))
+        else:
+            block = make_paragraph(rng)
+        blocks.append(block)
+        size += len(block)
+    return "\n\n".join(blocks)
+
+
+def count_nodes(node):
+    count = 0
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        count += 1
+        if node.children:
+            stack.extend(node.children)
+    return count
+
+
+# Run in a fresh interpreter so earlier benchmarks don't inflate the peak.
+# VmHWM is per address space; ru_maxrss would carry over the parent's peak.
+_RSS_PROBE = """
+import resource, sys
+sys.path.insert(0, {src!r})
+from bench import make_markdown_page
+from textnode import markdown_to_html_node
+
+def peak_rss_kib():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+page = make_markdown_page({size})
+base = peak_rss_kib()
+node = markdown_to_html_node(page)
+print(base, peak_rss_kib())
+"""
+
+
+def bench_memory(total_bytes=4 << 20):
+    """
+    Bytes per HTMLNode for a large page (tracemalloc) and the peak RSS of
+    parsing it in a fresh interpreter, in KiB.
+    """
+    page = make_markdown_page(total_bytes)
+    gc.collect()
+    tracemalloc.start()
+    node = markdown_to_html_node(page)
+    traced, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    nodes = count_nodes(node)
+
+    probe = _RSS_PROBE.format(src=sys.path[0] or ".", size=total_bytes)
+    output = subprocess.run([sys.executable, "-c", probe], check=True,
+                            capture_output=True, text=True).stdout.split()
+    base_rss, peak_rss = int(output[0]), int(output[1])
+    return {
+        "nodes": nodes,
+        "tree_bytes_per_node": traced / nodes,
+        "parse_peak_bytes_per_node": peak / nodes,
+        "rss_before_parse_kib": base_rss,
+        "rss_peak_kib": peak_rss,
+        "rss_parse_delta_kib": peak_rss - base_rss,
+    }
+
+
+# CI runs the generator hundreds of times a day, so interpreter startup plus
+# importing main.py is budgeted separately from the build itself
+STARTUP_BUDGET_MS = 60
+
+
+def bench_startup(repeat=10):
+    """
+    Best-of wall time of a bare interpreter, `import main`, and
+    `main.py --help`, each in a fresh process, checked against the budget.
+    """
+    src = os.path.dirname(os.path.abspath(__file__))
+    commands = {
+        "interpreter_ms": ["-c", "pass"],
+        "import_main_ms": ["-c", "import main"],
+        "cli_help_ms": [os.path.join(src, "main.py"), "--help"],
+    }
+    # Measured as a user sees it, with bytecode cached by the first run
+    env = {key: value for key, value in os.environ.items()
+           if key != "PYTHONDONTWRITEBYTECODE"}
+    results = {}
+    for name, args in commands.items():
+        results[name] = 1000 * best_of(
+            lambda: subprocess.run([sys.executable, *args], cwd=src, env=env, check=True,
+                                   stdout=subprocess.DEVNULL), repeat)
+    results["budget_ms"] = STARTUP_BUDGET_MS
+    results["within_budget"] = results["import_main_ms"] <= STARTUP_BUDGET_MS
+    return results
+
+
+def corpus_long_paragraphs(rng, total_bytes):
+    """Few blocks, each a very long markup-heavy paragraph."""
+    return [make_paragraph(rng, 2000) for _ in range(max(1, total_bytes // 16000))]
+
+
+def corpus_lists(rng, total_bytes):
+    """Many long unordered and ordered lists."""
+    blocks = []
+    size = 0
+    while size < total_bytes:
+        if len(blocks) % 2:
+            block = "\n".join(f"{i}. {make_paragraph(rng, 6)}" for i in range(1, 201))
+        else:
+            block = "\n".join(f"- {make_paragraph(rng, 6)}" for _ in range(200))
+        blocks.append(block)
+        size += len(block)
+    return blocks
+
+
+def corpus_dense_links(rng, total_bytes):
+    """Paragraphs made almost entirely of links and images."""
+    blocks = []
+    size = 0
+    while size < total_bytes:
+        block = " ".join(
+            f"[{rng.choice(WORDS)}](/blog/{i})" if i % 3 else f"![{rng.choice(WORDS)}](/images/{i}.png)"
+            for i in range(200))
+        blocks.append(block)
+        size += len(block)
+    return blocks
+
+
+def corpus_code_fences(rng, total_bytes):
+    """Large fenced code blocks, including blank lines."""
+    blocks = []
+    size = 0
+    while size < total_bytes:
+        lines = [f"    {rng.choice(WORDS)}({i}) # {make_paragraph(rng, 4)}" if i % 10 else ""
+                 for i in range(1, 501)]
+        block = "```\n" + "\n".join(lines) + "\n```"
+        blocks.append(block)
+        size += len(block)
+    return blocks
+
+
+CORPORA = {
+    "long_paragraphs": corpus_long_paragraphs,
+    "lists": corpus_lists,
+    "dense_links": corpus_dense_links,
+    "code_fences": corpus_code_fences,
+}
+
+
+def bench_pipeline(total_bytes=1 << 20):
+    """Time each parser stage separately on every synthetic corpus."""
+    results = {}
+    for name, make_corpus in CORPORA.items():
+        blocks = make_corpus(random.Random(0), total_bytes)
+        markdown = "\n\n".join(blocks)
+        paragraphs = [block for block in blocks if not block.startswith("```")]
+        nodes = [block_to_html_node(block) for block in blocks]
+        tree = markdown_to_html_node(markdown)
+
+        results[f"{name}_text_to_textnodes_s"] = best_of(
+            lambda: [text_to_textnodes(paragraph) for paragraph in paragraphs])
+        results[f"{name}_markdown_to_blocks_s"] = best_of(
+            lambda: markdown_to_blocks(markdown))
+        results[f"{name}_parse_block_s"] = best_of(
+            lambda: [parse_block(block) for block in blocks])
+        results[f"{name}_block_to_html_node_s"] = best_of(
+            lambda: [block_to_html_node(block) for block in blocks])
+        results[f"{name}_to_html_s"] = best_of(tree.to_html)
+        results[f"{name}_nodes"] = sum(count_nodes(node) for node in nodes)
+    return results
+
+
+def make_site(root, pages=2000, seed=0):
+    """Write a content tree of many small pages plus a minimal template."""
+    rng = random.Random(seed)
+    content = os.path.join(root, "content")
+    for index in range(pages):
+        page_dir = os.path.join(content, f"section{index % 20}", f"page{index}")
+        os.makedirs(page_dir)
+        with open(os.path.join(page_dir, "index.md"), "w") as f:
+            f.write(f"# Page {index}\n\n{make_paragraph(rng)}\n\n"
+                    f"- {make_paragraph(rng, 8)}\n- {make_paragraph(rng, 8)}\n")
+    template = os.path.join(root, "template.html")
+    with open(template, "w") as f:
+        f.write('<html><head><title>{{ Title }}</title><link href="/index.css"></head>'
+                "<body>{{ Content }}</body></html>")
+    return content, template
+
+
+def bench_build(pages=2000):
+    """
+    Full generate_pages_recursive builds of many small pages: from scratch
+    sequentially and on every core, and an incremental no-op rebuild.
+    """
+    from main import generate_pages_recursive
+    from manifest import Manifest
+
+    root = tempfile.mkdtemp(prefix="ssg-bench-")
+    try:
+        content, template = make_site(root, pages)
+        docs = os.path.join(root, "docs")
+        jobs = os.cpu_count() or 1
+        results = {"pages": pages, "jobs": jobs}
+
+        def full_build(jobs):
+            shutil.rmtree(docs, ignore_errors=True)
+            generate_pages_recursive(content, template, docs, "/base/",
+                                     jobs=jobs, verbose=False)
+
+        results["full_build_s"] = best_of(lambda: full_build(1), 1)
+        results["full_build_parallel_s"] = best_of(lambda: full_build(jobs), 1)
+
+        manifest = Manifest(os.path.join(root, "manifest.json"))
+        generate_pages_recursive(content, template, docs, "/base/", manifest, verbose=False)
+        results["noop_rebuild_s"] = best_of(lambda: generate_pages_recursive(
+            content, template, docs, "/base/", manifest, verbose=False), 1)
+        results["pages_per_s"] = pages / results["full_build_s"]
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+    return results
+
+
+def bench_search(pages=2000):
+    """
+    Build time with and without the search index, the index size on disk,
+    and the time to update it after one page changes.
+    """
+    from main import generate_pages_recursive
+    from manifest import Manifest
+    from search import SEARCH_DIR, SearchIndexer
+
+    root = tempfile.mkdtemp(prefix="ssg-bench-")
+    try:
+        content, template = make_site(root, pages)
+        docs = os.path.join(root, "docs")
+        results = {"pages": pages}
+
+        def full_build(search):
+            shutil.rmtree(docs, ignore_errors=True)
+            manifest = Manifest(os.path.join(root, "manifest.json"))
+            indexer = SearchIndexer(docs, manifest) if search else None
+            generate_pages_recursive(content, template, docs, "/", manifest,
+                                     verbose=False, search=indexer)
+            if indexer is not None:
+                indexer.finish()
+            return manifest
+
+        results["build_without_search_s"] = best_of(lambda: full_build(False), 1)
+        results["build_with_search_s"] = best_of(lambda: full_build(True), 1)
+        manifest = full_build(True)
+        sizes = [os.path.getsize(os.path.join(directory, name))
+                 for directory, _, names in os.walk(os.path.join(docs, SEARCH_DIR))
+                 for name in names]
+        results["search_files"] = len(sizes)
+        results["search_index_bytes"] = sum(sizes)
+        results["largest_search_file_bytes"] = max(sizes)
+
+        page = os.path.join(content, "section0", "page0", "index.md")
+
+        def update():
+            with open(page, "a") as f:
+                f.write("\nmithril\n")
+            indexer = SearchIndexer(docs, manifest)
+            generate_pages_recursive(content, template, docs, "/", manifest,
+                                     verbose=False, search=indexer)
+            indexer.finish()
+
+        results["search_update_one_page_s"] = best_of(update)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+    return results
+
+
+BENCHMARKS = {
+    "inline": bench_inline,
+    "pipeline": bench_pipeline,
+    "build": bench_build,
+    "search": bench_search,
+    "memory": bench_memory,
+    "startup": bench_startup,
+}
+
+LOWER_IS_BETTER_SUFFIXES = ("_s", "_ms", "_kib", "_bytes", "_per_node")
+
+
+def compare(baseline, current, threshold=0.10):
+    """
+    Compare two result documents and return (benchmark, metric, old, new)
+    for every lower-is-better metric that got worse by more than threshold.
+    """
+    regressions = []
+    for name, metrics in current["results"].items():
+        old_metrics = baseline.get("results", {}).get(name, {})
+        for metric, value in metrics.items():
+            old = old_metrics.get(metric)
+            if (not metric.endswith(LOWER_IS_BETTER_SUFFIXES) or isinstance(old, bool)
+                    or not isinstance(old, (int, float)) or old <= 0):
+                continue
+            if value > old * (1 + threshold):
+                regressions.append((name, metric, old, value))
+    return regressions
+
+
+def main(argv):
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="bench.py", description="Run pipeline benchmarks.")
+    parser.add_argument("names", nargs="*", metavar="NAME",
+                        help=f"benchmarks to run (default: all of {', '.join(BENCHMARKS)})")
+    parser.add_argument("-o", "--output", metavar="FILE", help="write results as JSON")
+    parser.add_argument("--compare", metavar="FILE",
+                        help="baseline JSON to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="allowed slowdown before a metric counts as a regression")
+    args = parser.parse_args(argv)
+
+    document = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        },
+        "results": {},
+    }
+    for name in args.names or list(BENCHMARKS):
+        results = BENCHMARKS[name]()
+        document["results"][name] = results
+        print(name)
+        for key, value in results.items():
+            print(f"  {key}: {value:.4f}" if isinstance(value, float) else f"  {key}: {value}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(document, f, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, document, args.threshold)
+        for name, metric, old, new in regressions:
+            print(f"REGRESSION {name}.{metric}: {old:.4f} -> {new:.4f} "
+                  f"({(new / old - 1) * 100:+.1f}%)")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,135 @@
+import json
+import sys
+import time
+
+QUIET, SUMMARY, VERBOSE = 0, 1, 2
+LEVELS = {"quiet": QUIET, "summary": SUMMARY, "verbose": VERBOSE}
+# Buffered lines are written out once there are this many, or when the
+# progress interval has passed, whichever comes first
+FLUSH_LINES = 512
+
+
+class BuildLog:
+    """
+    Build output with three levels: QUIET reports errors only, SUMMARY adds a
+    progress line every `interval` seconds and a final summary, and VERBOSE
+    adds a line per page and per build step. Lines are buffered and written
+    in batches, as text or, with json_lines=True, as one JSON object per
+    event. Only the parent process logs: pool workers hand their results
+    back and the parent reports them in work-list order.
+    """
+
+    def __init__(self, level=SUMMARY, stream=None, json_lines=False, interval=2.0,
+                 error_stream=None):
+        self.level = level
+        self.stream = sys.stdout if stream is None else stream
+        self.error_stream = sys.stderr if error_stream is None else error_stream
+        self.json_lines = json_lines
+        self.interval = interval
+        self._buffer = []
+        self._last_flush = time.perf_counter()
+        self.begin()
+
+    @classmethod
+    def for_verbose(cls, verbose):
+        """The log used when a caller only passes verbose=True/False."""
+        return cls(VERBOSE if verbose else QUIET)
+
+    def begin(self):
+        """Reset the counters and the clock at the start of a build."""
+        self.counts = {"generated": 0, "failed": 0, "unchanged": 0, "copied": 0,
+                       "written": 0, "skipped": 0, "deleted": 0}
+        self.total = 0
+        self.started = time.perf_counter()
+        self._last_progress = self.started
+
+    def _emit(self, event, text, **fields):
+        if self.json_lines:
+            fields["event"] = event
+            text = json.dumps(fields, sort_keys=True)
+        self._buffer.append(text)
+        if (len(self._buffer) >= FLUSH_LINES
+                or time.perf_counter() - self._last_flush >= self.interval):
+            self.flush()
+
+    def flush(self):
+        if self._buffer:
+            self.stream.write("\n".join(self._buffer) + "\n")
+            self._buffer = []
+        self.stream.flush()
+        self._last_flush = time.perf_counter()
+
+    def info(self, message):
+        """A message shown at SUMMARY level and above."""
+        if self.level >= SUMMARY:
+            self._emit("info", message, message=message)
+
+    def detail(self, message):
+        """A message shown at VERBOSE level only."""
+        if self.level >= VERBOSE:
+            self._emit("detail", message, message=message)
+
+    def error(self, source, message):
+        """An error is shown at every level, after anything already buffered."""
+        if self.json_lines:
+            self._emit("error", message, source=source, message=message)
+            self.flush()
+            return
+        self.flush()
+        self.error_stream.write(f"error: {source}: {message}\n")
+        self.error_stream.flush()
+
+    def count(self, name, amount=1):
+        self.counts[name] = self.counts.get(name, 0) + amount
+
+    def start_pages(self, total):
+        """Announce how many pages are about to be generated."""
+        self.total += total
+
+    def page(self, source, output, error=None):
+        """Record one generated (or failed) page."""
+        if error is None:
+            self.count("generated")
+            if self.level >= VERBOSE:
+                if self.json_lines:
+                    self._emit("page", None, source=source, output=output, status="ok")
+                else:
+                    self._emit("page", f"Generating page from {source}")
+                    self._emit("page", f"Page generated at {output}")
+        else:
+            self.count("failed")
+            if self.level >= VERBOSE:
+                if self.json_lines:
+                    self._emit("page", None, source=source, output=output,
+                               status="failed", error=error)
+                else:
+                    self._emit("page", f"Generating page from {source}")
+                    self._emit("page", f"Failed to generate {source}: {error}")
+        if self.level == SUMMARY:
+            now = time.perf_counter()
+            if now - self._last_progress >= self.interval:
+                self._last_progress = now
+                self.progress()
+
+    def progress(self):
+        done = self.counts["generated"] + self.counts["failed"]
+        percent = done / self.total if self.total else 1.0
+        self._emit("progress",
+                   f"Generating pages: {done}/{self.total} ({percent:.0%}), "
+                   f"{self.counts['failed']} failed",
+                   done=done, total=self.total, failed=self.counts["failed"])
+
+    def summary(self):
+        """Emit the end-of-build summary and flush."""
+        elapsed = time.perf_counter() - self.started
+        if self.level >= SUMMARY:
+            counts = self.counts
+            self._emit(
+                "summary",
+                f"Built {counts['generated']} page(s) ({counts['failed']} failed, "
+                f"{counts['unchanged']} unchanged), copied {counts['copied']} "
+                f"static file(s) in {elapsed:.2f}s; wrote {counts['written']} "
+                f"output(s), skipped {counts['skipped']} identical, "
+                f"deleted {counts['deleted']}",
+                seconds=elapsed, **counts)
+        self.flush()
@@ -0,0 +1,111 @@
+import marshal
+import os
+import sys
+
+from htmlnode import LeafNode, ParentNode
+from manifest import hash_bytes
+from output import atomic_output
+from textnode import PARSER_VERSION, image_props, link_props
+
+# Bump when the on-disk entry layout changes
+CACHE_FORMAT = 3
+DEFAULT_MAX_BYTES = 256 << 20
+# Bigger sources are streamed straight through and never cached, so that
+# rendering them stays in bounded memory
+MAX_SOURCE_BYTES = 8 << 20
+
+
+def cache_dir_for(output_dir):
+    """Return the parse cache directory for an output directory (docs/ -> .docs-cache)."""
+    output_dir = os.path.abspath(output_dir)
+    name = os.path.basename(output_dir.rstrip(os.sep))
+    return os.path.join(os.path.dirname(output_dir), f".{name}-cache")
+
+
+def node_to_data(node):
+    """Convert an HTMLNode tree into nested tuples that marshal can store."""
+    props = dict(node.props) if node.props else None
+    if isinstance(node, ParentNode):
+        return (node.tag, [node_to_data(child) for child in node.children], props)
+    return (node.tag, node.value, props)
+
+
+def data_to_node(data):
+    """Rebuild an HTMLNode tree from node_to_data output."""
+    tag, body, props = data
+    if isinstance(body, list):
+        return ParentNode(tag, [data_to_node(child) for child in body], props)
+    # Route link and image props back through the shared flyweights
+    if tag == "a" and props and props.keys() == {"href"}:
+        props = link_props(props["href"])
+    elif tag == "img" and props and props.keys() == {"src", "alt"}:
+        props = image_props(props["src"], props["alt"])
+    return LeafNode(tag, body, props)
+
+
+class ParseCache:
+    """
+    On-disk cache of parsed pages, keyed by a hash of the markdown source,
+    the parser version and the Python version (marshal is version-specific).
+    Entries are touched on every hit so prune() can evict the least recently
+    used ones once the cache grows past max_bytes.
+    """
+
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, markdown):
+        salt = f"{PARSER_VERSION}:{CACHE_FORMAT}:{sys.version_info[0]}.{sys.version_info[1]}\0"
+        return hash_bytes(salt.encode("utf-8") + markdown.encode("utf-8"))
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    def get(self, key):
+        """Return (metadata, html_node, links) for key, or None on a miss."""
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                meta, data, links = marshal.load(f)
+            os.utime(path)
+        except (OSError, EOFError, ValueError, TypeError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return meta, data_to_node(data), [tuple(link) for link in links]
+
+    def put(self, key, meta, html_node, links=()):
+        path = self._path(key)
+        # Unique temp name: several pool workers may write the same entry
+        with atomic_output(path, f"{path}.{os.getpid()}.tmp") as tmp_path:
+            with open(tmp_path, "wb") as f:
+                marshal.dump((meta, node_to_data(html_node), [list(link) for link in links]), f)
+
+    def prune(self):
+        """Evict least recently used entries until the cache fits max_bytes."""
+        entries = []
+        total = 0
+        if not os.path.isdir(self.directory):
+            return 0
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime_ns, stat.st_size, path))
+                total += stat.st_size
+
+        removed = 0
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
+            removed += 1
+        return removed
@@ -0,0 +1,131 @@
+import gzip
+import os
+
+from manifest import hash_bytes
+from output import OutputWriter, write_atomic
+
+try:
+    import brotli
+except ImportError:  # optional: only gzip siblings are written without it
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = (".html", ".css", ".js", ".xml", ".svg", ".json", ".txt")
+# Below this size the compressed file saves less than a network round trip
+MIN_SIZE = 1024
+GZIP_LEVEL = 9
+
+
+def encodings():
+    """The sibling suffixes this installation can produce."""
+    return (".gz", ".br") if brotli is not None else (".gz",)
+
+
+def compress_bytes(data):
+    """
+    Return (suffix, compressed data) for each of encodings(). The gzip
+    header carries no timestamp, so unchanged input always gives
+    byte-identical output.
+    """
+    siblings = [(".gz", gzip.compress(data, GZIP_LEVEL, mtime=0))]
+    if brotli is not None:
+        siblings.append((".br", brotli.compress(data)))
+    return siblings
+
+
+def compress_file(path):
+    """
+    Write path.gz (and path.br when brotli is installed) next to path.
+    Returns the content hash of the input.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    for suffix, compressed in compress_bytes(data):
+        write_atomic(path + suffix, compressed)
+    return hash_bytes(data)
+
+
+def _candidates(output_dir, threshold):
+    for root, dirs, files in os.walk(output_dir):
+        dirs.sort()
+        for name in sorted(files):
+            if not name.endswith(COMPRESSIBLE_EXTENSIONS):
+                continue
+            path = os.path.join(root, name)
+            stat = os.stat(path)
+            if stat.st_size >= threshold:
+                yield os.path.relpath(path, output_dir), stat
+
+
+def _remove_siblings(output_dir, entry, writer):
+    for output in entry["outputs"]:
+        writer.remove(os.path.join(output_dir, output))
+
+
+def precompress_outputs(output_dir, manifest, jobs=1, threshold=MIN_SIZE, writer=None):
+    """
+    Write compressed siblings for every text output of at least `threshold`
+    bytes, using a pool of `jobs` threads (zlib releases the GIL). Files
+    whose size and mtime match the manifest are skipped without being
+    read; the rest are compressed unless their content hash is unchanged
+    and the siblings exist. Siblings of files that are gone, or that
+    shrank below the threshold, are removed, through writer (an
+    output.OutputWriter) when one is given. Returns the number of files
+    compressed.
+    """
+    if writer is None:
+        writer = OutputWriter(output_dir, threads=0)
+    suffixes = encodings()
+    previous = manifest.compressed
+    compressed = {}
+    pending = []
+    for key, stat in _candidates(output_dir, threshold):
+        entry = previous.get(key)
+        outputs = [key + suffix for suffix in suffixes]
+        if (entry is not None and entry["outputs"] == outputs
+                and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime_ns
+                and all(os.path.exists(os.path.join(output_dir, output)) for output in outputs)):
+            compressed[key] = entry
+            continue
+        pending.append((key, stat, outputs))
+
+    def compress(item):
+        key, stat, outputs = item
+        path = os.path.join(output_dir, key)
+        entry = previous.get(key)
+        if entry is not None and entry["outputs"] == outputs and all(
+                os.path.exists(os.path.join(output_dir, output)) for output in outputs):
+            with open(path, "rb") as f:
+                digest = hash_bytes(f.read())
+            if digest == entry["hash"]:
+                # Rewritten with the same content: only the mtime moved
+                return digest, False
+        return compress_file(path), True
+
+    if jobs > 1 and len(pending) > 1:
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            results = list(executor.map(compress, pending))
+    else:
+        results = [compress(item) for item in pending]
+
+    count = 0
+    for (key, stat, outputs), (digest, written) in zip(pending, results):
+        compressed[key] = {"hash": digest, "outputs": outputs,
+                           "size": stat.st_size, "mtime": stat.st_mtime_ns}
+        count += written
+
+    for key, entry in previous.items():
+        stale = [output for output in entry["outputs"]
+                 if key not in compressed or output not in compressed[key]["outputs"]]
+        _remove_siblings(output_dir, {"outputs": stale}, writer)
+    manifest.compressed = compressed
+    return count
+
+
+def remove_compressed(output_dir, manifest, writer=None):
+    """Delete every compressed sibling recorded in the manifest."""
+    if writer is None:
+        writer = OutputWriter(output_dir, threads=0)
+    for entry in manifest.compressed.values():
+        _remove_siblings(output_dir, entry, writer)
+    manifest.compressed = {}
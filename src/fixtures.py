@@ -0,0 +1,8 @@
+import os
+
+
+def write_file(path, data):
+    """Write text or bytes to path, creating its directory first; shared by the tests."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb" if isinstance(data, bytes) else "w") as f:
+        f.write(data)
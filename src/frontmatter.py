@@ -0,0 +1,91 @@
+import re
+from itertools import chain
+
+FENCE = "---"
+DATE_PATTERN = re.compile(r"^\d{4}-\d{2}-\d{2}")
+
+
+def parse_scalar(text):
+    """Parse a YAML-style scalar: a quoted string, a boolean or a plain string."""
+    text = text.strip()
+    if len(text) >= 2 and text[0] == text[-1] and text[0] in "\"'":
+        return text[1:-1]
+    lowered = text.lower()
+    if lowered in ("true", "yes"):
+        return True
+    if lowered in ("false", "no"):
+        return False
+    return text
+
+
+def parse_value(text):
+    """Parse a scalar or an inline [a, b] list."""
+    text = text.strip()
+    if text.startswith("[") and text.endswith("]"):
+        return [parse_scalar(item) for item in text[1:-1].split(",") if item.strip()]
+    return parse_scalar(text)
+
+
+def normalize(meta):
+    """Coerce the keys the generator relies on to their expected types."""
+    tags = meta.get("tags", [])
+    if isinstance(tags, str):
+        tags = tags.split(",")
+    elif not isinstance(tags, list):
+        tags = [tags]
+    meta["tags"] = [str(tag).strip() for tag in tags if str(tag).strip()]
+    meta["draft"] = meta.get("draft") is True
+    if "title" in meta:
+        meta["title"] = str(meta["title"])
+    if "date" in meta:
+        meta["date"] = str(meta["date"])
+        if not DATE_PATTERN.match(meta["date"]):
+            raise ValueError(f"Invalid date in front matter: {meta['date']!r}")
+    return meta
+
+
+def split_front_matter(lines):
+    """
+    Read YAML-style front matter from the start of an iterable of lines:
+
+        ---
+        title: Why Tom Bombadil Was a Mistake
+        date: 2024-05-01
+        tags: [tolkien, essays]
+        draft: false
+        ---
+
+    Supports `key: value` pairs, inline [a, b] lists and `- item` lists
+    under an empty key. Returns (metadata, remaining lines); without front
+    matter the metadata only holds the defaults and no line is consumed.
+    """
+    lines = iter(lines)
+    meta = {}
+    first = next(lines, None)
+    if first is None:
+        return normalize(meta), lines
+    if first.rstrip("\n").strip() != FENCE:
+        return normalize(meta), chain((first,), lines)
+
+    key = None
+    for line in lines:
+        line = line.rstrip("\n")
+        stripped = line.strip()
+        if stripped == FENCE:
+            break
+        if not stripped or stripped.startswith("#"):
+            continue
+        if (stripped.startswith("- ") and key is not None
+                and (meta[key] == "" or isinstance(meta[key], list))):
+            if meta[key] == "":
+                meta[key] = []
+            meta[key].append(parse_scalar(stripped[2:]))
+            continue
+        name, sep, value = line.partition(":")
+        if not sep or not name.strip():
+            raise ValueError(f"Invalid front matter line: {line!r}")
+        key = name.strip().lower()
+        meta[key] = parse_value(value) if value.strip() else ""
+    else:
+        raise ValueError("Front matter is not closed with ---")
+    return normalize(meta), lines
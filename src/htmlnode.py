@@ -1,20 +1,74 @@
-from typing import Optional
+from typing import Callable, Iterator, Optional
+
+URL_ATTRIBUTES = ("href", "src")
+# Holds comma-separated "url descriptor" candidates, e.g. responsive images
+URL_LIST_ATTRIBUTES = ("srcset",)
+WRITE_BUFFER_SIZE = 1 << 16
+
+
+def rewrite_srcset(value, rewrite_url):
+    """Pass every URL of a srcset attribute through rewrite_url."""
+    candidates = []
+    for candidate in value.split(","):
+        url, _, descriptor = candidate.strip().partition(" ")
+        candidates.append(f"{rewrite_url(url)} {descriptor}" if descriptor else rewrite_url(url))
+    return ", ".join(candidates)
+
+
+def write_chunks(fp, chunks, buffer_size: int = WRITE_BUFFER_SIZE):
+    """Write an iterable of string chunks to fp in batches of ~buffer_size."""
+    buffer = []
+    size = 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        size += len(chunk)
+        if size >= buffer_size:
+            fp.write("".join(buffer))
+            buffer.clear()
+            size = 0
+    if buffer:
+        fp.write("".join(buffer))
 
 
 class HTMLNode:
+    # Slots instead of a per-instance __dict__: pages can hold 100k+ nodes
+    __slots__ = ("tag", "value", "children", "props")
+
     def __init__(self, tag: Optional[str] = None, value: Optional[str] = None, children: Optional[list] = None, props: Optional[dict] = None):
         self.tag = tag
         self.value = value
         self.children = children
         self.props = props
 
-    def to_html(self):
+    def to_html(self, rewrite_url: Optional[Callable[[str], str]] = None):
         raise NotImplementedError()
 
-    def props_to_html(self):
+    def iter_html(self, rewrite_url: Optional[Callable[[str], str]] = None) -> Iterator[str]:
+        """Yield the HTML for this node as a sequence of string chunks."""
+        yield self.to_html(rewrite_url)
+
+    def write_html(self, fp, rewrite_url: Optional[Callable[[str], str]] = None):
+        """Stream the HTML for this node into a file-like object."""
+        write_chunks(fp, self.iter_html(rewrite_url))
+
+    def props_to_html(self, rewrite_url: Optional[Callable[[str], str]] = None):
+        """
+        Render props as attributes. When rewrite_url is given, href and src
+        values, and each URL in a srcset, are passed through it (used for the
+        basepath rewrite).
+        """
         if not self.props:
             return ""
-        return "".join(f' {key}="{value}"' for key, value in self.props.items())
+        if rewrite_url is None:
+            return "".join(f' {key}="{value}"' for key, value in self.props.items())
+        attributes = []
+        for key, value in self.props.items():
+            if key in URL_ATTRIBUTES:
+                value = rewrite_url(value)
+            elif key in URL_LIST_ATTRIBUTES:
+                value = rewrite_srcset(value, rewrite_url)
+            attributes.append(f' {key}="{value}"')
+        return "".join(attributes)
 
     def __repr__(self):
         return (
@@ -24,25 +78,55 @@ class HTMLNode:
 
 
 class LeafNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag: Optional[str], value: str, props: Optional[dict] = None):
         super().__init__(tag=tag, value=value, children=None, props=props)
 
-    def to_html(self):
+    def to_html(self, rewrite_url: Optional[Callable[[str], str]] = None):
         if self.value is None:
             raise ValueError("LeafNode value is required")
         if self.tag is None:
             return self.value
-        return f"<{self.tag}{self.props_to_html()}>" f"{self.value}</{self.tag}>"
+        return f"<{self.tag}{self.props_to_html(rewrite_url)}>" f"{self.value}</{self.tag}>"
 
 
 class ParentNode(HTMLNode):
+    """
+    A node with children. children is normally a list, but any iterable is
+    accepted; a lazy one (e.g. a generator of block nodes) lets a page be
+    parsed and streamed out block by block, and is consumed by the first
+    serialization.
+    """
+    __slots__ = ()
+
     def __init__(self, tag: str, children: list, props: Optional[dict] = None):
         super().__init__(tag=tag, value=None, children=children, props=props)
 
-    def to_html(self):
-        if self.tag is None:
-            raise ValueError("ParentNode tag is required")
-        if self.children is None:
-            raise ValueError("ParentNode children is required")
-        children_html = "".join(child.to_html() for child in self.children)
-        return f"<{self.tag}{self.props_to_html()}>{children_html}</{self.tag}>"
+    def to_html(self, rewrite_url: Optional[Callable[[str], str]] = None):
+        return "".join(self.iter_html(rewrite_url))
+
+    def iter_html(self, rewrite_url: Optional[Callable[[str], str]] = None) -> Iterator[str]:
+        """
+        Walk the subtree with an explicit stack and yield tags and leaf HTML
+        as they are reached, so no intermediate string is built per subtree.
+        """
+        stack = [iter((self,))]
+        closing_tags = []
+        while stack:
+            node = next(stack[-1], None)
+            if node is None:
+                stack.pop()
+                if closing_tags:
+                    yield closing_tags.pop()
+                continue
+            if not isinstance(node, ParentNode):
+                yield node.to_html(rewrite_url)
+                continue
+            if node.tag is None:
+                raise ValueError("ParentNode tag is required")
+            if node.children is None:
+                raise ValueError("ParentNode children is required")
+            yield f"<{node.tag}{node.props_to_html(rewrite_url)}>"
+            stack.append(iter(node.children))
+            closing_tags.append(f"</{node.tag}>")
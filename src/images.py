@@ -0,0 +1,200 @@
+import os
+import struct
+from types import MappingProxyType
+
+from manifest import hash_file
+from output import OutputWriter, atomic_output, process_pool
+
+try:
+    from PIL import Image
+except ImportError:  # optional: without Pillow no downscaled variants are written
+    Image = None
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg")
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# JPEG start-of-frame markers; C4, C8 and CC are other segments in that range
+SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+# Most headers fit well within this; larger JPEG preambles are read in full
+HEADER_BYTES = 1 << 16
+
+
+def can_resize():
+    """Whether this installation can write downscaled variants."""
+    return Image is not None
+
+
+def _jpeg_size(data, f):
+    offset = 2
+    while True:
+        if offset + 4 > len(data):
+            more = f.read(HEADER_BYTES)
+            if not more:
+                return None
+            data += more
+            continue
+        if data[offset] != 0xFF:
+            return None
+        marker = data[offset + 1]
+        if marker == 0xFF:
+            # Fill byte before a marker
+            offset += 1
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD8:
+            # Standalone markers carry no length
+            offset += 2
+            continue
+        length = struct.unpack(">H", data[offset + 2:offset + 4])[0]
+        if marker in SOF_MARKERS:
+            while offset + 9 > len(data):
+                more = f.read(HEADER_BYTES)
+                if not more:
+                    return None
+                data += more
+            height, width = struct.unpack(">HH", data[offset + 5:offset + 9])
+            return width, height
+        offset += 2 + length
+
+
+def image_size(path):
+    """
+    Return (width, height) read from a PNG or JPEG header, or None when the
+    file is neither (or is truncated). Only the header is read.
+    """
+    with open(path, "rb") as f:
+        data = f.read(HEADER_BYTES)
+        if data.startswith(PNG_SIGNATURE) and data[12:16] == b"IHDR":
+            return struct.unpack(">II", data[16:24])
+        if data.startswith(b"\xff\xd8"):
+            return _jpeg_size(data, f)
+    return None
+
+
+def variant_output(key, width):
+    """Output path of the `width` pixel wide variant of a static image."""
+    root, extension = os.path.splitext(key)
+    return f"{root}-{width}w{extension}"
+
+
+def resize_image(source, destination, width):
+    """Write a copy of source scaled down to width, keeping the aspect ratio."""
+    # Pillow picks the format from the extension, so it stays last
+    root, extension = os.path.splitext(destination)
+    with atomic_output(destination, f"{root}.tmp{extension}") as tmp_path:
+        with Image.open(source) as image:
+            height = max(1, round(image.height * width / image.width))
+            image.resize((width, height), Image.LANCZOS).save(tmp_path, optimize=True)
+
+
+def _process_image(task):
+    """
+    Pool worker: read the size of one image and write its variants.
+    Returns (width, height, [[variant output, width], ...]).
+    """
+    source, output_dir, key, widths = task
+    size = image_size(source)
+    if size is None:
+        return None, None, []
+    variants = []
+    if Image is not None:
+        for width in sorted(widths):
+            if width < size[0]:
+                output = variant_output(key, width)
+                resize_image(source, os.path.join(output_dir, output), width)
+                variants.append([output, width])
+    return size[0], size[1], variants
+
+
+def _candidates(static_dir):
+    for root, dirs, files in os.walk(static_dir):
+        dirs.sort()
+        for name in sorted(files):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                path = os.path.join(root, name)
+                yield os.path.relpath(path, static_dir), path
+
+
+def process_images(static_dir, output_dir, manifest, widths=(), jobs=1, writer=None):
+    """
+    Read the dimensions of every PNG and JPEG in static_dir and, for each
+    of the given widths smaller than the original, write a downscaled
+    variant next to the copied image (requires Pillow). Images whose size
+    and mtime, or failing that content hash, match the manifest are not
+    reprocessed; the rest are handled by a pool of `jobs` processes.
+    Variants that are no longer produced are removed, through writer (an
+    output.OutputWriter) when one is given.
+    Returns (table, count): the image table used by annotate_images and the
+    number of images processed.
+    """
+    if writer is None:
+        writer = OutputWriter(output_dir, threads=0)
+    widths = sorted(set(widths)) if Image is not None else []
+    previous = manifest.images
+    images = {}
+    pending = []
+    for key, path in _candidates(static_dir):
+        stat = os.stat(path)
+        entry = previous.get(key)
+        reusable = (entry is not None and entry["widths"] == widths
+                    and all(os.path.exists(os.path.join(output_dir, output))
+                            for output, _ in entry["variants"]))
+        if reusable and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime_ns:
+            images[key] = entry
+            continue
+        digest = hash_file(path)
+        if reusable and entry["hash"] == digest:
+            images[key] = dict(entry, size=stat.st_size, mtime=stat.st_mtime_ns)
+            continue
+        images[key] = {"hash": digest, "size": stat.st_size, "mtime": stat.st_mtime_ns,
+                       "widths": widths}
+        pending.append((path, output_dir, key, widths))
+
+    if jobs > 1 and len(pending) > 1:
+        with process_pool(jobs) as executor:
+            results = list(executor.map(_process_image, pending))
+    else:
+        results = [_process_image(task) for task in pending]
+    for (_, _, key, _), (width, height, variants) in zip(pending, results):
+        images[key].update(width=width, height=height, variants=variants)
+
+    for key, entry in previous.items():
+        current = {output for output, _ in images[key]["variants"]} if key in images else set()
+        for output, _ in entry["variants"]:
+            if output not in current:
+                writer.remove(os.path.join(output_dir, output))
+    manifest.images = images
+    return image_table(images), len(pending)
+
+
+def image_table(images):
+    """Map the root-relative URL of each image with known dimensions to its attributes."""
+    table = {}
+    for key, entry in images.items():
+        if entry["width"] is None:
+            continue
+        url = "/" + key.replace(os.sep, "/")
+        attributes = {"width": str(entry["width"]), "height": str(entry["height"]),
+                      "loading": "lazy"}
+        if entry["variants"]:
+            candidates = [("/" + output.replace(os.sep, "/"), width)
+                          for output, width in entry["variants"]]
+            candidates.append((url, entry["width"]))
+            attributes["srcset"] = ", ".join(f"{src} {width}w" for src, width in candidates)
+        table[url] = attributes
+    return table
+
+
+def annotate_images(node, table):
+    """
+    Give every img in node's subtree whose src is in the image table its
+    width, height, loading and srcset attributes. Props are read-only and
+    may be shared between nodes, so new props are assigned rather than
+    updated. Returns node.
+    """
+    if node.tag == "img":
+        props = node.props
+        if props is not None and props.get("src") in table and "width" not in props:
+            node.props = MappingProxyType({**props, **table[props["src"]]})
+    elif isinstance(node.children, list):
+        for child in node.children:
+            annotate_images(child, table)
+    return node
@@ -0,0 +1,107 @@
+import os
+import posixpath
+import re
+
+# URLs with a scheme (https:, mailto:, data:, ...) or protocol-relative ones
+EXTERNAL_PATTERN = re.compile(r"^(?:[a-zA-Z][a-zA-Z0-9+.-]*:|//)")
+
+
+def collect_links(node, block, line, links):
+    """
+    Append (url, line) for every a[href] and img[src] in node's subtree, a
+    block parsed from the markdown text `block` starting at `line`. Each URL
+    is placed on the line of the block where it is written.
+    """
+    if node.tag in ("a", "img") and node.props:
+        url = node.props.get("href" if node.tag == "a" else "src")
+        if url is not None:
+            position = block.find(f"]({url}")
+            if position != -1:
+                line += block.count("\n", 0, position)
+            links.append((url, line))
+    elif isinstance(node.children, list):
+        for child in node.children:
+            collect_links(child, block, line, links)
+    return node
+
+
+def link_targets(manifest):
+    """
+    Every path a link may point at: generated pages and listings, static
+    files under their published name (the fingerprinted one, when they
+    are) and image variants, relative to the output directory.
+    """
+    targets = set()
+    for section in (manifest.pages, manifest.generated, manifest.static):
+        targets.update(entry["output"].replace(os.sep, "/") for entry in section.values())
+    for entry in manifest.images.values():
+        targets.update(output.replace(os.sep, "/") for output, _ in entry["variants"])
+    return targets
+
+
+def renamed_assets(manifest):
+    """Map the source name of each fingerprinted static file to its published name."""
+    return {key.replace(os.sep, "/"): entry["output"].replace(os.sep, "/")
+            for key, entry in manifest.static.items() if entry["output"] != key}
+
+
+def resolve(path, targets):
+    """Whether an output-relative path is served: as a file, a directory index or .html."""
+    if path in ("", "."):
+        return "index.html" in targets
+    if path.endswith("/"):
+        return f"{path}index.html" in targets
+    return path in targets or f"{path}/index.html" in targets or f"{path}.html" in targets
+
+
+def find_broken_links(manifest, content_dir=""):
+    """
+    Check the links recorded for every page in the manifest against the
+    outputs recorded next to them, without reading any generated file.
+    Root-relative URLs are resolved from the site root, relative ones from
+    the page's own URL; external URLs and bare #fragments are skipped.
+    URLs of fingerprinted files count under their published name, which
+    rendering rewrites them to.
+    Returns a sorted list of (source path, line, url).
+    """
+    targets = link_targets(manifest)
+    renamed = renamed_assets(manifest)
+    # Outcome of each root-relative or external URL: True, False, or None
+    # when it isn't checked; relative URLs are resolved per page
+    resolved = {}
+    broken = []
+    for key, entry in manifest.pages.items():
+        failed = None
+        directory = None
+        for url, line in entry.get("links", ()):
+            ok = resolved.get(url)
+            if ok is None and url not in resolved:
+                path = url
+                if "?" in path or "#" in path:
+                    path = re.split(r"[?#]", path, 1)[0]
+                if not path or EXTERNAL_PATTERN.match(path):
+                    resolved[url] = None
+                elif path[0] == "/":
+                    ok = resolved[url] = resolve(renamed.get(path[1:], path[1:]), targets)
+                else:
+                    if directory is None:
+                        directory = posixpath.dirname(entry["output"].replace(os.sep, "/"))
+                    ok = resolve_relative(directory, path, targets, renamed)
+            if ok is False:
+                if failed is None:
+                    failed = os.path.normpath(os.path.join(content_dir, key))
+                broken.append((failed, line, url))
+    broken.sort()
+    return broken
+
+
+def resolve_relative(directory, path, targets, renamed=None):
+    """Resolve a path relative to a page in directory; links above the site root fail."""
+    target = posixpath.normpath(f"{directory}/{path}" if directory else path)
+    if target == ".." or target.startswith("../"):
+        return False
+    if renamed and target in renamed:
+        return resolve(renamed[target], targets)
+    if path.endswith("/") and target != ".":
+        target += "/"
+    return resolve(target, targets)
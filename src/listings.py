@@ -0,0 +1,265 @@
+import json
+import os
+import re
+import time
+from functools import partial
+from html import escape
+
+from htmlnode import LeafNode, ParentNode
+from manifest import hash_bytes
+from output import OutputWriter
+from siteindex import url_for
+from template import load_template, rewrite_url
+
+# Pages under this content directory are blog posts
+POSTS_DIR = "blog"
+PAGE_SIZE = 10
+FEED_ENTRIES = 20
+# A sitemap file may list at most 50,000 URLs; beyond that a sitemap index
+# points at numbered sitemap files
+SITEMAP_LIMIT = 50000
+
+
+def slugify(tag):
+    """Turn a tag into a URL path segment: "Middle Earth" -> "middle-earth"."""
+    return re.sub(r"[^a-z0-9]+", "-", tag.lower()).strip("-") or "tag"
+
+
+def page_output(directory, number):
+    """Output path of page `number` of a paginated listing in directory."""
+    if number == 1:
+        return f"{directory}/index.html"
+    return f"{directory}/page/{number}/index.html"
+
+
+def collect_posts(published):
+    """The pages under POSTS_DIR, except its own index.md, in the given order."""
+    prefix = POSTS_DIR + os.sep
+    own_index = os.path.join(POSTS_DIR, "index.md")
+    return [page for page in published
+            if page.source.startswith(prefix) and page.source != own_index]
+
+
+def group_by_tag(posts):
+    """Map tag slug -> (tag name, posts) in one pass; posts keep their order."""
+    tags = {}
+    for post in posts:
+        for tag in post.tags:
+            slug = slugify(tag)
+            if slug not in tags:
+                tags[slug] = (tag, [])
+            tags[slug][1].append(post)
+    return dict(sorted(tags.items()))
+
+
+def post_summary(post):
+    return (post.url, post.title, post.date, post.tags)
+
+
+def listing_node(title, posts, newer_url, older_url):
+    """Build the content tree of one listing page."""
+    items = []
+    for post in posts:
+        children = [LeafNode("a", post.title, {"href": post.url})]
+        if post.date:
+            children.append(LeafNode(None, " "))
+            children.append(LeafNode("time", post.date, {"datetime": post.date}))
+        items.append(ParentNode("li", children))
+    children = [ParentNode("h1", [LeafNode(None, title)])]
+    if items:
+        children.append(ParentNode("ul", items))
+    links = []
+    if newer_url:
+        links.append(LeafNode("a", "Newer posts", {"href": newer_url, "rel": "prev"}))
+    if older_url:
+        links.append(LeafNode("a", "Older posts", {"href": older_url, "rel": "next"}))
+    if links:
+        children.append(ParentNode("nav", links))
+    return ParentNode("div", children)
+
+
+def paginate(directory, title, posts):
+    """
+    Yield (output, signature, render) for every page of a listing. The
+    signature covers everything shown on the page, so a page is only
+    re-rendered when one of its own entries or its links change.
+    """
+    count = max(1, -(-len(posts) // PAGE_SIZE))
+    for number in range(1, count + 1):
+        chunk = posts[(number - 1) * PAGE_SIZE:number * PAGE_SIZE]
+        newer = url_for(page_output(directory, number - 1)) if number > 1 else None
+        older = url_for(page_output(directory, number + 1)) if number < count else None
+        page_title = title if number == 1 else f"{title} (page {number})"
+        signature = ["listing", page_title, newer, older, [post_summary(post) for post in chunk]]
+        yield (page_output(directory, number), signature,
+               partial(listing_node, page_title, chunk, newer, older))
+
+
+def tag_index_node(tags):
+    items = [ParentNode("li", [
+        LeafNode("a", name, {"href": url_for(page_output(f"tags/{slug}", 1))}),
+        LeafNode(None, f" ({len(posts)})"),
+    ]) for slug, (name, posts) in tags.items()]
+    children = [ParentNode("h1", [LeafNode(None, "Tags")])]
+    if items:
+        children.append(ParentNode("ul", items))
+    return ParentNode("div", children)
+
+
+def absolute_url(site_url, basepath, url):
+    return site_url.rstrip("/") + rewrite_url(url, basepath)
+
+
+def post_updated(post, content_dir):
+    """
+    Atom timestamp of a post: its date, or for an undated post the mtime
+    of its source file.
+    """
+    if post.date:
+        return f"{post.date[:10]}T00:00:00Z"
+    mtime = os.path.getmtime(os.path.join(content_dir, post.source))
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(mtime))
+
+
+def atom_feed(posts, updated, site_title, site_url, basepath):
+    """Yield the chunks of an Atom feed of the newest posts; updated lists their timestamps."""
+    home = absolute_url(site_url, basepath, "/")
+    yield '<?xml version="1.0" encoding="utf-8"?>\n'
+    yield '<feed xmlns="http://www.w3.org/2005/Atom">\n'
+    yield f"<title>{escape(site_title)}</title>\n"
+    yield f'<link href="{escape(home)}"/>\n'
+    yield f'<link rel="self" href="{escape(absolute_url(site_url, basepath, "/feed.xml"))}"/>\n'
+    yield f"<id>{escape(home)}</id>\n"
+    yield f"<updated>{max(updated)}</updated>\n"
+    yield f"<author><name>{escape(site_title)}</name></author>\n"
+    for post, post_time in zip(posts, updated):
+        url = escape(absolute_url(site_url, basepath, post.url))
+        yield "<entry>\n"
+        yield f"<title>{escape(post.title)}</title>\n"
+        yield f'<link href="{url}"/>\n'
+        yield f"<id>{url}</id>\n"
+        yield f"<updated>{post_time}</updated>\n"
+        for tag in post.tags:
+            yield f'<category term="{escape(tag)}"/>\n'
+        yield "</entry>\n"
+    yield "</feed>\n"
+
+
+def sitemap(urls, site_url, basepath):
+    """Yield the chunks of a sitemap for (url, lastmod) pairs."""
+    yield '<?xml version="1.0" encoding="utf-8"?>\n'
+    yield '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+    for url, lastmod in urls:
+        yield f"<url><loc>{escape(absolute_url(site_url, basepath, url))}</loc>"
+        if lastmod:
+            yield f"<lastmod>{lastmod[:10]}</lastmod>"
+        yield "</url>\n"
+    yield "</urlset>\n"
+
+
+def sitemap_index(names, site_url, basepath):
+    yield '<?xml version="1.0" encoding="utf-8"?>\n'
+    yield '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+    for name in names:
+        yield f"<sitemap><loc>{escape(absolute_url(site_url, basepath, '/' + name))}</loc></sitemap>\n"
+    yield "</sitemapindex>\n"
+
+
+def generate_listings(index, template_path, output_dir, basepath="/", manifest=None,
+                      site_url="", log=None, minify=False, assets=None, writer=None):
+    """
+    Render the outputs derived from the site index: the paginated blog
+    index, a page per tag (plus a tag overview), an Atom feed of the newest
+    posts and sitemap.xml. Everything is computed from the in-memory index
+    in a single sort and a single grouping pass. With a manifest, each output
+    is only rewritten when the data it shows (or the template or basepath)
+    changed, and outputs that are no longer produced are removed.
+    Feed and sitemap need absolute URLs, so they are only written with a
+    site_url (e.g. https://example.com). An undated post's feed entry uses
+    the mtime of its source.
+    minify=True uses the minified template and assets the fingerprinted
+    asset URLs, as for pages. Files are written and removed through writer
+    (an output.OutputWriter) when one is given.
+    Returns the number of files rendered.
+    """
+    if writer is None:
+        writer = OutputWriter(output_dir, threads=0)
+    template = load_template(template_path, basepath, minify, assets)
+    rewriter = None
+    if basepath != "/" or assets:
+        rewriter = partial(rewrite_url, basepath=basepath, assets=assets)
+    page_outputs = {page.output.replace(os.sep, "/") for page in index.pages.values()}
+    published = index.published()
+    posts = collect_posts(published)
+    tags = group_by_tag(posts)
+    home = index.get("index.md")
+    site_title = home.title if home else "Blog"
+
+    def page_job(output, signature, build_node, title):
+        def render():
+            return template.iter_render({"Title": title, "Content": build_node().iter_html(rewriter)})
+        return output, signature, render
+
+    jobs = []
+    for output, signature, build_node in paginate(POSTS_DIR, "Blog", posts):
+        jobs.append(page_job(output, signature, build_node, signature[1]))
+    for slug, (name, tagged) in tags.items():
+        for output, signature, build_node in paginate(f"tags/{slug}", f"Tagged: {name}", tagged):
+            jobs.append(page_job(output, signature, build_node, signature[1]))
+    jobs.append(page_job("tags/index.html",
+                         ["tags", [(slug, name, len(tagged)) for slug, (name, tagged) in tags.items()]],
+                         partial(tag_index_node, tags), "Tags"))
+
+    urls = [(page.url, page.date) for page in published]
+    urls.extend((url_for(output), None) for output, _, _ in jobs)
+    if not site_url:
+        # Feed readers and crawlers need absolute URLs
+        if log is not None:
+            log.info("Skipping feed.xml and sitemap.xml: no --site-url given")
+    elif len(urls) <= SITEMAP_LIMIT:
+        jobs.append(("sitemap.xml", ["sitemap", site_url, urls],
+                     partial(sitemap, urls, site_url, basepath)))
+    else:
+        names = []
+        for start in range(0, len(urls), SITEMAP_LIMIT):
+            part = urls[start:start + SITEMAP_LIMIT]
+            names.append(f"sitemap-{len(names) + 1}.xml")
+            jobs.append((names[-1], ["sitemap", site_url, part],
+                         partial(sitemap, part, site_url, basepath)))
+        jobs.append(("sitemap.xml", ["sitemap-index", site_url, names],
+                     partial(sitemap_index, names, site_url, basepath)))
+
+    feed_posts = posts[:FEED_ENTRIES]
+    if site_url and feed_posts:
+        updated = [post_updated(post, index.content_dir) for post in feed_posts]
+        jobs.append(("feed.xml",
+                     ["feed", site_title, site_url,
+                      [post_summary(post) for post in feed_posts], updated],
+                     partial(atom_feed, feed_posts, updated, site_title, site_url, basepath)))
+
+    previous = manifest.generated if manifest is not None else {}
+    state = [manifest.template if manifest is not None else None, basepath]
+    generated = {}
+    rendered = 0
+    for output, signature, render in jobs:
+        if output in page_outputs:
+            # A content page with the same URL always wins
+            if log is not None:
+                log.detail(f"Skipping {output}: a content page has the same path")
+            continue
+        digest = hash_bytes(json.dumps([state, signature]).encode("utf-8"))
+        path = os.path.join(output_dir, output)
+        entry = previous.get(output)
+        if entry is None or entry["hash"] != digest or not os.path.exists(path):
+            writer.write(path, "".join(render()).encode("utf-8"))
+            rendered += 1
+        generated[output] = {"hash": digest, "output": output}
+
+    for output, entry in previous.items():
+        if output not in generated and output not in page_outputs:
+            writer.remove(os.path.join(output_dir, entry["output"]))
+    if manifest is not None:
+        manifest.generated = generated
+    if log is not None:
+        log.detail(f"Rendered {rendered} of {len(generated)} listing, feed and sitemap file(s)")
+    return rendered
@@ -1,127 +1,745 @@
+import io
 import os
 import sys
-import shutil
-import re
-from textnode import markdown_to_html_node, markdown_to_blocks, block_to_block_type, BlockType
+from functools import partial
+from collections import Counter, deque
+from itertools import chain
+from frontmatter import split_front_matter
+from textnode import BlockType, iter_numbered_blocks, parse_block, parsed_block_to_html_node
+from htmlnode import ParentNode, write_chunks
+from cache import DEFAULT_MAX_BYTES, MAX_SOURCE_BYTES, ParseCache, cache_dir_for
+from manifest import Manifest, hash_bytes, hash_file, manifest_path_for
+from output import OutputBatch, OutputWriter, process_pool, staged_output
+from buildlog import LEVELS, BuildLog
+from siteindex import SiteIndex, url_for
+from stats import BuildReport, PageStats, TimedWriter, read_lines
+from template import URL_ATTRIBUTE_PATTERN, load_template, rewrite_url
 
 
-def copy_directory(source, destination):
+def split_title(blocks):
     """
-    Recursively copy all contents from source directory to destination directory.
-    First deletes all contents of the destination directory to ensure a clean copy.
+    Read parse_block() results up to and including the first heading and
+    return its text together with an iterator that still yields every block
+    in order. Only the blocks before the heading are held in memory.
     """
-    # Delete destination directory if it exists
-    if os.path.exists(destination):
-        shutil.rmtree(destination)
+    blocks = iter(blocks)
+    head = []
+    for parsed in blocks:
+        head.append(parsed)
+        block_type, _, lines = parsed
+        if block_type == BlockType.HEADING:
+            return lines[0].lstrip(), chain(head, blocks)
+    raise ValueError("No heading found in markdown")
 
-    # Create the destination directory
-    os.makedirs(destination)
 
-    # Copy all files and subdirectories recursively
-    for item in os.listdir(source):
-        source_path = os.path.join(source, item)
-        destination_path = os.path.join(destination, item)
+def parse_page(lines, stats=None, links=None):
+    """
+    Parse a page in one pass over its lines: the front matter, then the
+    blocks, each split and classified once. The title comes from the front
+    matter or, failing that, from the first heading. Returns
+    (metadata, html_node); the tree's children are built lazily while it
+    is serialized. When links is a list, the (url, line) of every link and
+    image is appended to it as the tree is built.
+    """
+    if stats is None:
+        stats = PageStats(None)
+    consumed = [0]
 
-        if os.path.isdir(source_path):
-            # Recursively copy subdirectories
-            copy_directory(source_path, destination_path)
-        else:
-            # Copy individual files
-            shutil.copy2(source_path, destination_path)
+    def counted(lines):
+        for line in lines:
+            consumed[0] += 1
+            yield line
+
+    source = counted(lines)
+    stats.enter("block_split")
+    meta, lines = split_front_matter(source)
+    stats.leave()
+    # Without front matter, the line read to look for it is put back
+    numbered = iter_numbered_blocks(lines, consumed[0] + 1 if lines is source else 1)
+    to_html_node = parsed_block_to_html_node
+    if links is not None:
+        from linkcheck import collect_links
+        # Blocks reach to_html_node in the order they were split, so their
+        # text and line number are queued until then
+        pending = deque()
+
+        def split(numbered):
+            for line, block in numbered:
+                pending.append((line, block))
+                yield block
+
+        def to_html_node(parsed):
+            line, block = pending.popleft()
+            return collect_links(parsed_block_to_html_node(parsed), block, line, links)
+
+        blocks = split(numbered)
+    else:
+        blocks = (block for _, block in numbered)
+    blocks = stats.timed_iter("block_split", map(parse_block, blocks))
+    if "title" not in meta:
+        meta["title"], blocks = split_title(blocks)
+    html_node = ParentNode("div", map(stats.timed("inline_parse", to_html_node), blocks))
+    return meta, html_node
 
 
 def extract_title(markdown):
-    """Extract the first heading from markdown as the page title."""
-    blocks = markdown_to_blocks(markdown)
-    for block in blocks:
-        if block_to_block_type(block) == BlockType.HEADING:
-            # Remove the # characters and return the heading text
-            return re.sub(r"^#+\s+", "", block)
-    raise ValueError("No heading found in markdown")
+    """Extract the page title: the front matter title or the first heading."""
+    meta, _ = parse_page(markdown.split("\n"))
+    return meta["title"]
+
+
+class PageGenerationError(Exception):
+    """Raised after a build in which one or more pages failed to generate."""
+
+    def __init__(self, failures):
+        self.failures = failures
+        super().__init__(f"{len(failures)} page(s) failed to generate")
+
+
+def parse_cached(markdown, cache, stats=None, links=None):
+    """
+    Return (metadata, html_node) for markdown, parsing only on a cache miss.
+    The page's links are cached with it and appended to links when given.
+    """
+    if stats is None:
+        stats = PageStats(None)
+    key = cache.key(markdown)
+    cached = stats.timed("read", cache.get)(key)
+    if cached is not None:
+        stats.cache_hit = True
+        meta, html_node, page_links = cached
+    else:
+        page_links = []
+        meta, html_node = parse_page(markdown.split("\n"), stats, page_links)
+        html_node.children = list(html_node.children)
+        stats.timed("emit", cache.put)(key, meta, html_node, page_links)
+    if links is not None:
+        links.extend(page_links)
+    return meta, html_node
 
 
-def generate_page(content_path, template_path, destination_path, basepath="/"):
+def generate_page(content_path, template_path, destination_path, basepath="/", *,
+                  verbose=True, cache=None, stats=None, minify=False, images=None, assets=None,
+                  links=None, terms=None, writer=None, log=None, page_url=None):
     """
-    Generate an HTML page from markdown content and an HTML template.
-    Replaces {{ Title }} and {{ Content }} in the template.
-    Also replaces all root-relative paths with the configurable basepath.
+    Render the markdown at content_path into the template and hand the page
+    to writer (written before returning without one). The options mirror
+    build_site's; links and terms, when given, collect the page's (url,
+    line) links and search term counts. Returns the page's metadata.
     """
-    print(f"Generating page from {content_path}")
+    owned_log = log is None
+    if owned_log:
+        log = BuildLog.for_verbose(verbose)
+    log.detail(f"Generating page from {content_path}")
+    if stats is None:
+        stats = PageStats(content_path, destination_path)
+
+    # The compiled template is loaded once per process and reused
+    template = stats.timed("template", load_template)(template_path, basepath, minify, assets)
+
+    if writer is None:
+        writer = OutputWriter(os.path.dirname(destination_path), threads=0)
+    with open(content_path, "r") as source:
+        stats.bytes_in = os.fstat(source.fileno()).st_size
+        large = stats.bytes_in > MAX_SOURCE_BYTES
+        if cache is not None and not large:
+            stats.enter("read")
+            markdown = source.read()
+            stats.leave()
+            meta, html_node = parse_cached(markdown, cache, stats, links)
+        else:
+            # Blocks are read lazily; only those before the title are buffered
+            meta, html_node = parse_page(read_lines(source, stats), stats, links)
+        # Imported lazily, like every module only some builds need
+        if images:
+            from images import annotate_images
+            html_node.children = map(partial(annotate_images, table=images), html_node.children)
+        if terms is not None:
+            from search import add_terms, collect_terms
+            add_terms(meta["title"], terms)
+            html_node.children = map(partial(collect_terms, terms=terms), html_node.children)
+        url_rewriter = None
+        if basepath != "/" or assets:
+            url_rewriter = stats.timed("basepath_rewrite", partial(
+                rewrite_url, basepath=basepath, assets=assets, page_url=page_url))
+        content_chunks = stats.staged("serialize", html_node.iter_html(url_rewriter))
+        page_chunks = stats.staged("template", template.iter_render({
+            "Title": meta["title"],
+            "Date": meta.get("date", ""),
+            "Description": str(meta.get("description", "")),
+            "Tags": ", ".join(meta["tags"]),
+            "Content": content_chunks,
+        }))
+
+        if not large:
+            # Rendered in memory, so a parse error halfway through never
+            # reaches the writer
+            buffer = io.StringIO()
+            write_chunks(TimedWriter(buffer, stats), page_chunks)
+            data = buffer.getvalue().encode("utf-8")
+            stats.bytes_out = len(data)
+            writer.write(destination_path, data)
+        else:
+            # Streamed to a temporary file to keep memory bounded
+            with staged_output(destination_path) as tmp_path:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    write_chunks(TimedWriter(f, stats), page_chunks)
+                stats.bytes_out = os.path.getsize(tmp_path)
+            writer.commit(tmp_path, destination_path)
 
-    # Read the markdown content
-    with open(content_path, "r") as f:
-        markdown_content = f.read()
+    log.detail(f"Page generated at {destination_path}")
+    if owned_log:
+        log.flush()
+    return meta
 
-    # Read the template
-    with open(template_path, "r") as f:
-        template = f.read()
 
-    # Convert markdown to HTML
-    html_node = markdown_to_html_node(markdown_content)
-    content_html = html_node.to_html()
+def _generate_page_task(task):
+    """
+    Pool worker: generate one page and report the outcome instead of raising,
+    so a single bad page never takes down the rest of the batch.
+    Returns (error message or None, PageStats, page metadata or None, links,
+    search terms or None, OutputBatch); the parent performs the writes.
+    """
+    (content_path, template_path, destination_path, basepath, cache_dir, minify, images,
+     assets, index_terms, page_url) = task
+    cache = ParseCache(cache_dir) if cache_dir else None
+    stats = PageStats(content_path, destination_path)
+    links = []
+    terms = Counter() if index_terms else None
+    batch = OutputBatch()
+    try:
+        meta = generate_page(content_path, template_path, destination_path,
+                             basepath, verbose=False, cache=cache, stats=stats, minify=minify,
+                             images=images, assets=assets, links=links, terms=terms,
+                             writer=batch, page_url=page_url)
+    except Exception as e:
+        import traceback
+        return ("".join(traceback.format_exception_only(type(e), e)).strip(), stats, None, [],
+                None, None)
+    return None, stats, meta, links, terms, batch
 
-    # Extract title from markdown
-    title = extract_title(markdown_content)
 
-    # Replace placeholders in template
-    page_html = template.replace("{{ Title }}", title)
-    page_html = page_html.replace("{{ Content }}", content_html)
+def build_pages(pages, template_path, basepath="/", *, jobs=1, verbose=True, cache_dir=None,
+                report=None, log=None, index=None, minify=False, images=None, assets=None,
+                search=None, writer=None):
+    """
+    Generate every (markdown path, html path) pair, over a process pool of
+    `jobs` workers when jobs > 1, logging and writing them in order and
+    adding them to report, index and search when given. Returns a list of
+    (markdown path, error message) for failed pages.
+    """
+    if log is None:
+        log = BuildLog.for_verbose(verbose)
+    owned = writer is None
+    if owned:
+        # Only writes: nothing is removed, so the root is never used
+        writer = OutputWriter(os.curdir)
+    tasks = [(content_path, template_path, html_dest_path, basepath, cache_dir, minify, images,
+              assets, search is not None,
+              None if index is None else url_for(os.path.relpath(html_dest_path,
+                                                                 index.output_dir)))
+             for content_path, html_dest_path in pages]
+    log.start_pages(len(tasks))
+    try:
+        if jobs > 1 and len(tasks) > 1:
+            chunksize = max(1, len(tasks) // (jobs * 4))
+            with process_pool(jobs) as executor:
+                return _report_results(tasks, executor.map(
+                    _generate_page_task, tasks, chunksize=chunksize), report, log, index,
+                    search, writer)
+        return _report_results(tasks, map(_generate_page_task, tasks), report, log, index,
+                               search, writer)
+    finally:
+        if owned:
+            writer.close()
 
-    # Replace root-relative paths with basepath
-    page_html = page_html.replace('href="/', f'href="{basepath}')
-    page_html = page_html.replace('src="/', f'src="{basepath}')
 
-    # Write to destination
-    os.makedirs(os.path.dirname(destination_path), exist_ok=True)
-    with open(destination_path, "w") as f:
-        f.write(page_html)
+def _report_results(tasks, results, report, log, index, search, writer):
+    """Write and log each task's outcome as it arrives and return the failures."""
+    failures = []
+    for task, (error, stats, meta, links, terms, batch) in zip(tasks, results):
+        content_path, _, html_dest_path, basepath = task[:4]
+        log.page(content_path, html_dest_path, error)
+        if error is None:
+            batch.replay(writer)
+            if report is not None:
+                report.add(stats)
+            if index is not None:
+                page = index.add(content_path, html_dest_path, meta, links)
+                if search is not None:
+                    if page.draft:
+                        search.remove(page.source)
+                    else:
+                        search.add(page.source, rewrite_url(page.url, basepath),
+                                   page.title, terms)
+        else:
+            failures.append((content_path, error))
+    return failures
+
 
-    print(f"Page generated at {destination_path}")
+def resources_hash(links, images=None, assets=None, page_url=None):
+    """
+    A digest of what rendering a page takes from outside its source: the
+    image attributes and fingerprinted URLs of the (url, line) links it
+    contains, relative ones taken from page_url. Empty when it takes
+    nothing, e.g. without images or assets.
+    """
+    if not images and not assets:
+        return ""
+    resources = []
+    for url, _ in links:
+        if images and url in images:
+            resources.append((url, sorted(images[url].items())))
+        if assets:
+            fingerprinted = assets.resolve(url, page_url)
+            if fingerprinted != url:
+                resources.append((url, fingerprinted))
+    if not resources:
+        return ""
+    return hash_bytes(repr(resources).encode("utf-8"))
 
 
-def generate_pages_recursive(dir_path_content, template_path, dest_dir_path, basepath="/"):
+def collect_pages(dir_path_content, dest_dir_path):
     """
-    Recursively generate HTML pages for all markdown files in the content directory.
-    Maintains the same directory structure in the destination directory.
+    Walk the content directory and return (markdown path, html path) pairs
+    in a stable, sorted order. The html path mirrors the content structure.
     """
-    for item in os.listdir(dir_path_content):
+    pages = []
+    for item in sorted(os.listdir(dir_path_content)):
         item_path = os.path.join(dir_path_content, item)
         dest_item_path = os.path.join(dest_dir_path, item)
 
         if os.path.isdir(item_path):
-            # Recursively process subdirectories
-            generate_pages_recursive(
-                item_path, template_path, dest_item_path, basepath)
+            # Recursively collect subdirectories
+            pages.extend(collect_pages(item_path, dest_item_path))
         elif item.endswith(".md"):
-            # Convert markdown file to HTML
             html_filename = item.replace(".md", ".html")
-            html_dest_path = os.path.join(
-                os.path.dirname(dest_item_path), html_filename)
-            generate_page(item_path, template_path, html_dest_path, basepath)
+            pages.append((item_path, os.path.join(
+                os.path.dirname(dest_item_path), html_filename)))
+    return pages
+
+
+def generate_pages_recursive(dir_path_content, template_path, dest_dir_path, basepath="/",
+                             manifest=None, *, jobs=1, changed=None, verbose=True, cache_dir=None,
+                             report=None, log=None, minify=False, images=None, assets=None,
+                             search=None, writer=None):
+    """
+    Generate a page for every markdown file under dir_path_content, in the
+    same layout under dest_dir_path. With a manifest, only pages whose
+    source or inputs changed are rebuilt and outputs of deleted sources
+    removed; changed, a set of absolute paths, skips re-hashing the rest.
+    Returns a SiteIndex of every page and raises PageGenerationError once
+    all were attempted if any failed.
+    """
+    if log is None:
+        log = BuildLog.for_verbose(verbose)
+    owned = writer is None
+    if owned:
+        writer = OutputWriter(dest_dir_path)
+    options = dict(jobs=jobs, verbose=verbose, cache_dir=cache_dir, report=report, log=log,
+                   minify=minify, images=images, assets=assets, search=search, writer=writer)
+    try:
+        index = SiteIndex(dir_path_content, dest_dir_path)
+        pages = collect_pages(dir_path_content, dest_dir_path)
+        if manifest is None:
+            failures = build_pages(pages, template_path, basepath, index=index, **options)
+            if failures:
+                raise PageGenerationError(failures)
+            return index
+
+        # A template or basepath change invalidates every page
+        template_hash = hash_file(template_path)
+        if minify:
+            template_hash = hash_bytes(f"{template_hash}:minify".encode("utf-8"))
+        if assets:
+            with open(template_path, "r") as f:
+                urls = [(url, None) for _, url in URL_ATTRIBUTE_PATTERN.findall(f.read())]
+            template_resources = resources_hash(urls, assets=assets)
+            if template_resources:
+                template_hash = hash_bytes(f"{template_hash}:{template_resources}".encode("utf-8"))
+        if search is not None:
+            template_hash = hash_bytes(f"{template_hash}:search".encode("utf-8"))
+        basepath_hash = hash_bytes(basepath.encode("utf-8"))
+        rebuild_all = manifest.template != template_hash or manifest.basepath != basepath_hash
+        if search is not None and not search.intact():
+            rebuild_all = True
+
+        seen = {}
+        stale = []
+        for content_path, html_dest_path in pages:
+            key = os.path.relpath(content_path, dir_path_content)
+            output = os.path.relpath(html_dest_path, dest_dir_path)
+            entry = manifest.pages.get(key)
+            # Images and fingerprinted assets the page links to are checked
+            # against the links recorded last time, without reparsing it
+            current = (not rebuild_all and entry is not None
+                       and entry["resources"] == resources_hash(entry["links"], images, assets,
+                                                                url_for(entry["output"])))
+            if (changed is not None and current
+                    and os.path.abspath(content_path) not in changed):
+                seen[key] = entry
+                continue
+            digest = hash_file(content_path)
+            unchanged = (
+                current
+                and entry["hash"] == digest
+                and entry["output"] == output
+                and os.path.exists(html_dest_path)
+            )
+            if not unchanged:
+                stale.append((content_path, html_dest_path))
+                seen[key] = {"hash": digest, "output": output}
+            else:
+                seen[key] = entry
+
+        log.count("unchanged", len(seen) - len(stale))
+        failures = build_pages(stale, template_path, basepath, index=index, **options)
+
+        # Remove pages whose markdown source was deleted or renamed
+        outputs = {entry["output"] for entry in seen.values()}
+        for key, entry in manifest.pages.items():
+            if key not in seen and entry["output"] not in outputs:
+                writer.remove(os.path.join(dest_dir_path, entry["output"]))
+            if key not in seen and search is not None:
+                search.remove(key)
+
+        # Failed pages are dropped from the manifest so the next build retries them
+        for content_path, _ in failures:
+            key = os.path.relpath(content_path, dir_path_content)
+            seen.pop(key, None)
+            if search is not None:
+                search.remove(key)
+
+        # Pages that were not regenerated keep the metadata recorded last time
+        for key, entry in seen.items():
+            page = index.get(key)
+            if page is None:
+                index.add(os.path.join(dir_path_content, key),
+                          os.path.join(dest_dir_path, entry["output"]), entry["meta"],
+                          entry["links"])
+            else:
+                entry["meta"] = page.meta
+                entry["links"] = page.links
+                entry["resources"] = resources_hash(page.links, images, assets, page.url)
+
+        manifest.pages = seen
+        manifest.template = template_hash
+        manifest.basepath = basepath_hash
+        if failures:
+            raise PageGenerationError(failures)
+        return index
+    finally:
+        if owned:
+            writer.close()
+
+
+ROOT_DIR = os.path.join(os.path.dirname(__file__), "..")
+CONTENT_DIR = os.path.join(ROOT_DIR, "content")
+STATIC_DIR = os.path.join(ROOT_DIR, "static")
+TEMPLATE_PATH = os.path.join(ROOT_DIR, "template.html")
+OUTPUT_DIR = os.path.join(ROOT_DIR, "docs")
+
+
+def build_site(basepath="/", jobs=1, *, content_dir=CONTENT_DIR, static_dir=STATIC_DIR,
+               template_path=TEMPLATE_PATH, output_dir=OUTPUT_DIR, manifest=None, changed=None,
+               verbose=True, checksum=False, link_static=False, cache=True,
+               cache_max_bytes=DEFAULT_MAX_BYTES, report=None, log=None, site_url="",
+               precompress=False, compress_min_size=None, minify=False, image_widths=(),
+               fingerprint=False, search=False, archive_path=None):
+    """
+    Sync static files, generate every page and the listings into output_dir
+    (or, with archive_path, a fresh .tar or .zip instead), updating the
+    manifest given or stored next to output_dir. Each option matches the
+    command-line flag of the same name; see the README.
+    """
+    # Imported here rather than at the top, to keep importing main (and
+    # every CLI invocation that doesn't build) within the startup budget
+    import shutil
+    from assets import AssetMap, write_asset_manifest
+    from compress import MIN_SIZE, precompress_outputs, remove_compressed
+    from images import can_resize, process_images
+    from listings import generate_listings
+    from search import MAX_BUFFERED_POSTINGS, SearchIndexer, remove_search_index
+    from sync import remove_untracked, sync_directory
+
+    if log is None:
+        log = BuildLog.for_verbose(verbose)
+    log.begin()
+    log.detail(f"Building site with basepath: {basepath}")
+    if compress_min_size is None:
+        compress_min_size = MIN_SIZE
+
+    cache_dir = cache_dir_for(output_dir) if cache else None
+    staging = None
+    if archive_path is not None:
+        # Imported lazily: only deploy builds need tarfile and zipfile
+        import tempfile
+        from archive import ArchiveWriter
+        # Nothing is written here but the temporary files of pages too
+        # large to render in memory, on their way into the archive
+        staging = tempfile.mkdtemp(prefix="site-")
+        output_dir = staging
+        manifest = Manifest(os.path.join(staging, "manifest.json"))
+        try:
+            writer = ArchiveWriter(archive_path, staging,
+                                   compress_min_size if precompress else None)
+        except BaseException:
+            shutil.rmtree(staging)
+            raise
+    else:
+        if manifest is None:
+            manifest = Manifest.load(manifest_path_for(output_dir))
+        # Generated outputs go through one writer: identical files are left
+        # alone and the rest written in the background
+        writer = OutputWriter(output_dir)
+    clean = manifest.is_empty()
+    completed = False
+    try:
+        # Copy changed static files to the output directory
+        log.detail(f"Syncing from {static_dir} to {archive_path or output_dir}")
+        copied = sync_directory(static_dir, output_dir, manifest, changed, checksum,
+                                link_static, minify, fingerprint, writer if staging else None,
+                                writer)
+        log.count("copied", copied)
+        log.detail(f"Copy complete! ({copied} file(s) updated)")
+        assets = AssetMap.from_static(manifest.static) if fingerprint else None
+        write_asset_manifest(output_dir, assets, manifest, writer)
+        if image_widths and not can_resize():
+            log.info("Pillow is not installed; image variants are skipped")
+        images, processed = process_images(static_dir, output_dir, manifest, image_widths, jobs,
+                                           writer)
+        log.detail(f"Processed {processed} changed image(s)")
+        if staging:
+            # Variants are written by Pillow; move them into the archive
+            for entry in manifest.images.values():
+                for output, _ in entry["variants"]:
+                    path = os.path.join(staging, output)
+                    writer.commit(path, path)
+
+        # Generate HTML pages from all markdown files in content directory
+        log.detail(f"Generating pages from {content_dir}")
+        search_index = None
+        if search:
+            # An archive entry is written once, so full buffers are spilled
+            # to the staging directory and merged when the build is done
+            search_index = SearchIndexer(output_dir, manifest, MAX_BUFFERED_POSTINGS, writer,
+                                         os.path.join(staging, ".search-runs") if staging
+                                         else None)
+        try:
+            index = generate_pages_recursive(
+                content_dir, template_path, output_dir, basepath, manifest, jobs=jobs,
+                changed=changed, verbose=verbose, cache_dir=cache_dir, report=report, log=log,
+                minify=minify, images=images, assets=assets, search=search_index, writer=writer)
+        finally:
+            # Also after failed pages: the shards must match the pages built
+            if search_index is not None:
+                log.detail(f"Search index: {search_index.finish()} shard(s) updated")
+        if search_index is None and manifest.search:
+            remove_search_index(output_dir, manifest, writer)
+        log.detail(f"Page generation complete! ({len(index)} page(s) indexed)")
+        generate_listings(index, template_path, output_dir, basepath, manifest,
+                          site_url, log, minify, assets, writer)
+        # An archive writer adds the compressed entries itself
+        if precompress and not staging:
+            # Precompression reads the outputs back
+            writer.flush()
+            compressed = precompress_outputs(output_dir, manifest, os.cpu_count() or 1,
+                                              compress_min_size, writer)
+            log.detail(f"Compressed {compressed} changed file(s)")
+        elif manifest.compressed:
+            remove_compressed(output_dir, manifest, writer)
+        completed = True
+    finally:
+        try:
+            if staging and not completed:
+                writer.discard()
+            else:
+                writer.close()
+        finally:
+            if staging:
+                shutil.rmtree(staging)
+            else:
+                if clean:
+                    remove_untracked(output_dir, manifest, writer)
+                manifest.save()
+            log.count("written", writer.written)
+            log.count("skipped", writer.skipped)
+            log.count("deleted", writer.deleted)
+            if cache_dir:
+                ParseCache(cache_dir, cache_max_bytes).prune()
+            log.summary()
+    return manifest
+
+
+def parse_widths(value):
+    """Parse a comma-separated list of pixel widths, e.g. "480,960"."""
+    widths = tuple(int(width) for width in value.split(",") if width.strip())
+    if any(width <= 0 for width in widths):
+        raise ValueError(value)
+    return widths
+
+
+def parse_args(argv):
+    """
+    Parse the command line. "serve" selects the development server and
+    "check" builds the site and then checks its internal links; anything
+    else is a one-off build, e.g. `main.py /portfolio-static-site/`.
+    """
+    # argparse is only needed for the CLI, not by importers of this module
+    import argparse
+    from compress import MIN_SIZE
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--content", default=CONTENT_DIR, metavar="DIR",
+                        help="markdown source directory (default: content/)")
+    common.add_argument("--static", default=STATIC_DIR, metavar="DIR",
+                        help="static asset directory (default: static/)")
+    common.add_argument("--template", default=TEMPLATE_PATH, metavar="FILE",
+                        help="page template (default: template.html)")
+    common.add_argument("--output", default=OUTPUT_DIR, metavar="DIR",
+                        help="output directory (default: docs/)")
+    level = common.add_mutually_exclusive_group()
+    level.add_argument("-q", "--quiet", dest="level", action="store_const", const="quiet",
+                       default="summary", help="only report errors")
+    level.add_argument("-v", "--verbose", dest="level", action="store_const", const="verbose",
+                       help="report every page and build step")
+    common.add_argument("--log-format", choices=("text", "json"), default="text",
+                        help="json writes one JSON object per line (default: text)")
+    common.add_argument("--site-url", default="", metavar="URL",
+                        help="absolute site URL, e.g. https://example.com; feed.xml and sitemap.xml "
+                             "are only written with it")
+    common.add_argument("--minify", action="store_true",
+                        help="minify the template and CSS files from the static directory")
+    common.add_argument("--image-widths", type=parse_widths, default=(), metavar="W,W,...",
+                        help="write downscaled image variants of these widths (needs Pillow)")
+    common.add_argument("--fingerprint", action="store_true",
+                        help="publish static assets under content-hashed names")
+    common.add_argument("--search", action="store_true",
+                        help="write a client-side search index under search/")
+    common.add_argument("--no-cache", action="store_true",
+                        help="parse every page instead of using the parse cache")
+    common.add_argument("--cache-size", type=int, default=DEFAULT_MAX_BYTES >> 20, metavar="MB",
+                        help="parse cache size limit in MiB (default: %(default)s)")
 
+    if argv and argv[0] == "serve":
+        parser = argparse.ArgumentParser(
+            prog="main.py serve", parents=[common],
+            description="Build the site and serve it over HTTP.")
+        parser.add_argument("basepath", nargs="?", default="/")
+        parser.add_argument("--port", type=int, default=8888)
+        parser.add_argument("--watch", action="store_true",
+                            help="rebuild changed files while serving")
+        parser.add_argument("--interval", type=float, default=0.2,
+                            help="seconds between change polls (default: 0.2)")
+        args = parser.parse_args(argv[1:])
+        args.command = "serve"
+        return args
 
-def main():
-    # Get basepath from CLI argument, default to "/"
-    basepath = sys.argv[1] if len(sys.argv) > 1 else "/"
-    print(f"Building site with basepath: {basepath}")
+    command = "build"
+    if argv and argv[0] == "check":
+        command = "check"
+        argv = argv[1:]
+    parser = argparse.ArgumentParser(
+        prog="main.py check" if command == "check" else "main.py", parents=[common],
+        description="Build the site, then report links and images that point at "
+                    "nothing the build produced." if command == "check" else
+                    "Build the static site (use 'main.py serve -h' for the dev server "
+                    "and 'main.py check -h' for the link checker).")
+    parser.add_argument("basepath", nargs="?", default="/",
+                        help='root URL the site is served from (default: "/")')
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="worker processes for page generation (default: 1)")
+    parser.add_argument("--checksum", action="store_true",
+                        help="hash every static file instead of trusting size and mtime")
+    parser.add_argument("--link-static", action="store_true",
+                        help="hardlink static files into the output where possible")
+    parser.add_argument("--output-archive", metavar="FILE",
+                        help="stream the site into a .tar or .zip file instead of the "
+                             "output directory")
+    parser.add_argument("--precompress", action="store_true",
+                        help="write .gz siblings (and .br with brotli installed) of text outputs")
+    parser.add_argument("--compress-min-size", type=int, default=MIN_SIZE, metavar="BYTES",
+                        help="smallest file to precompress (default: %(default)s)")
+    parser.add_argument("--report", action="store_true",
+                        help="print time per build stage and the slowest pages")
+    parser.add_argument("--slowest", type=int, default=10, metavar="N",
+                        help="pages listed by --report (default: 10)")
+    parser.add_argument("--stats", metavar="FILE",
+                        help="write per-page timings and byte counts as JSON lines")
+    parser.add_argument("--profile", metavar="FILE",
+                        help="run the build under cProfile and dump the stats to FILE")
+    args = parser.parse_args(argv)
+    if args.output_archive:
+        from archive import is_archive
+        if not is_archive(args.output_archive):
+            parser.error(f"--output-archive: unsupported archive type: {args.output_archive} "
+                         "(use .tar or .zip)")
+    args.command = command
+    return args
 
-    # Copy static files to docs directory
-    source_dir = os.path.join(os.path.dirname(__file__), "..", "static")
-    destination_dir = os.path.join(os.path.dirname(__file__), "..", "docs")
 
-    print(f"Copying from {source_dir} to {destination_dir}")
-    copy_directory(source_dir, destination_dir)
-    print("Copy complete!")
+def main(argv=None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    log = BuildLog(LEVELS[args.level], json_lines=args.log_format == "json")
+    options = {
+        "content_dir": args.content,
+        "static_dir": args.static,
+        "template_path": args.template,
+        "cache": not args.no_cache,
+        "cache_max_bytes": args.cache_size << 20,
+        "log": log,
+        "site_url": args.site_url,
+        "minify": args.minify,
+        "image_widths": args.image_widths,
+        "fingerprint": args.fingerprint,
+        "search": args.search,
+    }
 
-    # Generate HTML pages from all markdown files in content directory
-    content_dir = os.path.join(os.path.dirname(__file__), "..", "content")
-    template_path = os.path.join(
-        os.path.dirname(__file__), "..", "template.html")
-    docs_dir = os.path.join(os.path.dirname(__file__), "..", "docs")
+    if args.command == "serve":
+        from server import serve
+        serve(port=args.port, watch=args.watch, interval=args.interval,
+              basepath=args.basepath, output_dir=args.output, **options)
+        return
 
-    print(f"Generating pages from {content_dir}")
-    generate_pages_recursive(content_dir, template_path, docs_dir, basepath)
-    print("Page generation complete!")
+    report = BuildReport() if args.report or args.stats else None
+    profiler = None
+    if args.profile:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+    try:
+        manifest = build_site(args.basepath, args.jobs, output_dir=args.output,
+                              checksum=args.checksum, link_static=args.link_static,
+                              report=report, precompress=args.precompress,
+                              compress_min_size=args.compress_min_size,
+                              archive_path=args.output_archive, **options)
+    except PageGenerationError as e:
+        for content_path, error in e.failures:
+            log.error(content_path, error)
+        sys.exit(1)
+    finally:
+        if profiler is not None:
+            # Pool workers aren't profiled; use --jobs 1 to see page generation
+            profiler.disable()
+            profiler.dump_stats(args.profile)
+        if report is not None:
+            if args.stats:
+                report.write_json(args.stats)
+            if args.report:
+                for line in report.summary_lines(args.slowest):
+                    log.info(line)
+                log.flush()
 
+    if args.command == "check":
+        from linkcheck import find_broken_links
+        broken = find_broken_links(manifest, args.content)
+        for source, line, url in broken:
+            log.error(f"{source}:{line}", f"broken link to {url}")
+        log.info(f"Checked the links of {len(manifest.pages)} page(s): {len(broken)} broken")
+        log.flush()
+        if broken:
+            sys.exit(1)
 
-main()
+# Guarded so process pool workers can import this module without building
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import hashlib
+import json
+import os
+
+MANIFEST_VERSION = 5
+
+
+def hash_bytes(data):
+    """Return the hex digest used for every manifest entry."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_file(path):
+    """Hash a file in fixed-size chunks so large assets never load fully."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def manifest_path_for(output_dir):
+    """
+    Return the manifest location for an output directory.
+    The manifest lives next to the output (e.g. docs/ -> .docs-manifest.json)
+    so that it is never published with the site.
+    """
+    output_dir = os.path.abspath(output_dir)
+    name = os.path.basename(output_dir.rstrip(os.sep))
+    return os.path.join(os.path.dirname(output_dir), f".{name}-manifest.json")
+
+
+def remove_output(path, root):
+    """Delete a generated file and prune any directories it leaves empty."""
+    if os.path.exists(path):
+        os.remove(path)
+    root = os.path.abspath(root)
+    parent = os.path.dirname(os.path.abspath(path))
+    while parent != root and parent.startswith(root + os.sep):
+        if os.listdir(parent):
+            break
+        os.rmdir(parent)
+        parent = os.path.dirname(parent)
+
+
+class Manifest:
+    """
+    Record of the inputs that produced the current output directory.
+    Pages and static files are keyed by their path relative to the source
+    directory and map to {"hash": ..., "output": ...}; page entries also
+    keep the page's front-matter metadata under "meta" and the (url, line)
+    of each of its links and images under "links", with a digest of the
+    image attributes and fingerprinted URLs those refer to under
+    "resources". Outputs built from
+    the site index (listings, feed, sitemap) are keyed by output path in
+    generated, compressed maps each precompressed output to its siblings and
+    images records the dimensions and downscaled variants of static images.
+    assets records the asset manifest written when static files are
+    fingerprinted, whose names are then the "output" of their static entries.
+    search holds the state of the search index (see search.SearchIndexer).
+    """
+
+    def __init__(self, path, data=None):
+        data = data or {}
+        self.path = path
+        self.template = data.get("template")
+        self.basepath = data.get("basepath")
+        self.pages = data.get("pages", {})
+        self.static = data.get("static", {})
+        self.generated = data.get("generated", {})
+        self.compressed = data.get("compressed", {})
+        self.images = data.get("images", {})
+        self.assets = data.get("assets", {})
+        self.search = data.get("search", {})
+
+    @classmethod
+    def load(cls, path):
+        """Load a manifest, treating a missing or stale file as empty."""
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return cls(path)
+        if not isinstance(data, dict) or data.get("version") != MANIFEST_VERSION:
+            return cls(path)
+        return cls(path, data)
+
+    def is_empty(self):
+        return not self.pages and not self.static
+
+    def to_dict(self):
+        return {
+            "version": MANIFEST_VERSION,
+            "template": self.template,
+            "basepath": self.basepath,
+            "pages": self.pages,
+            "static": self.static,
+            "generated": self.generated,
+            "compressed": self.compressed,
+            "images": self.images,
+            "assets": self.assets,
+            "search": self.search,
+        }
+
+    def save(self):
+        """Write the manifest atomically so an interrupted build can't corrupt it."""
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.to_dict(), f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,112 @@
+import re
+
+from manifest import hash_bytes
+
+# Whitespace next to these tags never renders, so it can be dropped;
+# between other (inline) tags it is collapsed to a single space
+BLOCK_TAGS = frozenset((
+    "!doctype", "html", "head", "body", "title", "meta", "link", "style", "script",
+    "article", "aside", "blockquote", "div", "footer", "header", "main", "nav",
+    "section", "p", "ul", "ol", "li", "h1", "h2", "h3", "h4", "h5", "h6",
+    "table", "thead", "tbody", "tr", "th", "td", "pre", "hr", "br", "form",
+))
+
+# A raw element (kept whole), a comment or a tag
+HTML_TOKEN_PATTERN = re.compile(
+    r"<(pre|textarea|script|style)\b[^>]*>.*?</\1\s*>|<!--.*?-->|<[^>]*>", re.S | re.I)
+TAG_NAME_PATTERN = re.compile(r"</?\s*([!\w-]+)")
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+CSS_TOKEN_PATTERN = re.compile(r"(\"(?:\\.|[^\"\\])*\"|'(?:\\.|[^'\\])*')|/\*.*?\*/", re.S)
+CSS_PUNCTUATION_PATTERN = re.compile(r"\s*([{};,>])\s*")
+
+
+def _tag_name(tag):
+    match = TAG_NAME_PATTERN.match(tag)
+    return match.group(1).lower() if match else ""
+
+
+def _tokens(html):
+    """Split html into alternating text and markup tokens, starting with text."""
+    tokens = []
+    last = 0
+    for match in HTML_TOKEN_PATTERN.finditer(html):
+        tokens.append(html[last:match.start()])
+        tokens.append(match.group(0))
+        last = match.end()
+    tokens.append(html[last:])
+    return tokens
+
+
+def minify_html(html):
+    """
+    Remove comments and formatting whitespace from HTML. Whitespace runs are
+    collapsed to one space, and dropped entirely next to block-level tags.
+    pre, textarea, script and style elements are left untouched.
+    """
+    tokens = _tokens(html)
+    out = []
+    for index, token in enumerate(tokens):
+        if index % 2:
+            if not (token.startswith("<!--") and not token.startswith("<!--[if")):
+                out.append(token)
+            continue
+        text = WHITESPACE_PATTERN.sub(" ", token)
+        previous = _tag_name(tokens[index - 1]) if index else "html"
+        following = _tag_name(tokens[index + 1]) if index + 1 < len(tokens) else "html"
+        if previous in BLOCK_TAGS:
+            text = text.lstrip()
+        if following in BLOCK_TAGS:
+            text = text.rstrip()
+        # A dropped comment leaves the text on both sides of it adjacent
+        if text.startswith(" ") and out and out[-1].endswith(" "):
+            text = text[1:]
+        if text:
+            out.append(text)
+    return "".join(out)
+
+
+def _squeeze_css(css):
+    css = WHITESPACE_PATTERN.sub(" ", css)
+    css = CSS_PUNCTUATION_PATTERN.sub(r"\1", css)
+    return css.replace(": ", ":").replace(";}", "}")
+
+
+def minify_css(css):
+    """
+    Remove comments and redundant whitespace from a stylesheet. Strings are
+    kept as written; a comment counts as whitespace, as in CSS itself.
+    """
+    out = []
+    pending = []
+    last = 0
+    for match in CSS_TOKEN_PATTERN.finditer(css):
+        pending.append(css[last:match.start()])
+        if match.group(1):
+            out.append(_squeeze_css("".join(pending)))
+            out.append(match.group(1))
+            pending = []
+        else:
+            pending.append(" ")
+        last = match.end()
+    pending.append(css[last:])
+    out.append(_squeeze_css("".join(pending)))
+    return "".join(out).strip()
+
+
+MINIFIERS = {".css": minify_css, ".html": minify_html}
+# Minified output by (suffix, content hash), so a file is minified once per change
+_cache = {}
+CACHE_ENTRIES = 256
+
+
+def minify_bytes(data, suffix):
+    """Return the minified form of UTF-8 data for a file with the given suffix."""
+    key = (suffix, hash_bytes(data))
+    cached = _cache.get(key)
+    if cached is None:
+        if len(_cache) >= CACHE_ENTRIES:
+            _cache.clear()
+        cached = MINIFIERS[suffix](data.decode("utf-8")).encode("utf-8")
+        _cache[key] = cached
+    return cached
@@ -0,0 +1,187 @@
+import os
+from collections import deque
+from contextlib import contextmanager
+
+from manifest import hash_bytes, hash_file, remove_output
+
+# Background threads writing outputs while the next one is rendered
+WRITER_THREADS = 4
+# Writes queued before write() waits for the oldest, so rendered pages
+# never pile up in memory faster than the disk takes them
+MAX_PENDING = 256
+
+
+def is_identical(path, data):
+    """Whether the file at path already holds data: sizes are compared first, then hashes."""
+    try:
+        if os.path.getsize(path) != len(data):
+            return False
+    except OSError:
+        return False
+    return hash_file(path) == hash_bytes(data)
+
+
+@contextmanager
+def staged_output(path, tmp_path=None):
+    """
+    Yield a temporary path (by default path + ".tmp") to write the new
+    content of path to, creating its directory. The temporary file is
+    removed again when the block raises; moving it into place is left to
+    the caller.
+    """
+    if tmp_path is None:
+        tmp_path = f"{path}.tmp"
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    try:
+        yield tmp_path
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+@contextmanager
+def atomic_output(path, tmp_path=None):
+    """Like staged_output, but rename the temporary file over path once the block completes."""
+    with staged_output(path, tmp_path) as tmp_path:
+        yield tmp_path
+        os.replace(tmp_path, path)
+
+
+def write_atomic(path, data):
+    """
+    Write data to path via a temporary file and an atomic rename, unless
+    the file already holds exactly data. Returns whether it was written.
+    """
+    if is_identical(path, data):
+        return False
+    with atomic_output(path) as tmp_path:
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+    return True
+
+
+def replace_if_changed(tmp_path, path):
+    """
+    Rename a fully written temporary file over path, or drop it when path
+    already has the same content. Returns whether path was replaced.
+    """
+    try:
+        identical = (os.path.getsize(tmp_path) == os.path.getsize(path)
+                     and hash_file(tmp_path) == hash_file(path))
+    except OSError:
+        identical = False
+    if identical:
+        os.remove(tmp_path)
+        return False
+    os.replace(tmp_path, path)
+    return True
+
+
+def process_pool(jobs):
+    """
+    A ProcessPoolExecutor with jobs workers that are not forked from this
+    process: forking while writer threads run can copy a lock one of them
+    holds into the child, where nothing ever releases it.
+    """
+    # Imported lazily: multiprocessing dominates startup time otherwise
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return ProcessPoolExecutor(max_workers=jobs, mp_context=multiprocessing.get_context(method))
+
+
+class OutputWriter:
+    """
+    Writes the outputs of a build under root. Content identical to the file
+    already there is not rewritten, so unchanged outputs keep their mtime;
+    anything else goes to a temporary file that is renamed into place.
+    With threads > 0 the writes run on a pool of background threads while
+    the caller renders the next output; flush() waits for them and raises
+    the first error. written, skipped and deleted count the outcomes.
+    """
+
+    def __init__(self, root, threads=WRITER_THREADS):
+        self.root = root
+        self.threads = threads
+        self.written = 0
+        self.skipped = 0
+        self.deleted = 0
+        self._executor = None
+        self._pending = deque()
+
+    def _count(self, written):
+        if written is None:
+            return
+        if written:
+            self.written += 1
+        else:
+            self.skipped += 1
+
+    def _submit(self, func, *args):
+        if self.threads <= 0:
+            self._count(func(*args))
+            return
+        if self._executor is None:
+            # Imported lazily, like the process pool
+            from concurrent.futures import ThreadPoolExecutor
+            self._executor = ThreadPoolExecutor(max_workers=self.threads)
+        pending = self._pending
+        pending.append(self._executor.submit(func, *args))
+        while pending and (len(pending) > MAX_PENDING or pending[0].done()):
+            self._count(pending.popleft().result())
+
+    def write(self, path, data):
+        """Write bytes to path unless it already holds them."""
+        self._submit(write_atomic, path, data)
+
+    def commit(self, tmp_path, path):
+        """Move a temporary file written by the caller over path unless identical."""
+        self._submit(replace_if_changed, tmp_path, path)
+
+    def remove(self, path):
+        """Delete an output that is no longer produced, pruning empty directories."""
+        # A queued write may be about to create a file in a directory pruned here
+        self.flush()
+        if os.path.exists(path):
+            self.deleted += 1
+        remove_output(path, self.root)
+
+    def flush(self):
+        """Wait for every queued write."""
+        while self._pending:
+            self._count(self._pending.popleft().result())
+
+    def close(self):
+        """Wait for the queued writes and stop the threads."""
+        try:
+            self.flush()
+        finally:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+
+class OutputBatch:
+    """
+    Records writes instead of performing them, so that a pool worker can
+    hand its outputs back to the parent's OutputWriter.
+    """
+    __slots__ = ("outputs",)
+
+    def __init__(self):
+        self.outputs = []
+
+    def write(self, path, data):
+        self.outputs.append((path, data, None))
+
+    def commit(self, tmp_path, path):
+        self.outputs.append((path, None, tmp_path))
+
+    def replay(self, writer):
+        """Perform the recorded writes with writer."""
+        for path, data, tmp_path in self.outputs:
+            if tmp_path is None:
+                writer.write(path, data)
+            else:
+                writer.commit(tmp_path, path)
@@ -0,0 +1,307 @@
+import heapq
+import json
+import os
+import re
+from itertools import chain, groupby
+
+from output import OutputWriter
+
+SEARCH_DIR = "search"
+INDEX_FILE = "index.json"
+TERMS_DIR = "terms"
+DOCS_DIR = "docs"
+# Shards hold the terms sharing their first PREFIX_LENGTH characters, or
+# one more character for each prefix that was split
+PREFIX_LENGTH = 2
+# A shard whose file would be larger than this is split
+MAX_SHARD_BYTES = 64 * 1024
+# docs/<n>.json holds the URL and title of documents n * DOCS_PER_SHARD onwards
+DOCS_PER_SHARD = 500
+TERM_PATTERN = re.compile(r"\b\w{2,32}\b")
+# Postings held in memory before they are merged into the shard files
+MAX_BUFFERED_POSTINGS = 1 << 20
+
+
+def add_terms(text, terms):
+    """Count the search terms of text into terms, a Counter."""
+    terms.update(TERM_PATTERN.findall(text.lower()))
+
+
+def _text_values(node, values):
+    if node.value:
+        values.append(node.value)
+    elif isinstance(node.children, list):
+        for child in node.children:
+            _text_values(child, values)
+
+
+def collect_terms(node, terms):
+    """Count the terms of all the text in node's subtree into terms. Returns node."""
+    values = []
+    _text_values(node, values)
+    add_terms(" ".join(values), terms)
+    return node
+
+
+def shard_for(term, split=()):
+    """The shard holding term: its PREFIX_LENGTH-character prefix, extended while that was split."""
+    length = PREFIX_LENGTH
+    while len(term) > length and term[:length] in split:
+        length += 1
+    return term[:length]
+
+
+def _dump(data):
+    return json.dumps(data, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+
+class SearchIndexer:
+    """
+    Maintains an inverted index of the site, sharded by term prefix into
+    search/terms/<prefix>.json files ({term: [[doc, frequency], ...]}).
+    The URL and title of each document are in search/docs/<n>.json, by
+    document id in blocks of DOCS_PER_SHARD, and search/index.json holds
+    the prefixes that were split. A browser fetches index.json, then only
+    the shards of the terms it looks up and of the documents they list, so
+    no file it needs grows with the site: a shard that outgrows
+    MAX_SHARD_BYTES is split into shards one character longer, keeping
+    only the term equal to its prefix.
+
+    The index is updated in place: add() buffers the postings of a new or
+    rebuilt page (dropping those it had before), remove() drops the postings
+    of a deleted page from the shards it appeared in, and once
+    MAX_BUFFERED_POSTINGS are buffered they are merged into their shards,
+    so memory stays bounded however large the site is. The state needed for
+    this (document ids and the shards of each page) is kept in the build
+    manifest. finish() writes what is left. Files are written and removed
+    through writer (an output.OutputWriter) when one is given.
+
+    With spill_dir, which is meant for clean builds whose outputs can only
+    be written once (e.g. into an archive), full buffers are instead
+    written to run files there, sorted by shard, and finish() merges the
+    runs one shard at a time, so memory stays just as bounded.
+    """
+
+    def __init__(self, output_dir, manifest, max_postings=MAX_BUFFERED_POSTINGS, writer=None,
+                 spill_dir=None, max_shard_bytes=MAX_SHARD_BYTES):
+        self.directory = os.path.join(output_dir, SEARCH_DIR)
+        self.manifest = manifest
+        self.max_postings = max_postings
+        self.max_shard_bytes = max_shard_bytes
+        self.writer = OutputWriter(output_dir, threads=0) if writer is None else writer
+        state = manifest.search
+        self.next_doc = state.get("next_doc", 0)
+        self.pages = dict(state.get("pages", {}))
+        self.docs = dict(state.get("docs", {}))
+        self.shards = set(state.get("shards", ()))
+        self.split = set(state.get("split", ()))
+        self.removed = {}
+        self.buffer = {}
+        self.buffered = 0
+        self.changed = False
+        self.changed_docs = set()
+        self.written = 0
+        self.spill_dir = spill_dir
+        self.runs = []
+
+    def intact(self):
+        """Whether every file the manifest knows about is still on disk."""
+        return all(os.path.exists(os.path.join(self.directory, os.path.relpath(output, SEARCH_DIR)))
+                   for output in search_outputs(self.manifest))
+
+    def _path(self, shard):
+        return os.path.join(self.directory, TERMS_DIR, f"{shard}.json")
+
+    def remove(self, key):
+        """Schedule the postings of the page with source key for removal."""
+        page = self.pages.pop(key, None)
+        if page is None:
+            return
+        doc, shards = page
+        for shard in shards.split():
+            self.removed.setdefault(shard, set()).add(doc)
+        self.docs.pop(str(doc), None)
+        self.changed_docs.add(doc // DOCS_PER_SHARD)
+        self.changed = True
+
+    def add(self, key, url, title, terms):
+        """Index a page's terms (term -> frequency) under its URL and title."""
+        old = self.pages.get(key)
+        if old is not None:
+            self.remove(key)
+            doc = old[0]
+        else:
+            doc = self.next_doc
+            self.next_doc += 1
+        shards = set()
+        for term, count in terms.items():
+            shard = shard_for(term, self.split)
+            shards.add(shard)
+            self.buffer.setdefault(shard, {}).setdefault(term, []).append([doc, count])
+        self.buffered += len(terms)
+        self.pages[key] = [doc, " ".join(sorted(shards))]
+        self.docs[str(doc)] = [url, title]
+        self.changed_docs.add(doc // DOCS_PER_SHARD)
+        self.changed = True
+        if self.buffered >= self.max_postings:
+            self.flush()
+
+    def _store(self, shard, index):
+        """
+        Write the index of a shard, or remove its file when the index is
+        empty. An index too large for one file is split by the character
+        after the prefix, recursively.
+        """
+        data = _dump(index)
+        if len(data) > self.max_shard_bytes and len(index) > 1:
+            self.split.add(shard)
+            children = {}
+            for term in [term for term in index if len(term) > len(shard)]:
+                children.setdefault(term[:len(shard) + 1], {})[term] = index.pop(term)
+            self._move_pages(shard, index, children)
+            for child in sorted(children):
+                self._store(child, children[child])
+            data = _dump(index)
+        if index:
+            self.writer.write(self._path(shard), data)
+            self.shards.add(shard)
+        elif shard in self.shards:
+            self.writer.remove(self._path(shard))
+            self.shards.discard(shard)
+        self.written += 1
+
+    def _move_pages(self, shard, index, children):
+        """Record which of the new shards of a split one each page now appears in."""
+        holders = {}
+        for name, part in chain([(shard, index)], children.items()):
+            for postings in part.values():
+                for doc, _ in postings:
+                    holders.setdefault(doc, set()).add(name)
+        for page in self.pages.values():
+            names = holders.get(page[0])
+            if names is not None:
+                shards = set(page[1].split())
+                shards.discard(shard)
+                page[1] = " ".join(sorted(shards | names))
+
+    def _spill(self):
+        """Write the buffered postings to a new run file, one line per shard in order."""
+        os.makedirs(self.spill_dir, exist_ok=True)
+        path = os.path.join(self.spill_dir, f"run-{len(self.runs)}.jsonl")
+        with open(path, "wb") as f:
+            for shard in sorted(self.buffer):
+                f.write(_dump([shard, self.buffer[shard]]) + b"\n")
+        self.runs.append(path)
+        self.buffer = {}
+        self.buffered = 0
+
+    def _merge_runs(self):
+        """Write each shard once from the postings spilled for it across every run."""
+        files = [open(path, "rb") for path in self.runs]
+        try:
+            lines = heapq.merge(*(map(json.loads, f) for f in files), key=lambda line: line[0])
+            for shard, parts in groupby(lines, key=lambda line: line[0]):
+                index = {}
+                for _, terms in parts:
+                    for term, postings in terms.items():
+                        # Postings of pages removed since they were spilled are dropped
+                        index.setdefault(term, []).extend(
+                            posting for posting in postings if str(posting[0]) in self.docs)
+                index = {term: sorted(postings) for term, postings in index.items() if postings}
+                if index:
+                    self._store(shard, index)
+        finally:
+            for f in files:
+                f.close()
+            for path in self.runs:
+                os.remove(path)
+            self.runs = []
+        self.removed = {}
+
+    def flush(self):
+        """Merge the buffered postings and pending removals into the shard files."""
+        if self.spill_dir is not None:
+            if self.buffer:
+                self._spill()
+            return
+        # Shards queued by an earlier flush are read back below
+        self.writer.flush()
+        for shard in sorted(self.buffer.keys() | self.removed.keys()):
+            path = self._path(shard)
+            index = {}
+            if shard in self.shards and os.path.exists(path):
+                with open(path) as f:
+                    index = json.load(f)
+            removed = self.removed.pop(shard, None)
+            if removed:
+                for term in list(index):
+                    postings = [posting for posting in index[term] if posting[0] not in removed]
+                    if postings:
+                        index[term] = postings
+                    else:
+                        del index[term]
+            for term, postings in self.buffer.get(shard, {}).items():
+                index[term] = sorted(index.get(term, []) + postings)
+            self._store(shard, index)
+        self.buffer = {}
+        self.buffered = 0
+
+    def _write_docs(self):
+        """Rewrite the document files holding a document that was added or removed."""
+        blocks = {number: {} for number in self.changed_docs}
+        for doc, entry in self.docs.items():
+            block = blocks.get(int(doc) // DOCS_PER_SHARD)
+            if block is not None:
+                block[doc] = entry
+        for number, docs in sorted(blocks.items()):
+            path = os.path.join(self.directory, DOCS_DIR, f"{number}.json")
+            if docs:
+                self.writer.write(path, _dump(docs))
+            else:
+                self.writer.remove(path)
+            self.written += 1
+        self.changed_docs = set()
+
+    def finish(self):
+        """
+        Write the remaining shards, document files and index.json, and
+        record the index in the manifest. Returns the number of files
+        written or removed.
+        """
+        self.flush()
+        if self.runs:
+            self._merge_runs()
+        self._write_docs()
+        path = os.path.join(self.directory, INDEX_FILE)
+        if self.changed or not os.path.exists(path):
+            if self.docs:
+                self.writer.write(path, _dump({"prefix_length": PREFIX_LENGTH,
+                                               "split": sorted(self.split),
+                                               "docs_per_shard": DOCS_PER_SHARD}))
+            else:
+                self.writer.remove(path)
+        self.manifest.search = {"next_doc": self.next_doc, "pages": self.pages,
+                                "docs": self.docs, "shards": sorted(self.shards),
+                                "split": sorted(self.split)}
+        return self.written
+
+
+def search_outputs(manifest):
+    """Output paths of the search index recorded in the manifest."""
+    shards = manifest.search.get("shards", ())
+    docs = manifest.search.get("docs", {})
+    if not shards and not docs:
+        return []
+    return ([os.path.join(SEARCH_DIR, INDEX_FILE)]
+            + [os.path.join(SEARCH_DIR, TERMS_DIR, f"{shard}.json") for shard in shards]
+            + [os.path.join(SEARCH_DIR, DOCS_DIR, f"{number}.json")
+               for number in sorted({int(doc) // DOCS_PER_SHARD for doc in docs})])
+
+
+def remove_search_index(output_dir, manifest, writer=None):
+    """Delete the search index recorded in the manifest."""
+    if writer is None:
+        writer = OutputWriter(output_dir, threads=0)
+    for output in search_outputs(manifest):
+        writer.remove(os.path.join(output_dir, output))
+    manifest.search = {}
@@ -0,0 +1,146 @@
+import functools
+import os
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+from buildlog import BuildLog
+from main import (
+    CONTENT_DIR,
+    OUTPUT_DIR,
+    STATIC_DIR,
+    TEMPLATE_PATH,
+    PageGenerationError,
+    build_site,
+)
+
+
+def snapshot(paths):
+    """
+    Map every file under the given files and directories to its
+    (mtime, size) pair, keyed by absolute path.
+    """
+    files = {}
+    for path in paths:
+        path = os.path.abspath(path)
+        if os.path.isfile(path):
+            stat = os.stat(path)
+            files[path] = (stat.st_mtime_ns, stat.st_size)
+            continue
+        for root, _, names in os.walk(path):
+            for name in names:
+                file_path = os.path.join(root, name)
+                try:
+                    stat = os.stat(file_path)
+                except FileNotFoundError:
+                    continue
+                files[file_path] = (stat.st_mtime_ns, stat.st_size)
+    return files
+
+
+def changed_paths(before, after):
+    """Return the paths added, removed or modified between two snapshots."""
+    changed = {path for path, signature in after.items()
+               if before.get(path) != signature}
+    changed.update(before.keys() - after.keys())
+    return changed
+
+
+class SiteWatcher:
+    """
+    Keeps the build state warm between rebuilds: modules stay imported, the
+    compiled template stays cached and the manifest stays in memory, so a
+    save only re-hashes and regenerates the files that actually changed.
+    """
+
+    def __init__(self, basepath="/", content_dir=CONTENT_DIR, static_dir=STATIC_DIR,
+                 template_path=TEMPLATE_PATH, output_dir=OUTPUT_DIR, verbose=True, log=None,
+                 **options):
+        self.basepath = basepath
+        self.log = BuildLog.for_verbose(verbose) if log is None else log
+        # Remaining build_site() keyword arguments, e.g. cache settings
+        self.options = options
+        self.content_dir = content_dir
+        self.static_dir = static_dir
+        self.template_path = template_path
+        self.output_dir = output_dir
+        self.watched = (content_dir, static_dir, template_path)
+        self.manifest = None
+        self.files = {}
+        # Set when a build stopped partway, so the next one rechecks everything
+        self.interrupted = False
+
+    def build(self, changed=None):
+        """
+        Run a (possibly partial) build, reporting errors instead of exiting,
+        so a missing template or a bad page never stops the watch loop.
+        """
+        if self.interrupted:
+            changed = None
+        self.interrupted = False
+        try:
+            self.manifest = build_site(
+                self.basepath,
+                content_dir=self.content_dir,
+                static_dir=self.static_dir,
+                template_path=self.template_path,
+                output_dir=self.output_dir,
+                manifest=self.manifest,
+                changed=changed,
+                log=self.log,
+                **self.options,
+            )
+        except PageGenerationError as e:
+            for content_path, error in e.failures:
+                self.log.error(content_path, error)
+        except Exception as e:
+            import traceback
+            self.interrupted = True
+            self.log.error("build", "".join(traceback.format_exception_only(type(e), e)).strip())
+
+    def start(self):
+        """Take the first snapshot and do a full incremental build."""
+        self.files = snapshot(self.watched)
+        self.build()
+
+    def poll(self):
+        """Rebuild whatever changed since the last poll; return the changed paths."""
+        files = snapshot(self.watched)
+        changed = changed_paths(self.files, files)
+        self.files = files
+        if changed:
+            start = time.perf_counter()
+            self.build(changed)
+            elapsed = (time.perf_counter() - start) * 1000
+            self.log.info(f"Rebuilt {len(changed)} changed file(s) in {elapsed:.1f} ms")
+            self.log.flush()
+        return changed
+
+
+def serve(port=8888, watch=False, interval=0.2, basepath="/", output_dir=OUTPUT_DIR,
+          verbose=True, **options):
+    """
+    Build the site, serve output_dir over HTTP and, with watch=True, poll the
+    sources every `interval` seconds and rebuild changes in this process.
+    """
+    watcher = SiteWatcher(basepath, output_dir=output_dir, verbose=verbose, **options)
+    watcher.start()
+
+    handler = functools.partial(
+        SimpleHTTPRequestHandler, directory=os.path.abspath(output_dir))
+    httpd = ThreadingHTTPServer(("", port), handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    watcher.log.info(f"Serving {output_dir} at http://localhost:{port}/")
+    watcher.log.flush()
+
+    try:
+        while True:
+            time.sleep(interval)
+            if watch:
+                watcher.poll()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
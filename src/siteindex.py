@@ -0,0 +1,82 @@
+import os
+
+
+def url_for(output):
+    """Root-relative URL of an output path: blog/tom/index.html -> /blog/tom/."""
+    url = "/" + output.replace(os.sep, "/")
+    if url.endswith("/index.html"):
+        url = url[:-len("index.html")]
+    return url
+
+
+class PageEntry:
+    """
+    Metadata of one generated page, as recorded in the site index, and the
+    (url, line) of every link and image in it.
+    """
+    __slots__ = ("source", "output", "meta", "links")
+
+    def __init__(self, source, output, meta, links=()):
+        self.source = source
+        self.output = output
+        self.meta = meta
+        self.links = links
+
+    @property
+    def url(self):
+        return url_for(self.output)
+
+    @property
+    def title(self):
+        return self.meta.get("title", "")
+
+    @property
+    def date(self):
+        return self.meta.get("date", "")
+
+    @property
+    def tags(self):
+        return self.meta.get("tags", [])
+
+    @property
+    def draft(self):
+        return self.meta.get("draft", False)
+
+    def __repr__(self):
+        return f"PageEntry({self.source!r}, {self.output!r}, {self.meta!r})"
+
+
+class SiteIndex:
+    """
+    In-memory metadata of every page in a build, keyed by source path
+    relative to the content directory. Pages that were not regenerated are
+    filled in from their manifest entries, so the index always covers the
+    whole site without reopening any source file.
+    """
+
+    def __init__(self, content_dir, output_dir):
+        self.content_dir = content_dir
+        self.output_dir = output_dir
+        self.pages = {}
+
+    def __len__(self):
+        return len(self.pages)
+
+    def __contains__(self, source):
+        return source in self.pages
+
+    def add(self, content_path, output_path, meta, links=()):
+        """Record the metadata of a page given its source and output paths; returns its entry."""
+        source = os.path.relpath(content_path, self.content_dir)
+        output = os.path.relpath(output_path, self.output_dir)
+        page = self.pages[source] = PageEntry(source, output, meta, links)
+        return page
+
+    def get(self, source):
+        return self.pages.get(source)
+
+    def published(self):
+        """Non-draft pages, newest first; undated pages last, by source path."""
+        pages = sorted((page for page in self.pages.values() if not page.draft),
+                       key=lambda page: page.source)
+        return sorted(pages, key=lambda page: page.date, reverse=True)
@@ -0,0 +1,185 @@
+import json
+import time
+
+STAGES = ("read", "block_split", "inline_parse", "serialize",
+          "template", "basepath_rewrite", "emit")
+
+
+class PageStats:
+    """
+    Wall time per build stage and byte counts for one page.
+    Stages nest (serializing pulls blocks, which pulls lines from the file),
+    so enter() pauses the enclosing stage and leave() resumes it; every
+    stage's time is exclusive of the stages running inside it.
+    """
+    __slots__ = ("source", "output", "times", "bytes_in", "bytes_out",
+                 "cache_hit", "_stack", "_mark")
+
+    def __init__(self, source, output=None):
+        self.source = source
+        self.output = output
+        self.times = dict.fromkeys(STAGES, 0.0)
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.cache_hit = False
+        self._stack = []
+        self._mark = 0.0
+
+    def enter(self, stage):
+        now = time.perf_counter()
+        if self._stack:
+            self.times[self._stack[-1]] += now - self._mark
+        self._stack.append(stage)
+        self._mark = now
+
+    def leave(self):
+        now = time.perf_counter()
+        self.times[self._stack.pop()] += now - self._mark
+        self._mark = now
+
+    def timed(self, stage, func):
+        """Wrap func so every call is booked to stage."""
+        def wrapper(*args):
+            self.enter(stage)
+            try:
+                return func(*args)
+            finally:
+                self.leave()
+        return wrapper
+
+    def timed_iter(self, stage, iterable):
+        """Yield from iterable, booking the time spent producing each item to stage."""
+        iterator = iter(iterable)
+        while True:
+            self.enter(stage)
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                self.leave()
+            yield item
+
+    def staged(self, stage, iterable):
+        """
+        Yield from iterable with stage entered for the whole iteration, so
+        work done by the consumer between items is booked to it as well.
+        """
+        self.enter(stage)
+        try:
+            yield from iterable
+        finally:
+            self.leave()
+
+    @property
+    def total(self):
+        return sum(self.times.values())
+
+    def to_dict(self):
+        return {
+            "source": self.source,
+            "output": self.output,
+            "total": self.total,
+            "times": self.times,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "cache_hit": self.cache_hit,
+        }
+
+    def __getstate__(self):
+        # Pool workers send stats back by pickling; the timing stack is transient
+        return (self.source, self.output, self.times, self.bytes_in,
+                self.bytes_out, self.cache_hit)
+
+    def __setstate__(self, state):
+        (self.source, self.output, self.times, self.bytes_in,
+         self.bytes_out, self.cache_hit) = state
+        self._stack = []
+        self._mark = 0.0
+
+
+class TimedWriter:
+    """File-like wrapper that books every write() to the emit stage."""
+
+    def __init__(self, fp, stats):
+        self.fp = fp
+        self.stats = stats
+
+    def write(self, data):
+        self.stats.enter("emit")
+        try:
+            return self.fp.write(data)
+        finally:
+            self.stats.leave()
+
+
+def read_lines(fp, stats, chunk_size=1 << 16):
+    """
+    Yield the lines of a text file, reading it in chunks booked to the read
+    stage. Lines are yielded without their trailing newline.
+    """
+    pending = ""
+    while True:
+        stats.enter("read")
+        try:
+            chunk = fp.read(chunk_size)
+        finally:
+            stats.leave()
+        if not chunk:
+            break
+        lines = (pending + chunk).split("\n")
+        pending = lines.pop()
+        yield from lines
+    if pending:
+        yield pending
+
+
+class BuildReport:
+    """Collects PageStats for a build and summarizes where the time went."""
+
+    def __init__(self):
+        self.pages = []
+
+    def add(self, stats):
+        self.pages.append(stats)
+
+    def stage_totals(self):
+        totals = dict.fromkeys(STAGES, 0.0)
+        for stats in self.pages:
+            for stage, seconds in stats.times.items():
+                totals[stage] += seconds
+        return totals
+
+    def slowest(self, count=10):
+        return sorted(self.pages, key=lambda stats: stats.total, reverse=True)[:count]
+
+    def summary_lines(self, count=10):
+        """Human-readable summary: totals, time per stage and the slowest pages."""
+        if not self.pages:
+            return ["No pages generated."]
+        totals = self.stage_totals()
+        total = sum(totals.values()) or 1e-12
+        bytes_in = sum(stats.bytes_in for stats in self.pages)
+        bytes_out = sum(stats.bytes_out for stats in self.pages)
+        hits = sum(1 for stats in self.pages if stats.cache_hit)
+        lines = [
+            f"{len(self.pages)} page(s), {bytes_in} bytes in, {bytes_out} bytes out, "
+            f"{hits} parse cache hit(s), {total * 1000:.1f} ms in page stages",
+            "Time per stage:",
+        ]
+        for stage, seconds in sorted(totals.items(), key=lambda item: -item[1]):
+            lines.append(f"  {stage:<17}{seconds * 1000:10.1f} ms {seconds / total:7.1%}")
+        lines.append(f"Slowest {min(count, len(self.pages))} page(s):")
+        for stats in self.slowest(count):
+            stage, seconds = max(stats.times.items(), key=lambda item: item[1])
+            lines.append(f"  {stats.total * 1000:8.1f} ms  {stats.source} "
+                         f"({stats.bytes_in} bytes, mostly {stage})")
+        return lines
+
+    def write_json(self, path):
+        """Write one JSON object per page, then a final totals object."""
+        with open(path, "w") as f:
+            for stats in self.pages:
+                f.write(json.dumps(stats.to_dict(), sort_keys=True) + "\n")
+            f.write(json.dumps({"totals": self.stage_totals(),
+                                "pages": len(self.pages)}, sort_keys=True) + "\n")
@@ -0,0 +1,222 @@
+import os
+import shutil
+
+from assets import fingerprint_name, is_fingerprinted
+from manifest import hash_bytes, hash_file
+from minify import minify_bytes
+from output import OutputWriter, atomic_output
+from search import search_outputs
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+# ioctl request number for a copy-on-write clone (Linux: btrfs, XFS, ...)
+FICLONE = 0x40049409
+# Static files minified while copying when minify=True
+MINIFIED_SUFFIXES = (".css",)
+# Files at least this large are copied in-kernel with os.sendfile
+SENDFILE_THRESHOLD = 1 << 20
+
+
+def _reflink(source, destination):
+    """Clone source into destination without copying data; False if unsupported."""
+    if fcntl is None:
+        return False
+    with open(source, "rb") as src, open(destination, "wb") as dst:
+        try:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        except OSError:
+            return False
+    return True
+
+
+def _sendfile(source, destination, size):
+    """Copy a large file in-kernel; False if os.sendfile can't be used here."""
+    if not hasattr(os, "sendfile"):
+        return False
+    with open(source, "rb") as src, open(destination, "wb") as dst:
+        offset = 0
+        try:
+            while offset < size:
+                sent = os.sendfile(dst.fileno(), src.fileno(), offset, size - offset)
+                if sent == 0:
+                    break
+                offset += sent
+        except OSError:
+            return False
+    return offset == size
+
+
+def copy_file(source, destination, link=False):
+    """
+    Copy source to destination via a temporary file and an atomic rename.
+    Tries, in order: a hardlink (only when link=True, since the output then
+    shares its inode with the source), a copy-on-write reflink, os.sendfile
+    for large files, and finally shutil.copy2. Returns the method used.
+    """
+    with atomic_output(destination) as tmp_path:
+        # Left over by an interrupted build, it would make os.link fail
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        method = None
+        if link:
+            try:
+                os.link(source, tmp_path)
+                method = "hardlink"
+            except OSError:
+                pass
+        if method is None and _reflink(source, tmp_path):
+            method = "reflink"
+        if method is None:
+            size = os.path.getsize(source)
+            if size >= SENDFILE_THRESHOLD and _sendfile(source, tmp_path, size):
+                method = "sendfile"
+        if method is None:
+            shutil.copyfile(source, tmp_path)
+            method = "copy"
+        if method != "hardlink":
+            shutil.copystat(source, tmp_path)
+    return method
+
+
+def write_minified(source, destination, data):
+    """Write minified data for source to destination atomically, keeping its mtime."""
+    with atomic_output(destination) as tmp_path:
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        shutil.copystat(source, tmp_path)
+
+
+def sync_directory(source, destination, manifest, changed=None, checksum=False, link=False,
+                   minify=False, fingerprint=False, archive=None, writer=None):
+    """
+    Copy only the static files that changed since the last build.
+    A file whose size and mtime match its manifest entry is considered
+    unchanged without being read; otherwise (or always, with checksum=True)
+    its content hash decides. Files recorded in the manifest whose source is
+    gone are removed from the destination; generated pages living in the
+    same directory are left alone. If changed is a set of paths, other files
+    already in the manifest are trusted without being checked at all.
+    With minify=True, stylesheets are minified on the way; toggling it
+    recopies them. With fingerprint=True, assets are written under a
+    content-hashed name (see assets.fingerprint_name) and the old name is
+    removed when their content changes. With an archive.ArchiveWriter,
+    files are added to the archive instead of being copied to destination.
+    Outputs are removed through writer (an output.OutputWriter) when one is
+    given. Returns the number of files copied.
+    """
+    if writer is None:
+        writer = OutputWriter(destination, threads=0)
+    seen = {}
+    copied = 0
+    for root, dirs, files in os.walk(source):
+        dirs.sort()
+        for name in sorted(files):
+            source_path = os.path.join(root, name)
+            key = os.path.relpath(source_path, source)
+            suffix = os.path.splitext(name)[1].lower()
+            minified = minify and suffix in MINIFIED_SUFFIXES
+            fingerprinted = fingerprint and is_fingerprinted(key)
+            entry = manifest.static.get(key)
+            if entry and (entry.get("minified", False) != minified
+                          or entry.get("fingerprinted", False) != fingerprinted):
+                entry = None
+            if changed is not None and entry and os.path.abspath(source_path) not in changed:
+                seen[key] = entry
+                continue
+
+            stat = os.stat(source_path)
+            destination_path = os.path.join(destination, entry["output"] if entry else key)
+            exists = os.path.exists(destination_path)
+            if (not checksum and entry and exists
+                    and entry.get("size") == stat.st_size
+                    and entry.get("mtime") == stat.st_mtime_ns):
+                seen[key] = entry
+                continue
+
+            if minified:
+                with open(source_path, "rb") as f:
+                    data = f.read()
+                digest = hash_bytes(data)
+            else:
+                digest = hash_file(source_path)
+            output = key
+            if fingerprinted:
+                # Named after the published content, which minifying changes
+                published = hash_bytes(minify_bytes(data, suffix)) if minified else digest
+                output = fingerprint_name(key, published)
+                if entry and entry["output"] != output:
+                    entry = None
+                destination_path = os.path.join(destination, output)
+                exists = os.path.exists(destination_path)
+            if entry and exists:
+                up_to_date = entry["hash"] == digest
+            elif minified:
+                # Compare the minified form with what's on disk
+                minified_data = minify_bytes(data, suffix)
+                up_to_date = (exists
+                              and os.path.getsize(destination_path) == len(minified_data)
+                              and hash_file(destination_path) == hash_bytes(minified_data))
+            else:
+                # No record (e.g. first build): compare with what's on disk
+                up_to_date = (exists
+                              and os.path.getsize(destination_path) == stat.st_size
+                              and hash_file(destination_path) == digest)
+            if not up_to_date:
+                if archive is not None:
+                    if minified:
+                        archive.write(destination_path, minify_bytes(data, suffix))
+                    else:
+                        archive.copy(source_path, destination_path)
+                elif minified:
+                    # Memoized by content hash: never minified twice
+                    write_minified(source_path, destination_path, minify_bytes(data, suffix))
+                else:
+                    copy_file(source_path, destination_path, link)
+                copied += 1
+            seen[key] = {"hash": digest, "output": output,
+                         "size": stat.st_size, "mtime": stat.st_mtime_ns}
+            if minified:
+                seen[key]["minified"] = True
+            if fingerprinted:
+                seen[key]["fingerprinted"] = True
+
+    # Remove outputs whose source file no longer exists, or that were renamed
+    outputs = {entry["output"] for entry in seen.values()}
+    for key, entry in manifest.static.items():
+        if entry["output"] not in outputs:
+            writer.remove(os.path.join(destination, entry["output"]))
+    manifest.static = seen
+    return copied
+
+
+def remove_untracked(destination, manifest, writer=None):
+    """
+    Delete files in destination that the manifest doesn't account for.
+    Used after a build that started without a manifest, in place of wiping
+    the output directory up front, so unchanged files are never rewritten.
+    Files are removed through writer (an output.OutputWriter) when one is
+    given. Returns the number of files removed.
+    """
+    if writer is None:
+        writer = OutputWriter(destination, threads=0)
+    tracked = {entry["output"] for entry in manifest.static.values()}
+    tracked.update(entry["output"] for entry in manifest.pages.values())
+    tracked.update(entry["output"] for entry in manifest.generated.values())
+    if manifest.assets:
+        tracked.add(manifest.assets["output"])
+    tracked.update(search_outputs(manifest))
+    for entry in manifest.compressed.values():
+        tracked.update(entry["outputs"])
+    for entry in manifest.images.values():
+        tracked.update(output for output, _ in entry["variants"])
+    removed = 0
+    for root, _, files in os.walk(destination, topdown=False):
+        for name in files:
+            path = os.path.join(root, name)
+            if os.path.relpath(path, destination) not in tracked:
+                writer.remove(path)
+                removed += 1
+    return removed
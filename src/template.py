@@ -0,0 +1,112 @@
+import os
+import re
+
+PLACEHOLDER_PATTERN = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+URL_ATTRIBUTES = ("href", "src")
+URL_ATTRIBUTE_PATTERN = re.compile(r'\b(href|src)="([^"]*)"')
+
+_template_cache = {}
+
+
+def rewrite_url(url, basepath="/", assets=None, page_url=None):
+    """
+    Prefix a root-relative URL with the basepath; leave other URLs alone.
+    With an AssetMap, static files are first mapped to their fingerprinted
+    URL; relative ones too when the URL of the page they are on is given.
+    """
+    if assets is not None:
+        url = assets.resolve(url, page_url)
+    if basepath != "/" and url.startswith("/"):
+        return basepath + url[1:]
+    return url
+
+
+def rewrite_basepath(html, basepath="/", assets=None):
+    """Rewrite root-relative href and src attributes in a chunk of HTML."""
+    if assets is not None:
+        return URL_ATTRIBUTE_PATTERN.sub(
+            lambda match: f'{match.group(1)}="{rewrite_url(match.group(2), basepath, assets)}"',
+            html)
+    if basepath == "/":
+        return html
+    for attribute in URL_ATTRIBUTES:
+        html = html.replace(f'{attribute}="/', f'{attribute}="{basepath}')
+    return html
+
+
+class Template:
+    """
+    An HTML template compiled once into literal and placeholder segments.
+    Placeholders look like {{ Name }}. The basepath rewrite is applied to the
+    literal segments at compile time, so rendering is a single join; so is
+    the mapping of static files to fingerprinted URLs when assets is given.
+    """
+
+    def __init__(self, source, basepath="/", assets=None):
+        self.basepath = basepath
+        self.parts = []
+        self.slots = []
+        last_index = 0
+        for match in PLACEHOLDER_PATTERN.finditer(source):
+            self.parts.append(rewrite_basepath(
+                source[last_index:match.start()], basepath, assets))
+            self.slots.append((len(self.parts), match.group(1)))
+            self.parts.append("")
+            last_index = match.end()
+        self.parts.append(rewrite_basepath(source[last_index:], basepath, assets))
+
+    @classmethod
+    def load(cls, path, basepath="/", minify=False, assets=None):
+        with open(path, "r") as f:
+            source = f.read()
+        if minify:
+            from minify import minify_bytes
+            source = minify_bytes(source.encode("utf-8"), ".html").decode("utf-8")
+        return cls(source, basepath, assets)
+
+    @property
+    def placeholders(self):
+        return [name for _, name in self.slots]
+
+    def render(self, values):
+        """Fill every placeholder from values; missing names render empty."""
+        parts = self.parts.copy()
+        for index, name in self.slots:
+            value = values.get(name, "")
+            parts[index] = value if isinstance(value, str) else "".join(value)
+        return "".join(parts)
+
+    def iter_render(self, values):
+        """
+        Yield the rendered page as chunks. A value may be a string or an
+        iterable of string chunks (e.g. HTMLNode.iter_html()), which is
+        streamed through without being joined; iterables are consumed once.
+        """
+        slots = dict(self.slots)
+        for index, part in enumerate(self.parts):
+            name = slots.get(index)
+            if name is None:
+                if part:
+                    yield part
+                continue
+            value = values.get(name, "")
+            if isinstance(value, str):
+                yield value
+            else:
+                yield from value
+
+
+def load_template(path, basepath="/", minify=False, assets=None):
+    """
+    Return the compiled template for path, reading and parsing the file only
+    when it is first requested or has changed on disk since. With
+    minify=True, comments and formatting whitespace are stripped first.
+    """
+    key = (os.path.abspath(path), basepath, minify, assets.digest if assets else None)
+    stat = os.stat(path)
+    signature = (stat.st_mtime_ns, stat.st_size)
+    cached = _template_cache.get(key)
+    if cached is None or cached[0] != signature:
+        cached = (signature, Template.load(path, basepath, minify, assets))
+        _template_cache[key] = cached
+    return cached[1]
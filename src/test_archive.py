@@ -0,0 +1,133 @@
+import os
+import tarfile
+import tempfile
+import unittest
+import zipfile
+
+from archive import ARCHIVE_MTIME, FILE_MODE, ArchiveWriter
+from buildlog import QUIET, BuildLog
+from fixtures import write_file
+from main import PageGenerationError, build_site
+
+TEMPLATE = "<title>{{ Title }}</title><body>{{ Content }}</body>"
+
+
+class TestArchiveWriter(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = self._tmp.name
+        self.staging = os.path.join(self.root, "staging")
+        self.static = os.path.join(self.root, "style.css")
+        write_file(self.static, "body { color: red }\n" * 100)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def write_archive(self, name, compress_min_size=None):
+        path = os.path.join(self.root, name)
+        writer = ArchiveWriter(path, self.staging, compress_min_size)
+        writer.copy(self.static, os.path.join(self.staging, "style.css"))
+        writer.write(os.path.join(self.staging, "index.html"), b"<p>home</p>")
+        tmp_path = os.path.join(self.staging, "big", "index.html.tmp")
+        write_file(tmp_path, "<p>big</p>")
+        writer.commit(tmp_path, os.path.join(self.staging, "big", "index.html"))
+        writer.close()
+        self.assertFalse(os.path.exists(tmp_path))
+        self.assertEqual(writer.written, 2)
+        with open(path, "rb") as f:
+            return f.read()
+
+    def test_tar_entries_are_ordered_and_normalized(self):
+        data = self.write_archive("site.tar")
+        with tarfile.open(os.path.join(self.root, "site.tar")) as tar:
+            members = tar.getmembers()
+            self.assertEqual([member.name for member in members],
+                             ["style.css", "index.html", "big/index.html"])
+            self.assertEqual({(member.mtime, member.mode, member.uid) for member in members},
+                             {(ARCHIVE_MTIME, FILE_MODE, 0)})
+            self.assertEqual(tar.extractfile("big/index.html").read(), b"<p>big</p>")
+        self.assertEqual(self.write_archive("site.tar"), data)
+
+    def test_zip_is_reproducible_and_precompressed(self):
+        data = self.write_archive("site.zip", compress_min_size=1024)
+        with zipfile.ZipFile(os.path.join(self.root, "site.zip")) as archive:
+            names = archive.namelist()
+            self.assertEqual(names[:2], ["style.css", "style.css.gz"])
+            self.assertNotIn("index.html.gz", names)
+            self.assertEqual(archive.read("index.html"), b"<p>home</p>")
+            self.assertEqual({info.date_time for info in archive.infolist()},
+                             {(1980, 1, 1, 0, 0, 0)})
+        self.assertEqual(self.write_archive("site.zip", compress_min_size=1024), data)
+
+    def test_creates_parent_directory(self):
+        path = os.path.join(self.root, "out", "site.tar")
+        writer = ArchiveWriter(path, self.staging)
+        writer.write(os.path.join(self.staging, "index.html"), b"<p>home</p>")
+        writer.close()
+        self.assertTrue(tarfile.is_tarfile(path))
+
+    def test_lost_temporary_archive_is_an_error(self):
+        path = os.path.join(self.root, "site.zip")
+        writer = ArchiveWriter(path, self.staging)
+        os.remove(f"{path}.tmp")
+        with self.assertRaises(FileNotFoundError):
+            writer.close()
+        self.assertFalse(os.path.exists(path))
+
+    def test_unsupported_type(self):
+        with self.assertRaises(ValueError):
+            ArchiveWriter(os.path.join(self.root, "site.rar"), self.staging)
+
+
+class TestBuildIntoArchive(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = self._tmp.name
+        self.content = os.path.join(self.root, "content")
+        self.static = os.path.join(self.root, "static")
+        self.docs = os.path.join(self.root, "docs")
+        self.template = os.path.join(self.root, "template.html")
+        write_file(self.template, TEMPLATE)
+        write_file(os.path.join(self.content, "index.md"), "# Home\n\n[a](/blog/a/)")
+        write_file(os.path.join(self.content, "blog", "a", "index.md"), "# Post A")
+        write_file(os.path.join(self.static, "index.css"), "body {}")
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def build(self, archive_path, jobs=1):
+        return build_site("/", jobs, content_dir=self.content, static_dir=self.static,
+                          template_path=self.template, output_dir=self.docs, log=BuildLog(QUIET), site_url="https://example.com", search=True,
+                          archive_path=archive_path)
+
+    def test_output_directory_is_never_written(self):
+        path = os.path.join(self.root, "site.tar")
+        self.build(path)
+        self.assertFalse(os.path.exists(self.docs))
+        self.assertFalse(os.path.exists(os.path.join(self.root, ".docs-manifest.json")))
+        with tarfile.open(path) as tar:
+            names = tar.getnames()
+        self.assertEqual(names[:3], ["index.css", "blog/a/index.html", "index.html"])
+        self.assertIn("search/index.json", names)
+        self.assertIn("sitemap.xml", names)
+        with open(path, "rb") as f:
+            first = f.read()
+        self.build(path, jobs=2)
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), first)
+
+    def test_failed_build_keeps_previous_archive(self):
+        path = os.path.join(self.root, "site.zip")
+        self.build(path)
+        with open(path, "rb") as f:
+            before = f.read()
+        write_file(os.path.join(self.content, "bad.md"), "# Bad\n\nbroken `code")
+        with self.assertRaises(PageGenerationError):
+            self.build(path)
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), before)
+        self.assertFalse(os.path.exists(f"{path}.tmp"))
+
+
+if __name__ == "__main__":
+    unittest.main()
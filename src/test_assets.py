@@ -0,0 +1,59 @@
+import json
+import os
+import tempfile
+import unittest
+
+from assets import AssetMap, fingerprint_name, is_fingerprinted, write_asset_manifest
+from manifest import Manifest
+
+
+class TestAssetMap(unittest.TestCase):
+    def test_fingerprint_name(self):
+        self.assertEqual(fingerprint_name("index.css", "3f9a1c8e77"), "index.3f9a1c8e.css")
+        self.assertEqual(fingerprint_name(os.path.join("images", "a.png"), "00ff00ff"),
+                         os.path.join("images", "a.00ff00ff.png"))
+        self.assertTrue(is_fingerprinted("images/A.PNG"))
+        self.assertFalse(is_fingerprinted("favicon.ico"))
+
+    def test_from_static_skips_unrenamed_files(self):
+        assets = AssetMap.from_static({
+            "index.css": {"hash": "h", "output": "index.3f9a1c8e.css"},
+            "CNAME": {"hash": "h", "output": "CNAME"},
+        })
+        self.assertEqual(assets.urls, {"/index.css": "/index.3f9a1c8e.css"})
+        self.assertEqual(assets.resolve("/index.css#top"), "/index.3f9a1c8e.css#top")
+        self.assertEqual(assets.resolve("/CNAME"), "/CNAME")
+        self.assertNotEqual(assets.digest, AssetMap({}).digest)
+
+    def test_relative_urls_resolve_from_the_page(self):
+        assets = AssetMap({"/index.css": "/index.3f9a1c8e.css",
+                           "/images/tom.png": "/images/tom.66709e99.png"})
+        self.assertEqual(assets.resolve("images/tom.png"), "images/tom.png")
+        self.assertEqual(assets.resolve("images/tom.png?x", "/"), "images/tom.66709e99.png?x")
+        self.assertEqual(assets.resolve("../../index.css", "/blog/tom/"),
+                         "../../index.3f9a1c8e.css")
+        self.assertEqual(assets.resolve("../images/tom.png", "/blog/tom.html"),
+                         "../images/tom.66709e99.png")
+        self.assertEqual(assets.resolve("images/tom.png", "/blog/tom.html"), "images/tom.png")
+        self.assertEqual(assets.resolve("tom.png", "/images/"), "tom.66709e99.png")
+        self.assertEqual(assets.resolve("mailto:images/tom.png", "/"), "mailto:images/tom.png")
+
+
+class TestAssetManifest(unittest.TestCase):
+    def test_written_on_change_and_removed(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            manifest = Manifest(os.path.join(tmp, "m.json"))
+            path = os.path.join(tmp, "asset-manifest.json")
+            write_asset_manifest(tmp, AssetMap({"/a.css": "/a.1.css"}), manifest)
+            with open(path) as f:
+                self.assertEqual(json.load(f), {"/a.css": "/a.1.css"})
+            os.utime(path, ns=(0, 0))
+            write_asset_manifest(tmp, AssetMap({"/a.css": "/a.1.css"}), manifest)
+            self.assertEqual(os.stat(path).st_mtime_ns, 0)
+            write_asset_manifest(tmp, None, manifest)
+            self.assertFalse(os.path.exists(path))
+            self.assertEqual(manifest.assets, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
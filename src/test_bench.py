@@ -0,0 +1,39 @@
+import random
+import unittest
+
+from bench import CORPORA, bench_startup, compare
+from textnode import markdown_to_html_node
+
+
+class TestCompare(unittest.TestCase):
+    def test_flags_only_lower_is_better_regressions(self):
+        baseline = {"results": {"build": {"full_build_s": 1.0, "pages_per_s": 100.0,
+                                          "pages": 10}}}
+        current = {"results": {"build": {"full_build_s": 1.5, "pages_per_s": 50.0,
+                                         "pages": 20}}}
+        self.assertEqual(compare(baseline, current),
+                         [("build", "full_build_s", 1.0, 1.5)])
+
+    def test_within_threshold_and_new_metrics_pass(self):
+        baseline = {"results": {"build": {"full_build_s": 1.0}}}
+        current = {"results": {"build": {"full_build_s": 1.05, "noop_rebuild_s": 9.0},
+                               "memory": {"rss_peak_kib": 1}}}
+        self.assertEqual(compare(baseline, current), [])
+
+
+class TestCorpora(unittest.TestCase):
+    def test_corpora_parse(self):
+        for name, make_corpus in CORPORA.items():
+            blocks = make_corpus(random.Random(0), 2000)
+            node = markdown_to_html_node("\n\n".join(blocks))
+            self.assertGreaterEqual(len(node.children), len(blocks), msg=name)
+
+
+class TestStartupBudget(unittest.TestCase):
+    def test_import_main_within_budget(self):
+        results = bench_startup(repeat=5)
+        self.assertTrue(results["within_budget"], results)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+import io
+import json
+import unittest
+
+from buildlog import QUIET, SUMMARY, VERBOSE, BuildLog
+
+
+def make_log(level, **kwargs):
+    stream, errors = io.StringIO(), io.StringIO()
+    return BuildLog(level, stream, error_stream=errors, **kwargs), stream, errors
+
+
+class TestBuildLog(unittest.TestCase):
+    def test_verbose_lists_every_page(self):
+        log, stream, _ = make_log(VERBOSE)
+        log.page("a.md", "a.html")
+        log.page("b.md", "b.html", error="ValueError: boom")
+        log.flush()
+        self.assertEqual(stream.getvalue().splitlines(), [
+            "Generating page from a.md",
+            "Page generated at a.html",
+            "Generating page from b.md",
+            "Failed to generate b.md: ValueError: boom",
+        ])
+
+    def test_output_is_buffered_until_flush(self):
+        log, stream, _ = make_log(VERBOSE, interval=60)
+        log.detail("step")
+        self.assertEqual(stream.getvalue(), "")
+        log.flush()
+        self.assertEqual(stream.getvalue(), "step\n")
+
+    def test_summary_level_prints_progress_and_summary_only(self):
+        log, stream, _ = make_log(SUMMARY, interval=0)
+        log.start_pages(2)
+        log.detail("hidden")
+        log.page("a.md", "a.html")
+        log.page("b.md", "b.html")
+        log.count("copied", 3)
+        log.count("written", 2)
+        log.count("skipped", 1)
+        log.summary()
+        lines = stream.getvalue().splitlines()
+        self.assertEqual(lines[:2], ["Generating pages: 1/2 (50%), 0 failed",
+                                     "Generating pages: 2/2 (100%), 0 failed"])
+        self.assertTrue(lines[-1].startswith(
+            "Built 2 page(s) (0 failed, 0 unchanged), copied 3 static file(s) in "))
+        self.assertTrue(lines[-1].endswith(
+            "; wrote 2 output(s), skipped 1 identical, deleted 0"))
+
+    def test_quiet_only_reports_errors(self):
+        log, stream, errors = make_log(QUIET)
+        log.info("hidden")
+        log.page("a.md", "a.html")
+        log.summary()
+        log.error("b.md", "No heading found")
+        self.assertEqual(stream.getvalue(), "")
+        self.assertEqual(errors.getvalue(), "error: b.md: No heading found\n")
+
+    def test_json_lines(self):
+        log, stream, errors = make_log(VERBOSE, json_lines=True)
+        log.page("a.md", "a.html")
+        log.error("b.md", "boom")
+        log.summary()
+        events = [json.loads(line) for line in stream.getvalue().splitlines()]
+        self.assertEqual(events[0], {"event": "page", "source": "a.md",
+                                     "output": "a.html", "status": "ok"})
+        self.assertEqual(events[1]["event"], "error")
+        self.assertEqual(events[2]["event"], "summary")
+        self.assertEqual(events[2]["generated"], 1)
+        self.assertEqual(errors.getvalue(), "")
+
+    def test_begin_resets_counters(self):
+        log, _, _ = make_log(QUIET)
+        log.page("a.md", "a.html")
+        log.begin()
+        self.assertEqual(log.counts["generated"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
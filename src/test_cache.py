@@ -0,0 +1,91 @@
+import os
+import tempfile
+import unittest
+
+from cache import ParseCache, cache_dir_for, data_to_node, node_to_data
+from main import generate_page
+from textnode import markdown_to_html_node
+
+MARKDOWN = """# Title
+
+Some **bold** text and a [link](/blog) with ![img](/a.png).
+
+- one
+- two
+"""
+
+
+class TestSerialization(unittest.TestCase):
+    def test_round_trip(self):
+        node = markdown_to_html_node(MARKDOWN)
+        restored = data_to_node(node_to_data(node))
+        self.assertEqual(restored.to_html(), node.to_html())
+
+    def test_restored_link_props_are_shared(self):
+        node = markdown_to_html_node("[a](/x) [b](/x)")
+        restored = data_to_node(node_to_data(node))
+        first, _, second = restored.children[0].children
+        self.assertIs(first.props, second.props)
+
+
+class TestParseCache(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.cache = ParseCache(os.path.join(self._tmp.name, "cache"))
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_cache_dir_is_next_to_output(self):
+        self.assertEqual(cache_dir_for("/site/docs"), "/site/.docs-cache")
+
+    def test_get_put(self):
+        key = self.cache.key(MARKDOWN)
+        self.assertIsNone(self.cache.get(key))
+        self.cache.put(key, "Title", markdown_to_html_node(MARKDOWN))
+        title, node, links = self.cache.get(key)
+        self.assertEqual(title, "Title")
+        self.assertEqual(node.to_html(), markdown_to_html_node(MARKDOWN).to_html())
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_key_depends_on_source(self):
+        self.assertNotEqual(self.cache.key("# a"), self.cache.key("# b"))
+
+    def test_prune_evicts_least_recently_used(self):
+        keys = [self.cache.key(f"# Page {i}") for i in range(3)]
+        for index, key in enumerate(keys):
+            self.cache.put(key, f"Page {index}", markdown_to_html_node(f"# Page {index}"))
+            path = os.path.join(self.cache.directory, key[:2], key)
+            os.utime(path, ns=(index * 10**9, index * 10**9))
+        # Reading the oldest entry makes it the most recently used
+        self.cache.get(keys[0])
+        entry_size = os.path.getsize(os.path.join(self.cache.directory, keys[1][:2], keys[1]))
+        self.cache.max_bytes = entry_size * 2
+        self.assertEqual(self.cache.prune(), 1)
+        self.assertIsNone(self.cache.get(keys[1]))
+        self.assertIsNotNone(self.cache.get(keys[0]))
+
+
+class TestGeneratePageWithCache(unittest.TestCase):
+    def test_basepath_change_reuses_parsed_tree(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            source = os.path.join(tmp, "index.md")
+            template = os.path.join(tmp, "template.html")
+            with open(source, "w") as f:
+                f.write(MARKDOWN)
+            with open(template, "w") as f:
+                f.write("{{ Title }}{{ Content }}")
+            cache = ParseCache(os.path.join(tmp, "cache"))
+            uncached = os.path.join(tmp, "plain.html")
+            cached = os.path.join(tmp, "cached.html")
+
+            generate_page(source, template, cached, "/", verbose=False, cache=cache)
+            generate_page(source, template, cached, "/site/", verbose=False, cache=cache)
+            generate_page(source, template, uncached, "/site/", verbose=False)
+            self.assertEqual((cache.hits, cache.misses), (1, 1))
+            with open(cached) as a, open(uncached) as b:
+                self.assertEqual(a.read(), b.read())
+
+
+if __name__ == "__main__":
+    unittest.main()
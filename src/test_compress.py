@@ -0,0 +1,84 @@
+import gzip
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import compress
+from compress import precompress_outputs, remove_compressed
+from manifest import Manifest
+from sync import remove_untracked
+
+PAGE = "<p>" + "hobbit " * 400 + "</p>"
+
+
+class TestPrecompress(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.docs = os.path.join(self._tmp.name, "docs")
+        os.makedirs(os.path.join(self.docs, "blog"))
+        self.write("index.html", PAGE)
+        self.write("blog/post.html", PAGE + "post")
+        self.write("tiny.css", "a{}")
+        self.write("image.png", "x" * 4096)
+        self.manifest = Manifest(os.path.join(self._tmp.name, "manifest.json"))
+        patcher = mock.patch.object(compress, "brotli", None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def write(self, name, text):
+        with open(os.path.join(self.docs, name), "w") as f:
+            f.write(text)
+
+    def path(self, name):
+        return os.path.join(self.docs, name)
+
+    def test_compresses_large_text_outputs_only(self):
+        self.assertEqual(precompress_outputs(self.docs, self.manifest, jobs=2), 2)
+        with gzip.open(self.path("index.html.gz"), "rt") as f:
+            self.assertEqual(f.read(), PAGE)
+        self.assertFalse(os.path.exists(self.path("tiny.css.gz")))
+        self.assertFalse(os.path.exists(self.path("image.png.gz")))
+
+    def test_output_is_deterministic(self):
+        precompress_outputs(self.docs, self.manifest)
+        with open(self.path("index.html.gz"), "rb") as f:
+            first = f.read()
+        os.remove(self.path("index.html.gz"))
+        precompress_outputs(self.docs, self.manifest)
+        with open(self.path("index.html.gz"), "rb") as f:
+            self.assertEqual(f.read(), first)
+
+    def test_unchanged_files_are_skipped(self):
+        precompress_outputs(self.docs, self.manifest)
+        self.assertEqual(precompress_outputs(self.docs, self.manifest), 0)
+        # Same content rewritten: mtime changes, hash doesn't
+        self.write("index.html", PAGE)
+        os.utime(self.path("index.html"), ns=(1, 1))
+        self.assertEqual(precompress_outputs(self.docs, self.manifest), 0)
+        self.write("index.html", PAGE + "edited")
+        self.assertEqual(precompress_outputs(self.docs, self.manifest), 1)
+
+    def test_stale_siblings_are_removed(self):
+        precompress_outputs(self.docs, self.manifest)
+        os.remove(self.path("blog/post.html"))
+        self.write("index.html", "short")
+        precompress_outputs(self.docs, self.manifest)
+        self.assertFalse(os.path.exists(self.path("index.html.gz")))
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "blog")))
+        self.assertEqual(self.manifest.compressed, {})
+
+    def test_siblings_are_tracked_and_removable(self):
+        precompress_outputs(self.docs, self.manifest)
+        self.manifest.pages = {"index.md": {"hash": "", "output": "index.html"}}
+        remove_untracked(self.docs, self.manifest)
+        self.assertTrue(os.path.exists(self.path("index.html.gz")))
+        remove_compressed(self.docs, self.manifest)
+        self.assertFalse(os.path.exists(self.path("index.html.gz")))
+
+
+if __name__ == "__main__":
+    unittest.main()
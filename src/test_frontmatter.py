@@ -0,0 +1,43 @@
+import unittest
+
+from frontmatter import parse_value, split_front_matter
+
+
+class TestFrontMatter(unittest.TestCase):
+    def test_parses_metadata_and_leaves_body(self):
+        lines = ["---", "title: \"Tom: a mistake\"", "date: 2024-05-01",
+                 "tags: [tolkien, essays]", "draft: true", "---", "# Body", "", "text"]
+        meta, rest = split_front_matter(lines)
+        self.assertEqual(meta, {"title": "Tom: a mistake", "date": "2024-05-01",
+                                "tags": ["tolkien", "essays"], "draft": True})
+        self.assertEqual(list(rest), ["# Body", "", "text"])
+
+    def test_block_list_and_comma_tags(self):
+        meta, _ = split_front_matter(["---", "tags:", "  - a", "  - b", "aliases: x, y", "---"])
+        self.assertEqual(meta["tags"], ["a", "b"])
+        meta, _ = split_front_matter(["---", "tags: a, b", "---"])
+        self.assertEqual(meta["tags"], ["a", "b"])
+
+    def test_without_front_matter_nothing_is_consumed(self):
+        meta, rest = split_front_matter(iter(["# Title", "body"]))
+        self.assertEqual(meta, {"tags": [], "draft": False})
+        self.assertEqual(list(rest), ["# Title", "body"])
+        meta, rest = split_front_matter([])
+        self.assertEqual(list(rest), [])
+
+    def test_invalid_front_matter(self):
+        with self.assertRaises(ValueError):
+            split_front_matter(["---", "title: x"])
+        with self.assertRaises(ValueError):
+            split_front_matter(["---", "no colon", "---"])
+        with self.assertRaises(ValueError):
+            split_front_matter(["---", "date: May 1st", "---"])
+
+    def test_parse_value(self):
+        self.assertEqual(parse_value("'quoted'"), "quoted")
+        self.assertEqual(parse_value("No"), False)
+        self.assertEqual(parse_value("[]"), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
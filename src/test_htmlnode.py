@@ -1,6 +1,7 @@
+import io
 import unittest
 
-from htmlnode import LeafNode, ParentNode
+from htmlnode import LeafNode, ParentNode, write_chunks
 
 
 class TestLeafNode(unittest.TestCase):
@@ -13,6 +14,20 @@ class TestLeafNode(unittest.TestCase):
         self.assertEqual(
             node.to_html(), '<a href="https://example.com">link</a>')
 
+    def test_to_html_rewrites_urls(self):
+        node = LeafNode("img", "", {"src": "/a.png", "alt": "/a.png"})
+        self.assertEqual(
+            node.to_html(lambda url: "/site" + url),
+            '<img src="/site/a.png" alt="/a.png"></img>',
+        )
+
+    def test_to_html_rewrites_srcset_urls(self):
+        node = LeafNode("img", "", {"src": "/a.png", "srcset": "/a-480w.png 480w, /a.png 960w"})
+        self.assertEqual(
+            node.to_html(lambda url: "/site" + url),
+            '<img src="/site/a.png" srcset="/site/a-480w.png 480w, /site/a.png 960w"></img>',
+        )
+
     def test_to_html_without_value_raises(self):
         node = LeafNode("p", None)  # type: ignore
         with self.assertRaises(ValueError):
@@ -58,5 +73,48 @@ class TestParentNode(unittest.TestCase):
         self.assertEqual(parent_node.to_html(), "<div></div>")
 
 
+class TestStreamingHtml(unittest.TestCase):
+    def test_iter_html_chunks_join_to_html(self):
+        node = ParentNode("div", [
+            ParentNode("p", [LeafNode(None, "a "), LeafNode("b", "bold")]),
+            LeafNode("a", "x", {"href": "/y"}),
+        ])
+        chunks = list(node.iter_html())
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(
+            "".join(chunks), '<div><p>a <b>bold</b></p><a href="/y">x</a></div>')
+
+    def test_write_html_to_file_object(self):
+        node = ParentNode("ul", [ParentNode("li", [LeafNode(None, str(i))])
+                                 for i in range(3)])
+        out = io.StringIO()
+        node.write_html(out, lambda url: url)
+        self.assertEqual(
+            out.getvalue(), "<ul><li>0</li><li>1</li><li>2</li></ul>")
+
+    def test_deep_nesting_does_not_recurse(self):
+        node = LeafNode(None, "deep")
+        for _ in range(5000):
+            node = ParentNode("span", [node])
+        html = node.to_html()
+        self.assertTrue(html.startswith("<span><span>"))
+        self.assertIn("deep", html)
+
+    def test_nested_invalid_child_raises(self):
+        node = ParentNode("div", [ParentNode("p", None)])  # type: ignore
+        with self.assertRaises(ValueError):
+            node.to_html()
+
+    def test_write_chunks_batches_writes(self):
+        writes = []
+
+        class Recorder:
+            def write(self, data):
+                writes.append(data)
+
+        write_chunks(Recorder(), ["ab", "cd", "ef"], buffer_size=4)
+        self.assertEqual(writes, ["abcd", "ef"])
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,133 @@
+import os
+import struct
+import tempfile
+import unittest
+import zlib
+from types import MappingProxyType
+from unittest import mock
+
+import images
+from htmlnode import LeafNode, ParentNode
+from images import annotate_images, image_size, image_table, process_images
+from manifest import Manifest
+from sync import remove_untracked
+
+
+def png_bytes(width, height):
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return (b"\x89PNG\r\n\x1a\n" + struct.pack(">I", len(header)) + b"IHDR" + header
+            + struct.pack(">I", zlib.crc32(b"IHDR" + header)))
+
+
+def jpeg_bytes(width, height):
+    app0 = b"JFIF\x00" + b"\x00" * 9
+    sof = struct.pack(">BHHB", 8, height, width, 3) + b"\x00" * 9
+    return (b"\xff\xd8"
+            + b"\xff\xe0" + struct.pack(">H", len(app0) + 2) + app0
+            + b"\xff\xc0" + struct.pack(">H", len(sof) + 2) + sof
+            + b"\xff\xd9")
+
+
+class TestImageSize(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def write(self, name, data):
+        path = os.path.join(self._tmp.name, name)
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def test_png(self):
+        self.assertEqual(image_size(self.write("a.png", png_bytes(1100, 438))), (1100, 438))
+
+    def test_jpeg(self):
+        self.assertEqual(image_size(self.write("a.jpg", jpeg_bytes(640, 480))), (640, 480))
+
+    def test_unknown_or_truncated(self):
+        self.assertIsNone(image_size(self.write("a.png", b"not an image")))
+        self.assertIsNone(image_size(self.write("b.jpg", jpeg_bytes(640, 480)[:20])))
+
+
+class TestAnnotateImages(unittest.TestCase):
+    def test_adds_attributes_without_touching_shared_props(self):
+        props = MappingProxyType({"src": "/images/a.png", "alt": "A"})
+        image = LeafNode("img", "", props)
+        other = LeafNode("img", "", {"src": "/elsewhere.png", "alt": ""})
+        node = ParentNode("p", [image, LeafNode(None, " and "), other])
+        table = {"/images/a.png": {"width": "800", "height": "600", "loading": "lazy"}}
+        annotate_images(node, table)
+        self.assertEqual(
+            node.to_html(),
+            '<p><img src="/images/a.png" alt="A" width="800" height="600" loading="lazy"></img>'
+            ' and <img src="/elsewhere.png" alt=""></img></p>',
+        )
+        self.assertEqual(dict(props), {"src": "/images/a.png", "alt": "A"})
+
+    def test_srcset_lists_variants_then_original(self):
+        table = image_table({"images/a.png": {"width": 1200, "height": 600,
+                                              "variants": [["images/a-480w.png", 480]]}})
+        self.assertEqual(table["/images/a.png"]["srcset"],
+                         "/images/a-480w.png 480w, /images/a.png 1200w")
+
+
+class TestProcessImages(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.static = os.path.join(self._tmp.name, "static")
+        self.docs = os.path.join(self._tmp.name, "docs")
+        os.makedirs(os.path.join(self.static, "images"))
+        os.makedirs(os.path.join(self.docs, "images"))
+        self.write("images/a.png", png_bytes(1200, 600))
+        self.write("images/b.jpg", jpeg_bytes(300, 200))
+        self.write("index.css", b"body{}")
+        self.manifest = Manifest(os.path.join(self._tmp.name, "manifest.json"))
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def write(self, name, data):
+        with open(os.path.join(self.static, name), "wb") as f:
+            f.write(data)
+
+    def fake_resize(self, source, destination, width):
+        with open(destination, "wb") as f:
+            f.write(b"variant")
+
+    def test_reads_dimensions_once(self):
+        table, count = process_images(self.static, self.docs, self.manifest)
+        self.assertEqual(count, 2)
+        self.assertEqual(table["/images/a.png"],
+                         {"width": "1200", "height": "600", "loading": "lazy"})
+        self.assertEqual(table["/images/b.jpg"]["width"], "300")
+        with mock.patch.object(images, "image_size") as image_size:
+            again, count = process_images(self.static, self.docs, self.manifest)
+        image_size.assert_not_called()
+        self.assertEqual((again, count), (table, 0))
+        self.write("images/a.png", png_bytes(1000, 500))
+        table, count = process_images(self.static, self.docs, self.manifest)
+        self.assertEqual((table["/images/a.png"]["width"], count), ("1000", 1))
+
+    def test_variants_are_written_and_cleaned_up(self):
+        with mock.patch.object(images, "Image", object()), \
+                mock.patch.object(images, "resize_image", self.fake_resize):
+            table, _ = process_images(self.static, self.docs, self.manifest, (480, 960))
+            self.assertEqual(table["/images/a.png"]["srcset"],
+                             "/images/a-480w.png 480w, /images/a-960w.png 960w, "
+                             "/images/a.png 1200w")
+            self.assertNotIn("srcset", table["/images/b.jpg"])
+            remove_untracked(self.docs, self.manifest)
+            self.assertTrue(os.path.exists(os.path.join(self.docs, "images", "a-480w.png")))
+            process_images(self.static, self.docs, self.manifest, (480,))
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "images", "a-960w.png")))
+        os.remove(os.path.join(self.static, "images", "a.png"))
+        process_images(self.static, self.docs, self.manifest)
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "images", "a-480w.png")))
+        self.assertEqual(list(self.manifest.images), ["images/b.jpg"])
+
+
+if __name__ == "__main__":
+    unittest.main()
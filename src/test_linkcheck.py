@@ -0,0 +1,114 @@
+import os
+import tempfile
+import unittest
+
+from buildlog import QUIET, BuildLog
+from linkcheck import find_broken_links
+from main import build_site, parse_page
+from manifest import Manifest
+
+
+def page_links(markdown):
+    links = []
+    _, html_node = parse_page(markdown.split("\n"), links=links)
+    html_node.to_html()
+    return links
+
+
+class TestCollectLinks(unittest.TestCase):
+    def test_links_and_images_with_lines(self):
+        markdown = (
+            "---\ntitle: Links\n---\n"
+            "# Heading with [a link](/one)\n\n"
+            "Some text\nand ![an image](/images/a.png) on line 7\n\n"
+            "- [item](two/)\n- [other](/three#part)\n"
+        )
+        self.assertEqual(page_links(markdown), [
+            ("/one", 4), ("/images/a.png", 7), ("two/", 9), ("/three#part", 10),
+        ])
+
+    def test_lines_without_front_matter(self):
+        self.assertEqual(page_links("# Title\n\n\n[x](/x)"), [("/x", 4)])
+
+
+class TestFindBrokenLinks(unittest.TestCase):
+    def setUp(self):
+        self.manifest = Manifest("m.json")
+        self.manifest.pages = {
+            "index.md": {"output": "index.html", "links": []},
+            "blog/tom/index.md": {"output": os.path.join("blog", "tom", "index.html"),
+                                  "links": []},
+            "contact.md": {"output": "contact.html", "links": []},
+        }
+        self.manifest.static = {"index.css": {"output": "index.0123abcd.css"}}
+        self.manifest.generated = {"feed.xml": {"output": "feed.xml"}}
+
+    def check(self, *urls):
+        self.manifest.pages["blog/tom/index.md"]["links"] = [
+            [url, line] for line, url in enumerate(urls, 1)]
+        return [url for _, _, url in find_broken_links(self.manifest)]
+
+    def test_valid_targets(self):
+        self.assertEqual(self.check(
+            "/", "/blog/tom/", "/blog/tom", "/contact", "/contact.html", "/index.css",
+            "/index.0123abcd.css", "/feed.xml?x=1", "../../", "./", "../tom/#top", "#top",
+            "https://example.com/missing", "mailto:a@b.c", "//cdn.example.com/x.js",
+            "../../index.css",
+        ), [])
+
+    def test_broken_targets(self):
+        self.assertEqual(self.check(
+            "/blog/tomm", "/images/missing.png", "../../../escape", "other/",
+        ), ["/blog/tomm", "/images/missing.png", "../../../escape", "other/"])
+
+    def test_reports_source_and_line(self):
+        self.manifest.pages["index.md"]["links"] = [["/a", 3], ["/b", 1]]
+        self.assertEqual(find_broken_links(self.manifest, "content"), [
+            (os.path.join("content", "index.md"), 1, "/b"),
+            (os.path.join("content", "index.md"), 3, "/a"),
+        ])
+
+
+class TestCheckFingerprintedBuild(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = self._tmp.name
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def write(self, name, text):
+        path = os.path.join(self.root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(text)
+
+    def test_relative_link_to_fingerprinted_asset(self):
+        self.write("template.html", "<title>{{ Title }}</title>{{ Content }}")
+        self.write(os.path.join("static", "images", "tom.svg"), "<svg></svg>")
+        self.write(os.path.join("content", "index.md"),
+                   "# Home\n\n![t](images/tom.svg)\n\n![t](/images/tom.svg)")
+        content = os.path.join(self.root, "content")
+        manifest = build_site("/", 1, content_dir=content,
+                              static_dir=os.path.join(self.root, "static"),
+                              template_path=os.path.join(self.root, "template.html"),
+                              output_dir=os.path.join(self.root, "docs"), log=BuildLog(QUIET),
+                              cache=False, fingerprint=True)
+        self.assertNotIn("tom.svg", os.listdir(os.path.join(self.root, "docs", "images")))
+        with open(os.path.join(self.root, "docs", "index.html")) as f:
+            html = f.read()
+        self.assertIn('src="images/tom.', html)
+        self.assertNotIn('src="images/tom.svg"', html)
+        self.assertEqual(find_broken_links(manifest, content), [])
+        self.write(os.path.join("content", "index.md"), "# Home\n\n![t](image/tom.svg)")
+        manifest = build_site("/", 1, content_dir=content,
+                              static_dir=os.path.join(self.root, "static"),
+                              template_path=os.path.join(self.root, "template.html"),
+                              output_dir=os.path.join(self.root, "docs"), log=BuildLog(QUIET),
+                              cache=False, fingerprint=True)
+        self.assertEqual([url for _, _, url in find_broken_links(manifest, content)],
+                         ["image/tom.svg"])
+
+
+if __name__ == "__main__":
+    unittest.main()
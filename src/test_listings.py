@@ -0,0 +1,131 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import listings
+from listings import generate_listings, group_by_tag, slugify
+from manifest import Manifest
+from siteindex import SiteIndex
+
+TEMPLATE = "<title>{{ Title }}</title>{{ Content }}"
+
+
+class TestListings(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = self._tmp.name
+        self.docs = os.path.join(self.root, "docs")
+        self.template = os.path.join(self.root, "template.html")
+        with open(self.template, "w") as f:
+            f.write(TEMPLATE)
+        self.manifest = Manifest(os.path.join(self.root, "manifest.json"))
+        self.index = SiteIndex("content", "docs")
+        self.index.add("content/index.md", "docs/index.html",
+                       {"title": "Home", "tags": [], "draft": False})
+        for number in range(25):
+            self.add_post(number, f"Post {number}")
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def add_post(self, number, title, tags=None):
+        self.index.add(f"content/blog/p{number:02}/index.md", f"docs/blog/p{number:02}/index.html",
+                       {"title": title, "date": f"2024-01-{number + 1:02}",
+                        "tags": tags or (["odd"] if number % 2 else ["even"]), "draft": False})
+
+    def build(self, basepath="/", site_url="https://example.com"):
+        return generate_listings(self.index, self.template, self.docs, basepath,
+                                 self.manifest, site_url)
+
+    def read(self, *parts):
+        with open(os.path.join(self.docs, *parts)) as f:
+            return f.read()
+
+    def test_slugify_and_grouping(self):
+        self.assertEqual(slugify("Middle Earth!"), "middle-earth")
+        posts = self.index.published()[:4]
+        self.assertEqual(list(group_by_tag(posts)), ["even", "odd"])
+
+    def test_paginated_blog_index_newest_first(self):
+        self.build()
+        first = self.read("blog", "index.html")
+        self.assertIn('<a href="/blog/p24/">Post 24</a>', first)
+        self.assertIn('<a href="/blog/page/2/" rel="next">Older posts</a>', first)
+        self.assertNotIn("Post 14<", first)
+        last = self.read("blog", "page", "3", "index.html")
+        self.assertIn("Post 0<", last)
+        self.assertIn('href="/blog/page/2/" rel="prev"', last)
+        self.assertIn("Post 23<", self.read("tags", "odd", "index.html"))
+        self.assertIn("Post 1<", self.read("tags", "odd", "page", "2", "index.html"))
+        self.assertIn('href="/tags/even/">even</a> (13)', self.read("tags", "index.html"))
+
+    def test_feed_and_sitemap(self):
+        self.build("/site/", "https://example.com")
+        feed = self.read("feed.xml")
+        self.assertEqual(feed.count("<entry>"), listings.FEED_ENTRIES)
+        self.assertIn("<id>https://example.com/site/blog/p24/</id>", feed)
+        self.assertIn("<updated>2024-01-25T00:00:00Z</updated>", feed)
+        sitemap = self.read("sitemap.xml")
+        self.assertIn("<loc>https://example.com/site/</loc>", sitemap)
+        self.assertIn("<lastmod>2024-01-01</lastmod>", sitemap)
+        self.assertIn("<loc>https://example.com/site/blog/page/3/</loc>", sitemap)
+        self.assertIn('href="/site/blog/p24/"', self.read("blog", "index.html"))
+
+    def test_feed_and_sitemap_need_site_url(self):
+        self.build()
+        self.build(site_url="")
+        self.assertNotIn("feed.xml", self.manifest.generated)
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "sitemap.xml")))
+        self.assertTrue(os.path.exists(os.path.join(self.docs, "blog", "index.html")))
+
+    def test_undated_post_uses_source_mtime(self):
+        source = os.path.join(self.root, "content", "blog", "undated", "index.md")
+        os.makedirs(os.path.dirname(source))
+        with open(source, "w") as f:
+            f.write("# Undated")
+        os.utime(source, (1718000000, 1718000000))
+        self.index = SiteIndex(os.path.join(self.root, "content"), self.docs)
+        self.index.add(source, os.path.join(self.docs, "blog", "undated", "index.html"),
+                       {"title": "Undated", "tags": [], "draft": False})
+        self.build()
+        feed = self.read("feed.xml")
+        self.assertEqual(feed.count("<updated>2024-06-10T06:13:20Z</updated>"), 2)
+        self.assertNotIn("1970", feed)
+
+    def test_large_sitemaps_are_split(self):
+        with mock.patch.object(listings, "SITEMAP_LIMIT", 20):
+            self.build()
+        self.assertIn("<loc>https://example.com/sitemap-2.xml</loc>", self.read("sitemap.xml"))
+        self.assertIn("<urlset", self.read("sitemap-1.xml"))
+
+    def test_only_affected_outputs_are_rewritten(self):
+        self.assertEqual(self.build(), len(self.manifest.generated))
+        self.assertEqual(self.build(), 0)
+        # The oldest post is only on the last blog page and its tag's last
+        # page: it is too old for the feed and the sitemap doesn't show titles
+        self.add_post(0, "Renamed")
+        self.assertEqual(self.build(), 2)
+        self.assertIn("Renamed", self.read("blog", "page", "3", "index.html"))
+        self.add_post(24, "Newest renamed")
+        # First blog page, first "even" page and the feed
+        self.assertEqual(self.build(), 3)
+
+    def test_removed_tag_pages_are_deleted(self):
+        self.build()
+        for number in range(25):
+            self.add_post(number, f"Post {number}", ["all"])
+        self.build()
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "tags", "odd")))
+        self.assertTrue(os.path.exists(os.path.join(self.docs, "tags", "all", "index.html")))
+
+    def test_content_page_wins(self):
+        self.index.add("content/blog/index.md", "docs/blog/index.html",
+                       {"title": "Blog home", "tags": [], "draft": False})
+        self.build()
+        self.assertNotIn("blog/index.html", self.manifest.generated)
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "blog", "index.html")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,351 @@
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+from main import (
+    PageGenerationError,
+    build_site,
+    collect_pages,
+    extract_title,
+    generate_page,
+    generate_pages_recursive,
+    parse_args,
+)
+from assets import AssetMap
+from buildlog import QUIET, VERBOSE, BuildLog
+from compress import encodings
+from fixtures import write_file
+from manifest import Manifest
+from output import OutputWriter
+from stats import BuildReport
+
+TEMPLATE = "<title>{{ Title }}</title><body>{{ Content }}</body>"
+
+
+class SiteTestCase(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = self._tmp.name
+        self.content = os.path.join(self.root, "content")
+        self.docs = os.path.join(self.root, "docs")
+        self.template = os.path.join(self.root, "template.html")
+        write_file(self.template, TEMPLATE)
+        write_file(os.path.join(self.content, "index.md"), "# Home\n\nHi")
+        write_file(os.path.join(self.content, "blog", "a", "index.md"),
+                   "# Post A\n\n[home](/)")
+        write_file(os.path.join(self.content, "blog", "b", "index.md"),
+                   "# Post B")
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def read_output(self, *parts):
+        with open(os.path.join(self.docs, *parts)) as f:
+            return f.read()
+
+
+class TestCollectPages(SiteTestCase):
+    def test_collect_pages_sorted_and_mirrored(self):
+        pages = collect_pages(self.content, self.docs)
+        self.assertEqual(
+            [os.path.relpath(dest, self.docs) for _, dest in pages],
+            ["blog/a/index.html", "blog/b/index.html", "index.html"],
+        )
+
+
+class TestGeneratePage(SiteTestCase):
+    def test_extract_title(self):
+        self.assertEqual(extract_title("Intro\n\n## Second level"), "Second level")
+        with self.assertRaises(ValueError):
+            extract_title("no heading")
+
+    def test_streams_page_with_fenced_code(self):
+        source = os.path.join(self.content, "code.md")
+        write_file(source, "Intro\n\n# Code\n\n```\nx = 1\n\ny = 2\n```\n")
+        dest = os.path.join(self.docs, "code.html")
+        generate_page(source, self.template, dest, verbose=False)
+        self.assertEqual(
+            self.read_output("code.html"),
+            "<title>Code</title><body><div><p>Intro</p><h1>Code</h1>"
+            "<pre><code>x = 1\n\ny = 2</code></pre></div></body>",
+        )
+
+    def test_front_matter_fills_title_and_placeholders(self):
+        template = os.path.join(self.root, "meta.html")
+        write_file(template, "{{ Title }}|{{ Date }}|{{ Tags }}|{{ Content }}")
+        source = os.path.join(self.content, "post.md")
+        write_file(source, "---\ntitle: Front\ndate: 2024-05-01\ntags: [a, b]\n---\n"
+                           "No heading needed")
+        dest = os.path.join(self.docs, "post.html")
+        meta = generate_page(source, template, dest, verbose=False)
+        self.assertEqual(meta["title"], "Front")
+        self.assertEqual(self.read_output("post.html"),
+                         "Front|2024-05-01|a, b|<div><p>No heading needed</p></div>")
+        with open(source) as f:
+            self.assertEqual(extract_title(f.read()), "Front")
+
+    def test_progress_goes_to_the_build_log(self):
+        source = os.path.join(self.content, "index.md")
+        stream = io.StringIO()
+        log = BuildLog(VERBOSE, stream=stream, json_lines=True)
+        with mock.patch("sys.stdout", new_callable=io.StringIO) as stdout:
+            generate_page(source, self.template, os.path.join(self.docs, "index.html"), log=log)
+        log.flush()
+        self.assertEqual(stdout.getvalue(), "")
+        events = [json.loads(line) for line in stream.getvalue().splitlines()]
+        self.assertEqual([event["event"] for event in events], ["detail", "detail"])
+
+    def test_parse_error_leaves_no_partial_output(self):
+        source = os.path.join(self.content, "bad.md")
+        write_file(source, "# Title\n\nbroken `code")
+        dest = os.path.join(self.docs, "bad.html")
+        with self.assertRaises(ValueError):
+            generate_page(source, self.template, dest, verbose=False)
+        self.assertFalse(os.path.exists(self.docs))
+
+    def test_large_source_is_streamed_to_a_temporary_file(self):
+        source = os.path.join(self.content, "big.md")
+        write_file(source, "# Big\n\n" + "word " * 100)
+        dest = os.path.join(self.docs, "big.html")
+        with mock.patch("main.MAX_SOURCE_BYTES", 10):
+            generate_page(source, self.template, dest, verbose=False)
+            mtime = os.stat(dest).st_mtime_ns
+            writer = OutputWriter(self.docs, threads=0)
+            generate_page(source, self.template, dest, verbose=False, writer=writer)
+        self.assertEqual((writer.written, writer.skipped), (0, 1))
+        self.assertEqual(os.stat(dest).st_mtime_ns, mtime)
+        self.assertEqual(os.listdir(self.docs), ["big.html"])
+
+
+class TestGeneratePagesRecursive(SiteTestCase):
+    def test_parallel_matches_sequential(self):
+        generate_pages_recursive(self.content, self.template, self.docs, "/base/")
+        sequential = self.read_output("blog", "a", "index.html")
+        generate_pages_recursive(
+            self.content, self.template, self.docs, "/base/", jobs=2)
+        self.assertEqual(self.read_output("blog", "a", "index.html"), sequential)
+        self.assertIn('href="/base/"', sequential)
+
+    def test_report_collects_stats_from_workers(self):
+        report = BuildReport()
+        generate_pages_recursive(self.content, self.template, self.docs,
+                                 "/base/", jobs=2, report=report)
+        self.assertEqual(len(report.pages), 3)
+        stats = report.pages[0]
+        self.assertTrue(stats.source.endswith(os.path.join("blog", "a", "index.md")))
+        self.assertEqual(stats.bytes_out, len(self.read_output("blog", "a", "index.html")))
+        self.assertGreater(stats.times["inline_parse"], 0.0)
+
+    def test_failure_names_page_and_builds_others(self):
+        bad = os.path.join(self.content, "blog", "bad", "index.md")
+        write_file(bad, "no heading here")
+        with self.assertRaises(PageGenerationError) as ctx:
+            generate_pages_recursive(
+                self.content, self.template, self.docs, jobs=2)
+        self.assertEqual([path for path, _ in ctx.exception.failures], [bad])
+        self.assertIn("No heading found", ctx.exception.failures[0][1])
+        self.assertTrue(os.path.exists(
+            os.path.join(self.docs, "blog", "b", "index.html")))
+
+
+class TestIncrementalBuild(SiteTestCase):
+    def build(self, basepath="/"):
+        manifest = Manifest(os.path.join(self.root, ".docs-manifest.json"))
+        if os.path.exists(manifest.path):
+            manifest = Manifest.load(manifest.path)
+        generate_pages_recursive(
+            self.content, self.template, self.docs, basepath, manifest)
+        manifest.save()
+        return manifest
+
+    def mtime(self, *parts):
+        return os.stat(os.path.join(self.docs, *parts)).st_mtime_ns
+
+    def test_only_changed_pages_are_regenerated(self):
+        self.build()
+        before_b = self.mtime("blog", "b", "index.html")
+        write_file(os.path.join(self.content, "blog", "b", "index.md"),
+                   "# Post B edited")
+        os.utime(os.path.join(self.docs, "blog", "a", "index.html"), ns=(0, 0))
+        before_a = self.mtime("blog", "a", "index.html")
+        self.build()
+        self.assertEqual(self.mtime("blog", "a", "index.html"), before_a)
+        self.assertNotEqual(self.mtime("blog", "b", "index.html"), before_b)
+        self.assertIn("Post B edited", self.read_output("blog", "b", "index.html"))
+
+    def test_basepath_change_rebuilds_everything(self):
+        self.build()
+        self.build("/site/")
+        self.assertIn('href="/site/"', self.read_output("blog", "a", "index.html"))
+
+    def test_index_covers_unchanged_pages(self):
+        manifest = Manifest(os.path.join(self.root, ".docs-manifest.json"))
+        generate_pages_recursive(self.content, self.template, self.docs, "/", manifest)
+        write_file(os.path.join(self.content, "blog", "b", "index.md"),
+                   "---\ntags: [new]\n---\n# Post B edited")
+        index = generate_pages_recursive(self.content, self.template, self.docs, "/",
+                                         manifest, changed=set())
+        self.assertEqual(len(index), 3)
+        self.assertEqual(index.get("blog/a/index.md").title, "Post A")
+        self.assertEqual(index.get("blog/b/index.md").tags, [])
+        changed = {os.path.abspath(os.path.join(self.content, "blog", "b", "index.md"))}
+        index = generate_pages_recursive(self.content, self.template, self.docs, "/",
+                                         manifest, changed=changed)
+        self.assertEqual(index.get("blog/b/index.md").tags, ["new"])
+        self.assertEqual(manifest.pages["blog/b/index.md"]["meta"]["title"], "Post B edited")
+
+    def generated(self, manifest, basepath="/", **kwargs):
+        log = BuildLog(QUIET)
+        generate_pages_recursive(self.content, self.template, self.docs, basepath, manifest,
+                                 log=log, **kwargs)
+        return log.counts["generated"]
+
+    def test_image_change_rebuilds_only_pages_showing_it(self):
+        write_file(os.path.join(self.content, "index.md"), "# Home\n\n![map](/images/map.png)")
+        table = {"/images/map.png": {"width": "800", "height": "600", "loading": "lazy"},
+                 "/images/other.png": {"width": "10", "height": "10", "loading": "lazy"}}
+        manifest = Manifest(os.path.join(self.root, ".docs-manifest.json"))
+        self.assertEqual(self.generated(manifest, "/site/", images=table), 3)
+        self.assertIn('<img src="/site/images/map.png" alt="map" width="800" height="600" '
+                      'loading="lazy">', self.read_output("index.html"))
+        table["/images/other.png"]["width"] = "20"
+        self.assertEqual(self.generated(manifest, "/site/", images=table), 0)
+        table["/images/map.png"]["width"] = "400"
+        self.assertEqual(self.generated(manifest, "/site/", images=table), 1)
+        self.assertIn('width="400"', self.read_output("index.html"))
+        del table["/images/map.png"]
+        self.assertEqual(self.generated(manifest, "/site/", images=table, changed=set()), 1)
+        self.assertNotIn("width=", self.read_output("index.html"))
+
+    def test_asset_change_rebuilds_only_pages_linking_it(self):
+        write_file(os.path.join(self.content, "index.md"), "# Home\n\n[css](/style.css)")
+        write_file(os.path.join(self.content, "blog", "b", "index.md"),
+                   "# Post B\n\n[css](../../style.css)")
+        manifest = Manifest(os.path.join(self.root, ".docs-manifest.json"))
+        assets = AssetMap({"/style.css": "/style.1.css", "/app.js": "/app.1.js"})
+        self.assertEqual(self.generated(manifest, assets=assets), 3)
+        assets = AssetMap({"/style.css": "/style.2.css", "/app.js": "/app.1.js"})
+        self.assertEqual(self.generated(manifest, assets=assets), 2)
+        self.assertIn('href="/style.2.css"', self.read_output("index.html"))
+        self.assertIn('href="../../style.2.css"', self.read_output("blog", "b", "index.html"))
+        write_file(self.template, '<script src="/app.js"></script>' + TEMPLATE)
+        self.assertEqual(self.generated(manifest, assets=assets), 3)
+        assets = AssetMap({"/style.css": "/style.2.css", "/app.js": "/app.2.js"})
+        self.assertEqual(self.generated(manifest, assets=assets), 3)
+        self.assertIn('src="/app.2.js"', self.read_output("blog", "b", "index.html"))
+
+    def test_links_are_kept_for_unchanged_pages(self):
+        cache_dir = os.path.join(self.root, ".docs-cache")
+        manifest = Manifest(os.path.join(self.root, ".docs-manifest.json"))
+        generate_pages_recursive(self.content, self.template, self.docs, "/", manifest,
+                                 cache_dir=cache_dir)
+        self.assertEqual(manifest.pages["blog/a/index.md"]["links"], [("/", 3)])
+        index = generate_pages_recursive(self.content, self.template, self.docs, "/site/",
+                                         manifest, cache_dir=cache_dir)
+        self.assertEqual(index.get("blog/a/index.md").links, [("/", 3)])
+        write_file(os.path.join(self.content, "index.md"), "# Home\n\n[a](/blog/a/)")
+        index = generate_pages_recursive(self.content, self.template, self.docs, "/site/",
+                                         manifest)
+        self.assertEqual(index.get("blog/a/index.md").links, [("/", 3)])
+        self.assertEqual(manifest.pages["index.md"]["links"], [("/blog/a/", 3)])
+
+    def test_deleted_source_removes_output(self):
+        self.build()
+        os.remove(os.path.join(self.content, "blog", "b", "index.md"))
+        manifest = self.build()
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "blog", "b")))
+        self.assertNotIn("blog/b/index.md", manifest.pages)
+
+    def test_identical_outputs_are_not_rewritten(self):
+        generate_pages_recursive(self.content, self.template, self.docs, "/")
+        os.utime(os.path.join(self.docs, "index.html"), ns=(0, 0))
+        write_file(os.path.join(self.content, "blog", "b", "index.md"), "# Post B edited")
+        # Without a manifest every page is rendered again
+        writer = OutputWriter(self.docs)
+        generate_pages_recursive(self.content, self.template, self.docs, "/",
+                                 writer=writer, jobs=2)
+        writer.close()
+        self.assertEqual((writer.written, writer.skipped), (1, 2))
+        self.assertEqual(self.mtime("index.html"), 0)
+        self.assertIn("Post B edited", self.read_output("blog", "b", "index.html"))
+
+
+class TestBuildSite(SiteTestCase):
+    def build(self, **options):
+        log = BuildLog(QUIET)
+        build_site("/", 1, content_dir=self.content, static_dir=os.path.join(self.root, "static"),
+                   template_path=self.template, output_dir=self.docs, log=log, cache=False,
+                   **options)
+        return log.counts["deleted"]
+
+    def test_removals_are_counted(self):
+        extra = os.path.join(self.root, "static", "extra.css")
+        write_file(extra, "body { color: red }\n" * 100)
+        write_file(os.path.join(self.root, "static", "index.css"), "body {}\n" * 200)
+        self.assertEqual(self.build(precompress=True), 0)
+        self.assertTrue(os.path.exists(os.path.join(self.docs, "extra.css.gz")))
+        os.remove(extra)
+        # extra.css and its compressed siblings
+        self.assertEqual(self.build(precompress=True), 1 + len(encodings()))
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "extra.css")))
+        self.assertEqual(self.build(), len(encodings()))
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "index.css.gz")))
+
+
+class TestCommandLine(unittest.TestCase):
+    def test_build_arguments(self):
+        args = parse_args(["/site/", "--jobs", "4", "--output", "out", "-q"])
+        self.assertEqual(args.command, "build")
+        self.assertEqual(args.basepath, "/site/")
+        self.assertEqual(args.jobs, 4)
+        self.assertEqual(args.output, "out")
+        self.assertEqual(args.level, "quiet")
+        self.assertEqual(parse_args(["--image-widths", "480,960"]).image_widths, (480, 960))
+        args = parse_args(["check", "/site/", "-j", "2"])
+        self.assertEqual((args.command, args.basepath, args.jobs), ("check", "/site/", 2))
+        self.assertEqual(parse_args(["--output-archive", "site.zip"]).output_archive, "site.zip")
+        with mock.patch("sys.stderr"), self.assertRaises(SystemExit):
+            parse_args(["--output-archive", "site.rar"])
+
+    def test_report_arguments(self):
+        args = parse_args(["--report", "--slowest", "3", "--stats", "s.jsonl",
+                           "--profile", "build.prof"])
+        self.assertTrue(args.report)
+        self.assertEqual((args.slowest, args.stats, args.profile),
+                         (3, "s.jsonl", "build.prof"))
+
+    def test_defaults(self):
+        args = parse_args([])
+        self.assertEqual((args.basepath, args.jobs, args.level, args.log_format),
+                         ("/", 1, "summary", "text"))
+
+    def test_serve_arguments(self):
+        args = parse_args(["serve", "--watch", "--port", "9000"])
+        self.assertEqual(args.command, "serve")
+        self.assertTrue(args.watch)
+        self.assertEqual(args.port, 9000)
+
+    def test_import_defers_heavy_modules(self):
+        # Part of the startup budget: importing main must not build the site
+        # or pull in the process pool, argparse, the HTTP server or the
+        # modules only a full build needs
+        src = os.path.dirname(os.path.abspath(__file__))
+        code = (
+            "import sys, main; "
+            "print(' '.join(m for m in ('multiprocessing', 'concurrent.futures', "
+            "'argparse', 'http.server', 'server', 'shutil', 'compress', 'images', "
+            "'listings', 'search', 'linkcheck', 'sync', 'assets', 'minify') "
+            "if m in sys.modules))"
+        )
+        result = subprocess.run([sys.executable, "-c", code], cwd=src,
+                                capture_output=True, text=True, check=True)
+        self.assertEqual(result.stdout.strip(), "")
+
+
+if __name__ == "__main__":
+    unittest.main()
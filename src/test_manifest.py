@@ -0,0 +1,54 @@
+import os
+import tempfile
+import unittest
+
+from manifest import Manifest, hash_bytes, hash_file, manifest_path_for, remove_output
+
+
+class TestManifest(unittest.TestCase):
+    def test_manifest_path_is_next_to_output(self):
+        self.assertEqual(
+            manifest_path_for("/site/docs"), "/site/.docs-manifest.json")
+        self.assertEqual(
+            manifest_path_for("/site/docs/"), "/site/.docs-manifest.json")
+
+    def test_hash_file_matches_hash_bytes(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "page.md")
+            with open(path, "wb") as f:
+                f.write(b"# Title\n")
+            self.assertEqual(hash_file(path), hash_bytes(b"# Title\n"))
+
+    def test_save_and_load_round_trip(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, ".docs-manifest.json")
+            manifest = Manifest(path)
+            manifest.template = "abc"
+            manifest.pages = {"index.md": {"hash": "1", "output": "index.html"}}
+            manifest.save()
+
+            loaded = Manifest.load(path)
+            self.assertEqual(loaded.template, "abc")
+            self.assertEqual(loaded.pages, manifest.pages)
+            self.assertFalse(loaded.is_empty())
+
+    def test_load_missing_or_corrupt_is_empty(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, ".docs-manifest.json")
+            self.assertTrue(Manifest.load(path).is_empty())
+            with open(path, "w") as f:
+                f.write("{not json")
+            self.assertTrue(Manifest.load(path).is_empty())
+
+    def test_remove_output_prunes_empty_directories(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            page = os.path.join(tmp, "blog", "post", "index.html")
+            os.makedirs(os.path.dirname(page))
+            open(page, "w").close()
+            remove_output(page, tmp)
+            self.assertFalse(os.path.exists(os.path.join(tmp, "blog")))
+            self.assertTrue(os.path.exists(tmp))
+
+
+if __name__ == "__main__":
+    unittest.main()
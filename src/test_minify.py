@@ -0,0 +1,52 @@
+import unittest
+
+import minify
+from minify import minify_bytes, minify_css, minify_html
+
+
+class TestMinifyHtml(unittest.TestCase):
+    def test_drops_formatting_whitespace_and_comments(self):
+        html = "<!doctype html>\n<html>\n  <head>\n    <!-- note -->\n  </head>\n  <body>\n    <p>Hi</p>\n  </body>\n</html>\n"
+        self.assertEqual(minify_html(html),
+                         "<!doctype html><html><head></head><body><p>Hi</p></body></html>")
+
+    def test_keeps_space_between_inline_elements(self):
+        self.assertEqual(minify_html("<p><b>a</b>\n   <i>b</i>  text</p>"),
+                         "<p><b>a</b> <i>b</i> text</p>")
+
+    def test_removed_comment_leaves_one_space(self):
+        self.assertEqual(minify_html("<p><b>world</b> <!-- note --> <i>x</i></p>"),
+                         "<p><b>world</b> <i>x</i></p>")
+
+    def test_raw_elements_are_untouched(self):
+        html = "<div>\n<pre>  a\n    b  </pre>\n<script>if (a  <  b) {}</script>\n</div>"
+        self.assertEqual(minify_html(html),
+                         "<div><pre>  a\n    b  </pre><script>if (a  <  b) {}</script></div>")
+
+    def test_placeholders_survive(self):
+        self.assertEqual(minify_html("<title>\n  {{ Title }}\n</title>"), "<title>{{ Title }}</title>")
+
+
+class TestMinifyCss(unittest.TestCase):
+    def test_minify_css(self):
+        css = "/* theme */\nh1,\nh2 {\n    color: #dda15e;\n    margin: 0 auto;\n}\n\na:hover > b { x: y }\n"
+        self.assertEqual(minify_css(css), "h1,h2{color:#dda15e;margin:0 auto}a:hover>b{x:y}")
+
+    def test_strings_and_comment_separators(self):
+        self.assertEqual(minify_css('a { content: "x  /* y */  ;" }'), 'a{content:"x  /* y */  ;"}')
+        self.assertEqual(minify_css("div/**/p{}"), "div p{}")
+        self.assertEqual(minify_css('a { content: ";}"; }'), 'a{content:";}"}')
+        self.assertEqual(minify_css("a { width: calc(1px + 2px) }"), "a{width:calc(1px + 2px)}")
+
+
+class TestMinifyBytes(unittest.TestCase):
+    def test_result_is_cached_by_content_hash(self):
+        minify._cache.clear()
+        self.assertEqual(minify_bytes(b"a { }", ".css"), b"a{}")
+        self.assertEqual(len(minify._cache), 1)
+        minify_bytes(b"a { }", ".css")
+        self.assertEqual(len(minify._cache), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
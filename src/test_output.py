@@ -0,0 +1,97 @@
+import os
+import tempfile
+import unittest
+
+from output import OutputBatch, OutputWriter, atomic_output, is_identical, write_atomic
+
+
+class TestWriteAtomic(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = self._tmp.name
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_identical_content_is_not_rewritten(self):
+        path = os.path.join(self.root, "a", "page.html")
+        self.assertTrue(write_atomic(path, b"<p>hi</p>"))
+        os.utime(path, ns=(0, 0))
+        self.assertTrue(is_identical(path, b"<p>hi</p>"))
+        self.assertFalse(write_atomic(path, b"<p>hi</p>"))
+        self.assertEqual(os.stat(path).st_mtime_ns, 0)
+        self.assertTrue(write_atomic(path, b"<p>ho</p>"))
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), b"<p>ho</p>")
+        self.assertEqual(os.listdir(os.path.dirname(path)), ["page.html"])
+
+    def test_failed_write_leaves_no_temporary_file(self):
+        path = os.path.join(self.root, "page.html")
+        write_atomic(path, b"old")
+        with self.assertRaises(ValueError):
+            with atomic_output(path) as tmp_path:
+                with open(tmp_path, "wb") as f:
+                    f.write(b"new")
+                raise ValueError("render failed")
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), b"old")
+        self.assertEqual(os.listdir(self.root), ["page.html"])
+
+    def test_missing_file_is_not_identical(self):
+        self.assertFalse(is_identical(os.path.join(self.root, "missing"), b""))
+
+
+class TestOutputWriter(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = self._tmp.name
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_counts_written_skipped_and_deleted(self):
+        writer = OutputWriter(self.root, threads=2)
+        for name in ("a.html", "b.html", "c.html"):
+            writer.write(os.path.join(self.root, "pages", name), name.encode())
+        writer.flush()
+        writer.write(os.path.join(self.root, "pages", "a.html"), b"a.html")
+        writer.write(os.path.join(self.root, "pages", "b.html"), b"changed")
+        writer.remove(os.path.join(self.root, "pages", "c.html"))
+        writer.remove(os.path.join(self.root, "pages", "gone.html"))
+        writer.close()
+        self.assertEqual((writer.written, writer.skipped, writer.deleted), (4, 1, 1))
+        self.assertEqual(sorted(os.listdir(os.path.join(self.root, "pages"))),
+                         ["a.html", "b.html"])
+
+    def test_commit_drops_identical_temporary_file(self):
+        path = os.path.join(self.root, "page.html")
+        writer = OutputWriter(self.root, threads=0)
+        writer.write(path, b"same")
+        with open(f"{path}.tmp", "wb") as f:
+            f.write(b"same")
+        writer.commit(f"{path}.tmp", path)
+        self.assertEqual((writer.written, writer.skipped), (1, 1))
+        self.assertEqual(os.listdir(self.root), ["page.html"])
+
+    def test_background_errors_are_raised(self):
+        blocker = os.path.join(self.root, "file")
+        with open(blocker, "w") as f:
+            f.write("not a directory")
+        writer = OutputWriter(self.root, threads=2)
+        writer.write(os.path.join(blocker, "page.html"), b"x")
+        with self.assertRaises(OSError):
+            writer.close()
+
+    def test_batch_replays_in_order(self):
+        batch = OutputBatch()
+        batch.write(os.path.join(self.root, "a.html"), b"a")
+        batch.write(os.path.join(self.root, "b.html"), b"b")
+        self.assertEqual(os.listdir(self.root), [])
+        writer = OutputWriter(self.root, threads=0)
+        batch.replay(writer)
+        self.assertEqual(writer.written, 2)
+        self.assertEqual(sorted(os.listdir(self.root)), ["a.html", "b.html"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,158 @@
+import json
+import os
+import tempfile
+import unittest
+from collections import Counter
+from unittest import mock
+
+from fixtures import write_file
+from main import generate_pages_recursive
+from manifest import Manifest
+import search
+from search import SEARCH_DIR, SearchIndexer, add_terms, remove_search_index, shard_for
+from sync import remove_untracked
+
+TEMPLATE = "<title>{{ Title }}</title><body>{{ Content }}</body>"
+
+
+class TestTerms(unittest.TestCase):
+    def test_add_terms(self):
+        terms = Counter()
+        add_terms("The Ring, the RING and a ring-bearer " + "x" * 40, terms)
+        self.assertEqual(terms, {"the": 2, "ring": 3, "and": 1, "bearer": 1})
+
+    def test_shard_for_split_prefixes(self):
+        self.assertEqual(shard_for("ring"), "ri")
+        self.assertEqual(shard_for("ring", {"ri", "rin"}), "ring")
+        self.assertEqual(shard_for("rid", {"ri", "rin"}), "rid")
+        self.assertEqual(shard_for("ri", {"ri"}), "ri")
+
+
+class TestSearchIndex(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = self._tmp.name
+        self.content = os.path.join(self.root, "content")
+        self.docs = os.path.join(self.root, "docs")
+        self.template = os.path.join(self.root, "template.html")
+        write_file(self.template, TEMPLATE)
+        write_file(os.path.join(self.content, "index.md"), "# Home\n\nThe shire")
+        write_file(os.path.join(self.content, "ring.md"), "# Ring\n\nOne **ring** to rule")
+        write_file(os.path.join(self.content, "draft.md"), "---\ndraft: true\n---\n# Draft")
+        self.manifest = Manifest(os.path.join(self.root, "m.json"))
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def build(self, manifest=None, docs=None, max_postings=1 << 20, max_shard_bytes=1 << 16):
+        manifest = manifest or self.manifest
+        docs = docs or self.docs
+        indexer = SearchIndexer(docs, manifest, max_postings, max_shard_bytes=max_shard_bytes)
+        generate_pages_recursive(self.content, self.template, docs, "/site/", manifest,
+                                 search=indexer)
+        indexer.finish()
+
+    def read(self, name, docs=None):
+        with open(os.path.join(docs or self.docs, SEARCH_DIR, name)) as f:
+            return json.load(f)
+
+    def listdir(self, name, docs=None):
+        return sorted(os.listdir(os.path.join(docs or self.docs, SEARCH_DIR, name)))
+
+    def snapshot(self, docs):
+        """The index as {term: [(url, frequency)]}, independent of document ids."""
+        urls = {}
+        for name in self.listdir("docs", docs):
+            urls.update(self.read(os.path.join("docs", name), docs))
+        index = {}
+        for name in self.listdir("terms", docs):
+            for term, postings in self.read(os.path.join("terms", name), docs).items():
+                self.assertEqual(name, shard_for(term, self.read("index.json", docs)["split"])
+                                 + ".json")
+                index[term] = sorted((urls[str(doc)][0], count) for doc, count in postings)
+        return index
+
+    def test_index_is_sharded_by_prefix(self):
+        self.build()
+        self.assertEqual(self.read("index.json"),
+                         {"prefix_length": 2, "split": [], "docs_per_shard": 500})
+        self.assertEqual(sorted(url for url, _ in self.read("docs/0.json").values()),
+                         ["/site/", "/site/ring.html"])
+        ring = self.read("terms/ri.json")["ring"]
+        self.assertEqual(len(ring), 1)
+        self.assertEqual(ring[0][1], 3)
+        self.assertNotIn("dr.json", self.listdir("terms"))
+
+    def test_documents_are_sharded_by_id(self):
+        with mock.patch.object(search, "DOCS_PER_SHARD", 1):
+            self.build()
+            self.assertEqual(self.listdir("docs"), ["0.json", "1.json"])
+            os.remove(os.path.join(self.content, "index.md"))
+            self.build()
+        self.assertEqual(len(self.listdir("docs")), 1)
+        self.assertEqual(list(self.snapshot(self.docs)["ring"]), [("/site/ring.html", 3)])
+
+    def test_large_shards_are_split(self):
+        write_file(os.path.join(self.content, "riders.md"), "# Riders\n\nRiders ride " * 3)
+        self.build(max_shard_bytes=40)
+        split = self.read("index.json")["split"]
+        self.assertIn("ri", split)
+        self.assertIn("ring", self.read(f"terms/{shard_for('ring', split)}.json"))
+        self.assertNotIn("ri.json", self.listdir("terms"))
+        whole = os.path.join(self.root, "whole")
+        self.build(Manifest(os.path.join(self.root, "whole.json")), whole)
+        self.assertEqual(self.snapshot(self.docs), self.snapshot(whole))
+
+        # Pages indexed before the split are still removed from its shards
+        write_file(os.path.join(self.content, "ring.md"), "# Band\n\nOne to rule")
+        os.remove(os.path.join(self.content, "riders.md"))
+        self.build(max_shard_bytes=40)
+        self.assertNotIn("ring", self.snapshot(self.docs))
+        self.assertNotIn("riders", self.snapshot(self.docs))
+        fresh = os.path.join(self.root, "fresh")
+        self.build(Manifest(os.path.join(self.root, "fresh.json")), fresh)
+        self.assertEqual(self.snapshot(self.docs), self.snapshot(fresh))
+
+    def test_incremental_update_matches_full_build(self):
+        self.build()
+        write_file(os.path.join(self.content, "ring.md"), "# Ring\n\nOne shire")
+        os.remove(os.path.join(self.content, "index.md"))
+        write_file(os.path.join(self.content, "new.md"), "# New\n\nRing again")
+        self.build(max_postings=1)
+        fresh = os.path.join(self.root, "fresh")
+        self.build(Manifest(os.path.join(self.root, "fresh.json")), fresh)
+        self.assertEqual(self.snapshot(self.docs), self.snapshot(fresh))
+        self.assertNotIn("rule", self.snapshot(self.docs))
+        self.assertFalse(os.path.exists(os.path.join(self.docs, SEARCH_DIR, "terms", "ru.json")))
+
+    def test_spilled_runs_match_in_memory_build(self):
+        self.build()
+        spilled = os.path.join(self.root, "spilled")
+        runs = os.path.join(self.root, "runs")
+        indexer = SearchIndexer(spilled, Manifest(os.path.join(self.root, "spilled.json")),
+                                max_postings=1, spill_dir=runs)
+        generate_pages_recursive(self.content, self.template, spilled, "/site/",
+                                 indexer.manifest, search=indexer)
+        # Each page filled the buffer; no shard is written before finish()
+        self.assertEqual(len(os.listdir(runs)), 2)
+        self.assertFalse(os.path.exists(os.path.join(spilled, SEARCH_DIR)))
+        indexer.finish()
+        self.assertEqual(self.snapshot(spilled), self.snapshot(self.docs))
+        self.assertEqual(os.listdir(runs), [])
+
+    def test_tracked_and_removed(self):
+        self.build()
+        remove_untracked(self.docs, self.manifest)
+        self.assertTrue(os.path.exists(os.path.join(self.docs, SEARCH_DIR, "index.json")))
+        remove_search_index(self.docs, self.manifest)
+        self.assertFalse(os.path.exists(os.path.join(self.docs, SEARCH_DIR)))
+
+    def test_missing_shard_rebuilds_index(self):
+        self.build()
+        os.remove(os.path.join(self.docs, SEARCH_DIR, "terms", "ri.json"))
+        self.build()
+        self.assertIn("ring", self.read("terms/ri.json"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+import io
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from buildlog import QUIET, BuildLog
+from fixtures import write_file
+from server import SiteWatcher, changed_paths, snapshot
+
+
+class TestSnapshot(unittest.TestCase):
+    def test_changed_paths(self):
+        before = {"/a": (1, 1), "/b": (1, 1), "/c": (1, 1)}
+        after = {"/a": (1, 1), "/b": (2, 1), "/d": (1, 1)}
+        self.assertEqual(changed_paths(before, after), {"/b", "/c", "/d"})
+
+    def test_snapshot_walks_directories_and_files(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            write_file(os.path.join(tmp, "dir", "sub", "a.md"), "x")
+            write_file(os.path.join(tmp, "t.html"), "y")
+            files = snapshot([os.path.join(tmp, "dir"), os.path.join(tmp, "t.html")])
+            self.assertEqual(sorted(files), [
+                os.path.join(tmp, "dir", "sub", "a.md"),
+                os.path.join(tmp, "t.html"),
+            ])
+
+
+class TestSiteWatcher(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        root = self._tmp.name
+        self.content = os.path.join(root, "content")
+        self.static = os.path.join(root, "static")
+        self.docs = os.path.join(root, "docs")
+        self.template = os.path.join(root, "template.html")
+        write_file(self.template, "{{ Title }}|{{ Content }}")
+        write_file(os.path.join(self.content, "index.md"), "# Home")
+        write_file(os.path.join(self.content, "post", "index.md"), "# Post")
+        write_file(os.path.join(self.static, "index.css"), "body {}")
+        self.watcher = SiteWatcher(
+            content_dir=self.content, static_dir=self.static,
+            template_path=self.template, output_dir=self.docs,
+            log=BuildLog(QUIET, error_stream=io.StringIO()))
+        self.watcher.start()
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def read_output(self, *parts):
+        with open(os.path.join(self.docs, *parts)) as f:
+            return f.read()
+
+    def touch_later(self, path, text):
+        # Make sure the mtime moves even on coarse-grained filesystems
+        write_file(path, text)
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    def test_rebuilds_only_changed_page(self):
+        other = os.path.join(self.docs, "post", "index.html")
+        os.utime(other, ns=(0, 0))
+        self.touch_later(os.path.join(self.content, "index.md"), "# Home v2")
+        changed = self.watcher.poll()
+        self.assertEqual(len(changed), 1)
+        self.assertEqual(self.read_output("index.html"), "Home v2|<div><h1>Home v2</h1></div>")
+        self.assertEqual(os.stat(other).st_mtime_ns, 0)
+
+    def test_template_change_rebuilds_all_pages(self):
+        self.touch_later(self.template, "<t>{{ Title }}</t>")
+        self.watcher.poll()
+        self.assertEqual(self.read_output("post", "index.html"), "<t>Post</t>")
+
+    def test_deleted_page_and_new_asset(self):
+        os.remove(os.path.join(self.content, "post", "index.md"))
+        write_file(os.path.join(self.static, "app.js"), "1")
+        self.watcher.poll()
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "post")))
+        self.assertEqual(self.read_output("app.js"), "1")
+
+    def test_build_error_keeps_watching(self):
+        os.remove(self.template)
+        with mock.patch.object(self.watcher.log, "error") as error:
+            self.watcher.poll()
+            self.assertIn("template.html", error.call_args[0][1])
+            self.touch_later(os.path.join(self.content, "index.md"), "# Home v2")
+            self.watcher.poll()
+        self.assertEqual(self.read_output("post", "index.html"), "Post|<div><h1>Post</h1></div>")
+        self.touch_later(self.template, "<t>{{ Title }}</t>")
+        self.watcher.poll()
+        self.assertEqual(self.read_output("index.html"), "<t>Home v2</t>")
+
+    def test_no_changes_is_a_no_op(self):
+        self.assertEqual(self.watcher.poll(), set())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,33 @@
+import unittest
+
+from siteindex import SiteIndex, url_for
+
+
+class TestSiteIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = SiteIndex("content", "docs")
+        self.index.add("content/index.md", "docs/index.html",
+                       {"title": "Home", "tags": [], "draft": False})
+        self.index.add("content/blog/a/index.md", "docs/blog/a/index.html",
+                       {"title": "A", "date": "2024-01-01", "tags": ["x"], "draft": False})
+        self.index.add("content/blog/b/index.md", "docs/blog/b/index.html",
+                       {"title": "B", "date": "2024-03-01", "tags": ["x", "y"], "draft": False})
+        self.index.add("content/blog/c/index.md", "docs/blog/c/index.html",
+                       {"title": "C", "date": "2024-04-01", "tags": ["y"], "draft": True})
+
+    def test_url_for(self):
+        self.assertEqual(url_for("index.html"), "/")
+        self.assertEqual(url_for("blog/a/index.html"), "/blog/a/")
+        self.assertEqual(url_for("contact.html"), "/contact.html")
+
+    def test_published_newest_first_without_drafts(self):
+        self.assertEqual([page.title for page in self.index.published()], ["B", "A", "Home"])
+
+    def test_lookup(self):
+        self.assertEqual(len(self.index), 4)
+        self.assertIn("blog/a/index.md", self.index)
+        self.assertEqual(self.index.get("blog/a/index.md").url, "/blog/a/")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+import io
+import json
+import os
+import pickle
+import tempfile
+import unittest
+from unittest import mock
+
+from stats import BuildReport, PageStats, TimedWriter, read_lines
+
+
+class TestPageStats(unittest.TestCase):
+    def test_nested_stages_are_exclusive(self):
+        stats = PageStats("a.md")
+        with mock.patch("stats.time.perf_counter", side_effect=[0.0, 1.0, 3.0, 6.0]):
+            stats.enter("serialize")
+            stats.enter("inline_parse")
+            stats.leave()
+            stats.leave()
+        self.assertEqual(stats.times["serialize"], 4.0)
+        self.assertEqual(stats.times["inline_parse"], 2.0)
+        self.assertEqual(stats.total, 6.0)
+
+    def test_timed_and_timed_iter(self):
+        stats = PageStats("a.md")
+        self.assertEqual(stats.timed("inline_parse", str.upper)("x"), "X")
+        self.assertEqual(list(stats.timed_iter("block_split", "ab")), ["a", "b"])
+        self.assertEqual(list(stats.staged("serialize", iter("cd"))), ["c", "d"])
+        self.assertEqual(stats._stack, [])
+
+    def test_timed_writer_passes_through(self):
+        stats = PageStats("a.md")
+        out = io.StringIO()
+        TimedWriter(out, stats).write("hello")
+        self.assertEqual(out.getvalue(), "hello")
+        self.assertGreater(stats.times["emit"], 0.0)
+
+    def test_read_lines_matches_split(self):
+        text = "# Title\n\nline one\nline two\n\nend"
+        for chunk_size in (1, 3, 1 << 16):
+            stats = PageStats("a.md")
+            self.assertEqual(list(read_lines(io.StringIO(text), stats, chunk_size)),
+                             text.split("\n"))
+
+    def test_pickles_without_timing_state(self):
+        stats = PageStats("a.md", "a.html")
+        stats.bytes_in = 12
+        copy = pickle.loads(pickle.dumps(stats))
+        self.assertEqual((copy.source, copy.output, copy.bytes_in), ("a.md", "a.html", 12))
+        self.assertEqual(copy.times, stats.times)
+
+
+class TestBuildReport(unittest.TestCase):
+    def make_report(self):
+        report = BuildReport()
+        for name, seconds in (("fast.md", 0.001), ("slow.md", 0.5), ("mid.md", 0.1)):
+            stats = PageStats(name)
+            stats.times["inline_parse"] = seconds
+            stats.bytes_in = 10
+            report.add(stats)
+        return report
+
+    def test_slowest_and_totals(self):
+        report = self.make_report()
+        self.assertEqual([stats.source for stats in report.slowest(2)],
+                         ["slow.md", "mid.md"])
+        self.assertAlmostEqual(report.stage_totals()["inline_parse"], 0.601)
+
+    def test_summary_lines(self):
+        lines = self.make_report().summary_lines(1)
+        self.assertTrue(lines[0].startswith("3 page(s), 30 bytes in"))
+        self.assertIn("Slowest 1 page(s):", lines)
+        self.assertIn("slow.md", lines[-1])
+        self.assertEqual(BuildReport().summary_lines(), ["No pages generated."])
+
+    def test_write_json(self):
+        with tempfile.TemporaryDirectory() as root:
+            path = os.path.join(root, "stats.jsonl")
+            self.make_report().write_json(path)
+            with open(path) as f:
+                records = [json.loads(line) for line in f]
+        self.assertEqual([record.get("source") for record in records[:3]],
+                         ["fast.md", "slow.md", "mid.md"])
+        self.assertEqual(records[-1]["pages"], 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
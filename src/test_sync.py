@@ -0,0 +1,130 @@
+import os
+import tempfile
+import unittest
+
+from fixtures import write_file
+from manifest import Manifest
+from sync import copy_file, remove_untracked, sync_directory
+
+
+class SyncTestCase(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.static = os.path.join(self._tmp.name, "static")
+        self.docs = os.path.join(self._tmp.name, "docs")
+        self.manifest = Manifest(os.path.join(self._tmp.name, "m.json"))
+        write_file(os.path.join(self.static, "index.css"), b"body {}")
+        write_file(os.path.join(self.static, "images", "a.png"), b"\x89PNG" * 10)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def out(self, *parts):
+        return os.path.join(self.docs, *parts)
+
+
+class TestCopyFile(SyncTestCase):
+    def test_copy_preserves_content_and_mtime(self):
+        source = os.path.join(self.static, "index.css")
+        method = copy_file(source, self.out("index.css"))
+        self.assertIn(method, ("reflink", "copy"))
+        with open(self.out("index.css"), "rb") as f:
+            self.assertEqual(f.read(), b"body {}")
+        self.assertEqual(os.stat(source).st_mtime_ns,
+                         os.stat(self.out("index.css")).st_mtime_ns)
+        self.assertFalse(os.path.exists(self.out("index.css.tmp")))
+
+    def test_hardlink_when_requested(self):
+        source = os.path.join(self.static, "index.css")
+        self.assertEqual(copy_file(source, self.out("index.css"), link=True), "hardlink")
+        self.assertTrue(os.path.samefile(source, self.out("index.css")))
+
+
+class TestSyncDirectory(SyncTestCase):
+    def test_first_sync_copies_everything(self):
+        self.assertEqual(sync_directory(self.static, self.docs, self.manifest), 2)
+        self.assertEqual(sorted(self.manifest.static), ["images/a.png", "index.css"])
+
+    def test_unchanged_files_are_not_copied_again(self):
+        sync_directory(self.static, self.docs, self.manifest)
+        os.utime(self.out("images", "a.png"), ns=(0, 0))
+        self.assertEqual(sync_directory(self.static, self.docs, self.manifest), 0)
+        self.assertEqual(os.stat(self.out("images", "a.png")).st_mtime_ns, 0)
+
+    def test_touched_but_identical_file_is_not_copied(self):
+        sync_directory(self.static, self.docs, self.manifest)
+        os.utime(os.path.join(self.static, "index.css"), ns=(10**9, 10**9))
+        self.assertEqual(sync_directory(self.static, self.docs, self.manifest), 0)
+        self.assertEqual(self.manifest.static["index.css"]["mtime"], 10**9)
+
+    def test_changed_and_removed_files(self):
+        sync_directory(self.static, self.docs, self.manifest)
+        write_file(os.path.join(self.static, "index.css"), b"body { color: red }")
+        os.remove(os.path.join(self.static, "images", "a.png"))
+        self.assertEqual(sync_directory(self.static, self.docs, self.manifest), 1)
+        self.assertFalse(os.path.exists(self.out("images")))
+        with open(self.out("index.css"), "rb") as f:
+            self.assertEqual(f.read(), b"body { color: red }")
+
+    def test_first_sync_keeps_identical_existing_output(self):
+        write_file(self.out("index.css"), b"body {}")
+        os.utime(self.out("index.css"), ns=(0, 0))
+        self.assertEqual(sync_directory(self.static, self.docs, self.manifest), 1)
+        self.assertEqual(os.stat(self.out("index.css")).st_mtime_ns, 0)
+
+    def test_checksum_mode_detects_same_size_same_mtime_edit(self):
+        sync_directory(self.static, self.docs, self.manifest)
+        source = os.path.join(self.static, "index.css")
+        stat = os.stat(source)
+        write_file(source, b"body{X}")
+        os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        self.assertEqual(sync_directory(self.static, self.docs, self.manifest), 0)
+        self.assertEqual(sync_directory(
+            self.static, self.docs, self.manifest, checksum=True), 1)
+
+    def test_minify_css_and_toggle(self):
+        self.assertEqual(sync_directory(self.static, self.docs, self.manifest, minify=True), 2)
+        with open(self.out("index.css"), "rb") as f:
+            self.assertEqual(f.read(), b"body{}")
+        self.assertEqual(sync_directory(self.static, self.docs, self.manifest, minify=True), 0)
+        # Turning minification off recopies the stylesheet only
+        self.assertEqual(sync_directory(self.static, self.docs, self.manifest), 1)
+        with open(self.out("index.css"), "rb") as f:
+            self.assertEqual(f.read(), b"body {}")
+
+    def test_first_minified_sync_keeps_identical_output(self):
+        write_file(self.out("index.css"), b"body{}")
+        os.utime(self.out("index.css"), ns=(0, 0))
+        sync_directory(self.static, self.docs, self.manifest, minify=True)
+        self.assertEqual(os.stat(self.out("index.css")).st_mtime_ns, 0)
+
+    def test_fingerprint_renames_on_change(self):
+        sync_directory(self.static, self.docs, self.manifest, fingerprint=True)
+        css = self.manifest.static["index.css"]["output"]
+        self.assertRegex(css, r"^index\.[0-9a-f]{8}\.css$")
+        self.assertTrue(os.path.exists(self.out(css)))
+        self.assertFalse(os.path.exists(self.out("index.css")))
+        self.assertEqual(sync_directory(self.static, self.docs, self.manifest,
+                                        fingerprint=True), 0)
+        write_file(os.path.join(self.static, "index.css"), b"body { margin: 0 }")
+        self.assertEqual(sync_directory(self.static, self.docs, self.manifest,
+                                        fingerprint=True), 1)
+        self.assertNotEqual(self.manifest.static["index.css"]["output"], css)
+        self.assertFalse(os.path.exists(self.out(css)))
+        # Turning fingerprinting off restores the plain names
+        sync_directory(self.static, self.docs, self.manifest)
+        self.assertEqual(sorted(os.listdir(self.docs)), ["images", "index.css"])
+        self.assertEqual(os.listdir(self.out("images")), ["a.png"])
+
+
+class TestRemoveUntracked(SyncTestCase):
+    def test_removes_only_untracked_files(self):
+        sync_directory(self.static, self.docs, self.manifest)
+        write_file(self.out("stale", "old.html"), b"old")
+        self.assertEqual(remove_untracked(self.docs, self.manifest), 1)
+        self.assertFalse(os.path.exists(self.out("stale")))
+        self.assertTrue(os.path.exists(self.out("index.css")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+import os
+import tempfile
+import unittest
+
+from assets import AssetMap
+from template import Template, load_template, rewrite_basepath, rewrite_url
+
+
+class TestRewrite(unittest.TestCase):
+    def test_rewrite_url(self):
+        self.assertEqual(rewrite_url("/a.css", "/site/"), "/site/a.css")
+        self.assertEqual(rewrite_url("https://x.dev/", "/site/"), "https://x.dev/")
+        self.assertEqual(rewrite_url("/a.css"), "/a.css")
+
+    def test_rewrite_basepath(self):
+        html = '<link href="/index.css"><img src="/a.png">'
+        self.assertEqual(
+            rewrite_basepath(html, "/site/"),
+            '<link href="/site/index.css"><img src="/site/a.png">',
+        )
+
+    def test_rewrite_with_assets(self):
+        assets = AssetMap({"/index.css": "/index.0123abcd.css"})
+        self.assertEqual(rewrite_url("/index.css?v=1", "/site/", assets),
+                         "/site/index.0123abcd.css?v=1")
+        self.assertEqual(rewrite_url("/other.css", "/", assets), "/other.css")
+        self.assertEqual(
+            rewrite_basepath('<link href="/index.css"><a href="/">', "/site/", assets),
+            '<link href="/site/index.0123abcd.css"><a href="/site/">',
+        )
+
+
+class TestTemplate(unittest.TestCase):
+    def test_render_placeholders(self):
+        template = Template("<title>{{ Title }}</title>{{Content}}")
+        self.assertEqual(template.placeholders, ["Title", "Content"])
+        self.assertEqual(
+            template.render({"Title": "Hi", "Content": "<p>x</p>"}),
+            "<title>Hi</title><p>x</p>",
+        )
+
+    def test_extra_and_missing_placeholders(self):
+        template = Template("{{ Title }}|{{ Date }}|{{ Description }}")
+        self.assertEqual(template.render(
+            {"Title": "T", "Date": "2024-01-01"}), "T|2024-01-01|")
+
+    def test_basepath_applies_to_literals_only(self):
+        template = Template('<link href="/index.css" />{{ Content }}', "/site/")
+        self.assertEqual(
+            template.render({"Content": '<a href="/raw">'}),
+            '<link href="/site/index.css" /><a href="/raw">',
+        )
+
+    def test_repeated_placeholder(self):
+        template = Template("{{ Title }} - {{ Title }}")
+        self.assertEqual(template.render({"Title": "A"}), "A - A")
+
+    def test_iter_render_streams_iterable_values(self):
+        template = Template("<body>{{ Content }}</body>")
+        chunks = list(template.iter_render({"Content": iter(["<p>", "x", "</p>"])}))
+        self.assertEqual(chunks, ["<body>", "<p>", "x", "</p>", "</body>"])
+
+    def test_load_template_reloads_changed_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "template.html")
+            with open(path, "w") as f:
+                f.write("v1 {{ Title }}")
+            first = load_template(path)
+            self.assertIs(load_template(path), first)
+            with open(path, "w") as f:
+                f.write("version 2 {{ Title }}")
+            self.assertEqual(load_template(path).render(
+                {"Title": "x"}), "version 2 x")
+
+    def test_load_template_minified(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "template.html")
+            with open(path, "w") as f:
+                f.write("<html>\n  <!-- layout -->\n  <title>{{ Title }}</title>\n"
+                        '  <link href="/a.css" />\n</html>\n')
+            template = load_template(path, "/site/", minify=True)
+            self.assertEqual(template.render({"Title": "x"}),
+                             '<html><title>x</title><link href="/site/a.css" /></html>')
+            self.assertIn("<!-- layout -->", load_template(path, "/site/").render({}))
+
+
+if __name__ == "__main__":
+    unittest.main()
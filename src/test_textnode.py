@@ -1,22 +1,46 @@
+import io
+import random
+import re
 import unittest
 
+from bench import legacy_text_to_textnodes
 from textnode import (
     BlockType,
     TextNode,
     TextType,
     block_to_block_type,
+    parse_block,
     extract_markdown_images,
     extract_markdown_links,
+    iter_blocks,
+    iter_numbered_blocks,
     markdown_to_html_node,
     markdown_to_blocks,
+    split_nodes_delimiter,
     split_nodes_image,
     split_nodes_link,
-    split_nodes_delimiter,
     text_to_textnodes,
     text_node_to_html_node,
 )
 
 
+def legacy_block_to_block_type(block):
+    """The original classifier, which rescans a block's lines per type."""
+    if re.match(r"^#{1,6} ", block):
+        return BlockType.HEADING
+    if block.startswith("```\n") and block.endswith("```"):
+        return BlockType.CODE
+    lines = block.split("\n")
+    if all(line.startswith(">") for line in lines):
+        return BlockType.QUOTE
+    if all(line.startswith("- ") for line in lines):
+        return BlockType.UNORDERED_LIST
+    for index, line in enumerate(lines, start=1):
+        if not line.startswith(f"{index}. "):
+            return BlockType.PARAGRAPH
+    return BlockType.ORDERED_LIST
+
+
 class TestTextNode(unittest.TestCase):
     def test_eq(self):
         node = TextNode("This is a text node", TextType.BOLD)
@@ -91,6 +115,18 @@ class TestTextNodeToHtmlNode(unittest.TestCase):
             {"src": "https://example.com/image.png", "alt": "alt"},
         )
 
+    def test_link_props_are_shared_and_read_only(self):
+        first = text_node_to_html_node(TextNode("a", TextType.LINK, "/x"))
+        second = text_node_to_html_node(TextNode("b", TextType.LINK, "/x"))
+        self.assertIs(first.props, second.props)
+        with self.assertRaises(TypeError):
+            first.props["href"] = "/y"  # type: ignore
+
+    def test_nodes_have_no_instance_dict(self):
+        self.assertFalse(hasattr(TextNode("a", TextType.TEXT), "__dict__"))
+        html_node = text_node_to_html_node(TextNode("a", TextType.TEXT))
+        self.assertFalse(hasattr(html_node, "__dict__"))
+
     def test_invalid_text_type(self):
         node = TextNode("oops", "bad-type")
         with self.assertRaises(ValueError):
@@ -254,6 +290,28 @@ class TestTextToTextNodes(unittest.TestCase):
         self.assertEqual(text_to_textnodes(text), [
                          TextNode(text, TextType.TEXT)])
 
+    def test_text_to_textnodes_empty(self):
+        self.assertEqual(text_to_textnodes(""), [])
+
+    def test_text_to_textnodes_unmatched_delimiter_raises(self):
+        with self.assertRaises(ValueError):
+            text_to_textnodes("a `code span")
+
+    def test_text_to_textnodes_matches_chained_passes(self):
+        pieces = ["word", " ", "**", "__", "_", "*", "`", "[x](/y)",
+                  "![i](/j.png)", "[", "]", "(", ")", "!", "snake_case"]
+        rng = random.Random(1)
+        for _ in range(3000):
+            text = "".join(rng.choice(pieces)
+                           for _ in range(rng.randint(0, 12)))
+            try:
+                expected = legacy_text_to_textnodes(text)
+            except ValueError:
+                with self.assertRaises(ValueError, msg=text):
+                    text_to_textnodes(text)
+                continue
+            self.assertEqual(text_to_textnodes(text), expected, msg=text)
+
 
 class TestMarkdownToBlocks(unittest.TestCase):
     def test_markdown_to_blocks(self):
@@ -287,6 +345,32 @@ Second block
         self.assertEqual(markdown_to_blocks(markdown), [
                          "First block", "Second block"])
 
+    def test_fenced_code_keeps_blank_lines(self):
+        markdown = "Intro\n\n```\nline 1\n\n\nline 2\n```\n\nOutro"
+        self.assertEqual(markdown_to_blocks(markdown), [
+            "Intro", "```\nline 1\n\n\nline 2\n```", "Outro"])
+
+    def test_inline_triple_backticks_do_not_open_fence(self):
+        markdown = "```a``` inline\n\nNext"
+        self.assertEqual(markdown_to_blocks(markdown), [
+                         "```a``` inline", "Next"])
+
+
+class TestIterBlocks(unittest.TestCase):
+    def test_reads_file_object_lazily(self):
+        source = io.StringIO("# One\n\nTwo\nlines\n\n\n  Three  \n")
+        blocks = iter_blocks(source)
+        self.assertEqual(next(blocks), "# One")
+        self.assertEqual(list(blocks), ["Two\nlines", "Three"])
+
+    def test_whitespace_only_lines_separate_blocks(self):
+        self.assertEqual(list(iter_blocks(["a", "  \t", "b"])), ["a", "b"])
+
+    def test_numbered_blocks_start_lines(self):
+        lines = ["", "# One", "", "```", "", "code", "```", "", "a", "b"]
+        self.assertEqual(list(iter_numbered_blocks(lines, 5)),
+                         [(6, "# One"), (8, "```\n\ncode\n```"), (13, "a\nb")])
+
 
 class TestBlockToBlockType(unittest.TestCase):
     def test_heading_block(self):
@@ -317,6 +401,24 @@ class TestBlockToBlockType(unittest.TestCase):
         block = "1. first\n3. third"
         self.assertEqual(block_to_block_type(block), BlockType.PARAGRAPH)
 
+    def test_parse_block_strips_syntax(self):
+        self.assertEqual(parse_block("## Sub  title"), (BlockType.HEADING, 2, ["Sub  title"]))
+        self.assertEqual(parse_block("```\na\n\nb\n```"), (BlockType.CODE, 0, ["a", "", "b"]))
+        self.assertEqual(parse_block("> one\n>two"), (BlockType.QUOTE, 0, ["one", "two"]))
+        self.assertEqual(parse_block("- a\n- b"), (BlockType.UNORDERED_LIST, 0, ["a", "b"]))
+        self.assertEqual(parse_block("1. a\n2. b"), (BlockType.ORDERED_LIST, 0, ["a", "b"]))
+        self.assertEqual(parse_block("- a\nb"), (BlockType.PARAGRAPH, 0, ["- a\nb"]))
+        self.assertEqual(parse_block("####### x"), (BlockType.PARAGRAPH, 0, ["####### x"]))
+
+    def test_parse_block_matches_original_classifier(self):
+        pieces = ["#", "# ", "###### ", "####### ", ">", "> ", "- ", "-", "1. ", "2. ",
+                  "3. ", "```", "\n", "text", " "]
+        rng = random.Random(2)
+        for _ in range(3000):
+            block = "".join(rng.choice(pieces) for _ in range(rng.randint(1, 10)))
+            self.assertEqual(block_to_block_type(block),
+                             legacy_block_to_block_type(block), msg=repr(block))
+
 
 class TestMarkdownToHtmlNode(unittest.TestCase):
     def test_markdown_to_html_node(self):
@@ -349,6 +451,11 @@ code
         )
         self.assertEqual(markdown_to_html_node(markdown).to_html(), expected)
 
+    def test_markdown_to_html_node_code_with_blank_line(self):
+        markdown = "```\na\n\nb\n```"
+        self.assertEqual(markdown_to_html_node(io.StringIO(markdown)).to_html(),
+                         "<div><pre><code>a\n\nb</code></pre></div>")
+
 
 if __name__ == "__main__":
     unittest.main()
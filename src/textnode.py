@@ -1,8 +1,15 @@
 import re
 from enum import Enum
+from functools import lru_cache
+from types import MappingProxyType
 
 from htmlnode import LeafNode, ParentNode
 
+# Bump whenever a parser change alters the trees produced for the same
+# markdown; it is part of the parse cache key. 2: blocks classified and
+# stripped in one pass; 3: fence-aware numbered blocks
+PARSER_VERSION = 3
+
 
 class TextType(Enum):
     TEXT = "text"
@@ -24,6 +31,8 @@ class BlockType(Enum):
 
 
 class TextNode():
+    __slots__ = ("text", "text_type", "url")
+
     def __init__(self, text, text_type, url=None):
         self.text = text
         self.text_type = text_type
@@ -38,6 +47,21 @@ class TextNode():
         return f"TextNode(text='{self.text}', text_type='{self.text_type}', url='{self.url}')"
 
 
+HEADING_TAGS = ("h1", "h2", "h3", "h4", "h5", "h6")
+
+
+@lru_cache(maxsize=4096)
+def link_props(url):
+    """Shared read-only props for a link; pages repeat the same URLs a lot."""
+    return MappingProxyType({"href": url})
+
+
+@lru_cache(maxsize=4096)
+def image_props(url, alt):
+    """Shared read-only props for an image with the given src and alt."""
+    return MappingProxyType({"src": url, "alt": alt})
+
+
 def text_node_to_html_node(text_node):
     if text_node.text_type == TextType.TEXT:
         return LeafNode(None, text_node.text)
@@ -48,9 +72,9 @@ def text_node_to_html_node(text_node):
     if text_node.text_type == TextType.CODE:
         return LeafNode("code", text_node.text)
     if text_node.text_type in (TextType.LINKS, getattr(TextType, "LINK", None)):
-        return LeafNode("a", text_node.text, {"href": text_node.url})
+        return LeafNode("a", text_node.text, link_props(text_node.url))
     if text_node.text_type == TextType.IMAGE:
-        return LeafNode("img", "", {"src": text_node.url, "alt": text_node.text})
+        return LeafNode("img", "", image_props(text_node.url, text_node.text))
     raise ValueError(f"Unsupported text type: {text_node.text_type}")
 
 
@@ -179,80 +203,202 @@ def split_nodes_asterisk(old_nodes):
     return new_nodes
 
 
+# Inline rules in precedence order, mirroring the split_nodes_* passes:
+# (marker that must be present, regex or None for a plain delimiter, type).
+# Each rule only sees the plain-text gaps left over by the rules before it.
+INLINE_RULES = (
+    ("![", re.compile(r"!\[(.*?)\]\((.*?)\)"), TextType.IMAGE),
+    ("[", re.compile(r"(?<!!)\[(.*?)\]\((.*?)\)"), TextType.LINK),
+    ("**", None, TextType.BOLD),
+    ("__", None, TextType.BOLD),
+    ("_", re.compile(r"_([^_]+?)_"), TextType.ITALIC),
+    ("*", re.compile(r"\*([^\*]+?)\*"), TextType.ITALIC),
+    ("`", None, TextType.CODE),
+)
+
+
+def _scan_inline(text, rule_index, out):
+    """
+    Append the TextNodes for text to out, starting at INLINE_RULES[rule_index].
+    Works on string slices only, so no intermediate node lists are built and
+    spans without any markup fall straight through the substring checks.
+    """
+    while rule_index < len(INLINE_RULES):
+        marker, pattern, text_type = INLINE_RULES[rule_index]
+        rule_index += 1
+        if marker not in text:
+            continue
+
+        if pattern is None:
+            segments = text.split(marker)
+            if len(segments) % 2 == 0:
+                raise ValueError("Unmatched delimiter")
+            for index, segment in enumerate(segments):
+                if segment == "":
+                    continue
+                if index % 2 == 0:
+                    _scan_inline(segment, rule_index, out)
+                else:
+                    out.append(TextNode(segment, text_type))
+            return
+
+        last_index = 0
+        for match in pattern.finditer(text):
+            if match.start() > last_index:
+                _scan_inline(text[last_index:match.start()], rule_index, out)
+            if pattern.groups == 2:
+                out.append(TextNode(match.group(1), text_type, match.group(2)))
+            else:
+                out.append(TextNode(match.group(1), text_type))
+            last_index = match.end()
+        if last_index == 0:
+            # No match: the whole text moves on to the next rule unchanged
+            continue
+        if last_index < len(text):
+            _scan_inline(text[last_index:], rule_index, out)
+        return
+
+    out.append(TextNode(text, TextType.TEXT))
+
+
 def text_to_textnodes(text):
-    nodes = [TextNode(text, TextType.TEXT)]
-    nodes = split_nodes_image(nodes)
-    nodes = split_nodes_link(nodes)
-    nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)
-    nodes = split_nodes_delimiter(nodes, "__", TextType.BOLD)
-    nodes = split_nodes_underscore(nodes)
-    nodes = split_nodes_asterisk(nodes)
-    nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
+    """
+    Split inline markdown into TextNodes in a single scan. Produces the same
+    nodes as chaining the split_nodes_* passes, without rebuilding node lists.
+    """
+    if not text:
+        return []
+    nodes = []
+    _scan_inline(text, 0, nodes)
     return nodes
 
 
-def markdown_to_blocks(markdown):
-    blocks = re.split(r"\n\s*\n", markdown.strip())
-    return [block.strip() for block in blocks if block.strip()]
+FENCE_OPEN_PATTERN = re.compile(r"^ {0,3}```[^`]*$")
+FENCE_CLOSE_PATTERN = re.compile(r"^ {0,3}```\s*$")
+
+
+def iter_blocks(lines):
+    """
+    Yield markdown blocks from an iterable of lines (e.g. an open file) as
+    soon as each block ends. Blank lines separate blocks, except inside a
+    fenced code block, which is always yielded whole.
+    """
+    for _, block in iter_numbered_blocks(lines):
+        yield block
+
+
+def iter_numbered_blocks(lines, first_line=1):
+    """
+    Like iter_blocks, but yield (line number, block) pairs, numbering the
+    lines from first_line; the number is that of the block's first line.
+    """
+    block = []
+    start = first_line
+    in_fence = False
+    for number, line in enumerate(lines, first_line):
+        line = line.rstrip("\n")
+        if in_fence:
+            block.append(line)
+            if FENCE_CLOSE_PATTERN.match(line):
+                in_fence = False
+            continue
+        if not line.strip():
+            if block:
+                text = "\n".join(block).strip()
+                if text:
+                    yield start, text
+                block = []
+            continue
+        if not block:
+            start = number
+        if FENCE_OPEN_PATTERN.match(line):
+            in_fence = True
+        block.append(line)
+    if block:
+        text = "\n".join(block).strip()
+        if text:
+            yield start, text
 
 
-def block_to_block_type(block):
-    if re.match(r"^#{1,6} ", block):
-        return BlockType.HEADING
-    if block.startswith("```\n") and block.endswith("```"):
-        return BlockType.CODE
-
-    lines = block.split("\n")
-    if all(line.startswith(">") for line in lines):
-        return BlockType.QUOTE
-    if all(line.startswith("- ") for line in lines):
-        return BlockType.UNORDERED_LIST
+def markdown_to_blocks(markdown):
+    return list(iter_blocks(markdown.split("\n")))
+
+
+def parse_block(block):
+    """
+    Classify a block and strip its markdown syntax in a single pass.
+    Returns (block_type, level, lines): level is the heading level (0 for
+    other blocks) and lines holds the heading text, the code lines, the
+    quote lines without ">", the list item texts, or the paragraph text.
+    A list or quote that breaks its pattern partway is a paragraph.
+    """
+    if block.startswith("#"):
+        level = len(block) - len(block.lstrip("#"))
+        if level <= 6 and block[level:level + 1] == " ":
+            return BlockType.HEADING, level, [block[level + 1:]]
+    elif block.startswith("```\n") and block.endswith("```"):
+        return BlockType.CODE, 0, block.split("\n")[1:-1]
+    elif block.startswith(">"):
+        lines = []
+        for line in block.split("\n"):
+            if line.startswith("> "):
+                lines.append(line[2:])
+            elif line.startswith(">"):
+                lines.append(line[1:])
+            else:
+                break
+        else:
+            return BlockType.QUOTE, 0, lines
+    elif block.startswith("- "):
+        lines = []
+        for line in block.split("\n"):
+            if not line.startswith("- "):
+                break
+            lines.append(line[2:])
+        else:
+            return BlockType.UNORDERED_LIST, 0, lines
+    elif block.startswith("1. "):
+        lines = []
+        for index, line in enumerate(block.split("\n"), start=1):
+            marker = f"{index}. "
+            if not line.startswith(marker):
+                break
+            lines.append(line[len(marker):])
+        else:
+            return BlockType.ORDERED_LIST, 0, lines
+    return BlockType.PARAGRAPH, 0, [block]
 
-    ordered = True
-    for index, line in enumerate(lines, start=1):
-        if not line.startswith(f"{index}. "):
-            ordered = False
-            break
-    if ordered:
-        return BlockType.ORDERED_LIST
 
-    return BlockType.PARAGRAPH
+def block_to_block_type(block):
+    return parse_block(block)[0]
 
 
 def text_to_children(text):
     return [text_node_to_html_node(node) for node in text_to_textnodes(text)]
 
 
-def block_to_html_node(block):
-    block_type = block_to_block_type(block)
+def parsed_block_to_html_node(parsed):
+    """Build the HTML node for a parse_block() result."""
+    block_type, level, lines = parsed
     if block_type == BlockType.HEADING:
-        level = len(block.split(" ", 1)[0])
-        text = block[level + 1:]
-        return ParentNode(f"h{level}", text_to_children(text))
+        return ParentNode(HEADING_TAGS[level - 1], text_to_children(lines[0]))
     if block_type == BlockType.CODE:
-        lines = block.split("\n")
-        code_text = "\n".join(lines[1:-1])
-        return ParentNode("pre", [LeafNode("code", code_text)])
+        return ParentNode("pre", [LeafNode("code", "\n".join(lines))])
     if block_type == BlockType.QUOTE:
-        lines = block.split("\n")
-        cleaned = [line[2:] if line.startswith(
-            "> ") else line[1:] for line in lines]
-        return ParentNode("blockquote", text_to_children("\n".join(cleaned)))
+        return ParentNode("blockquote", text_to_children("\n".join(lines)))
     if block_type == BlockType.UNORDERED_LIST:
-        items = []
-        for line in block.split("\n"):
-            items.append(ParentNode("li", text_to_children(line[2:])))
-        return ParentNode("ul", items)
+        return ParentNode("ul", [ParentNode("li", text_to_children(line)) for line in lines])
     if block_type == BlockType.ORDERED_LIST:
-        items = []
-        for index, line in enumerate(block.split("\n"), start=1):
-            items.append(ParentNode(
-                "li", text_to_children(line[len(f"{index}. "):])))
-        return ParentNode("ol", items)
-    return ParentNode("p", text_to_children(block))
+        return ParentNode("ol", [ParentNode("li", text_to_children(line)) for line in lines])
+    return ParentNode("p", text_to_children(lines[0]))
+
+
+def block_to_html_node(block):
+    return parsed_block_to_html_node(parse_block(block))
 
 
 def markdown_to_html_node(markdown):
-    blocks = markdown_to_blocks(markdown)
-    children = [block_to_html_node(block) for block in blocks]
+    """Parse markdown given as a string or an iterable of lines (a file)."""
+    lines = markdown.split("\n") if isinstance(markdown, str) else markdown
+    children = [block_to_html_node(block) for block in iter_blocks(lines)]
     return ParentNode("div", children)